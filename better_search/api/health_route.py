@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import JSONResponse
+
+router = APIRouter(
+    prefix="/health",
+    tags=["health"],
+)
+
+
+@router.get("/live")
+def liveness():
+    return {"status": "ok"}
+
+
+@router.get("/ready")
+def readiness(request: Request):
+    if not request.app.state.ready:
+        if request.app.state.load_error:
+            return JSONResponse(
+                status_code=503,
+                content={"status": "failed", "error": request.app.state.load_error},
+            )
+        return JSONResponse(status_code=503, content={"status": "loading"})
+    return {"status": "ready"}
@@ -1,50 +1,129 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from better_search.lib.podcast_index.utils import (
-    format_duration,
+from typing import Optional
+
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy.ext.asyncio import AsyncSession
+from better_search.lib.podcast_index.utils import format_duration
+from better_search.lib.text.normalize import (
     clean_description,
+    make_snippet,
     normalize_arabic,
 )
-from better_search.lib.vectorstore.hybrid_search import HybridSearch
-from better_search.db.database import get_db
-from better_search.lib.podcast_index.models import Episode, Podcast
+from better_search.lib.vectorstore.hybrid_search import (
+    EpisodeDisplay,
+    HybridSearch,
+    SearchProfileName,
+)
+from better_search.db.database import get_async_db
+from better_search.lib.podcast_index.dal import aget_episodes_display_info
+from better_search.lib.cache.search_cache import SearchResultCache
+from better_search.core.config import settings
 
 router = APIRouter(
     prefix="/search",
     tags=["search"],
 )
 
-searcher = HybridSearch("podcast_episodes_", mode="local")
+result_cache = SearchResultCache.from_settings()
+
+
+def display_from_row(episode) -> dict:
+    description = episode.clean_description
+    snippet = episode.snippet
+    if description is None:
+        description = clean_description(episode.description)
+        snippet = make_snippet(description)
+
+    return {
+        "episode_image": episode.image if episode.image else episode.podcast_image_url,
+        "episode_description": description,
+        "episode_snippet": snippet,
+        "duration_formatted": format_duration(episode.duration),
+        "date_published": (
+            episode.date_published.isoformat() if episode.date_published else None
+        ),
+    }
+
+
+def display_from_payload(display: EpisodeDisplay) -> dict:
+    return {
+        "episode_image": display.image,
+        "episode_description": display.description,
+        "episode_snippet": display.snippet,
+        "duration_formatted": display.duration_formatted,
+        "date_published": display.date_published,
+    }
+
+
+# The searcher is built and warmed up by the application lifespan, see
+# better_search.api.server.
+def get_searcher(request: Request) -> HybridSearch:
+    if not request.app.state.ready:
+        raise HTTPException(status_code=503, detail="Search models are loading")
+    return request.app.state.searcher
 
 
 @router.get("/")
-def search_podcast(query: str, db: Session = Depends(get_db)):
+async def search_podcast(
+    query: str,
+    profile: Optional[SearchProfileName] = None,
+    db: AsyncSession = Depends(get_async_db),
+    searcher: HybridSearch = Depends(get_searcher),
+):
     normalized_query = normalize_arabic(query)
-    search_results = searcher.search(query=normalized_query)
+    profile = profile or settings.DEFAULT_SEARCH_PROFILE
+
+    if settings.SEARCH_CACHE_ENABLED:
+        cached = await result_cache.get(
+            normalized_query, searcher.mode, searcher.collection_name, profile
+        )
+        if cached is not None:
+            return {"result": cached}
+
+    search_results = await searcher.asearch(query=normalized_query, profile=profile)
+
+    # Hits indexed with the display payload are served as is, only the others
+    # are looked up in the db
+    episodes = await aget_episodes_display_info(
+        [result.episode_id for result in search_results if result.display is None],
+        db,
+    )
     enhanced_results = []
 
+    # Iterate over the Qdrant results so the fused ranking is kept, hits whose
+    # episode was deleted from the db are dropped.
     for result in search_results:
-        episode = (
-            db.query(Episode)
-            .join(Episode.podcast)
-            .filter(Episode.id == result.episode_id)
-            .first()
-        )
+        if result.display is not None:
+            display = display_from_payload(result.display)
+        else:
+            episode = episodes.get(result.episode_id)
+            if not episode:
+                continue
+            display = display_from_row(episode)
+
+        enhanced_results.append({**result.model_dump(exclude={"display"}), **display})
 
-        if episode:
-            image_url = episode.image if episode.image else episode.podcast.image_url
-
-            enhanced_result = {
-                **result.model_dump(),
-                "episode_image": image_url,
-                "episode_description": clean_description(episode.description) or "",
-                "duration_formatted": format_duration(episode.duration),
-                "date_published": (
-                    episode.date_published.isoformat()
-                    if episode.date_published
-                    else None
-                ),
-            }
-            enhanced_results.append(enhanced_result)
+    if settings.SEARCH_CACHE_ENABLED:
+        await result_cache.set(
+            normalized_query,
+            searcher.mode,
+            searcher.collection_name,
+            profile,
+            enhanced_results,
+        )
 
     return {"result": enhanced_results}
+
+
+@router.get("/cache/stats")
+async def search_cache_stats(searcher: HybridSearch = Depends(get_searcher)):
+    return {
+        "results": result_cache.stats(),
+        "embeddings": (
+            searcher.embedding_cache.stats() if searcher.embedding_cache else None
+        ),
+    }
+
+
+@router.get("/embedding/timings")
+async def embedding_timings(searcher: HybridSearch = Depends(get_searcher)):
+    return {searcher.mode: searcher.embedding_timings.stats()}
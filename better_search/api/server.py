@@ -1,11 +1,83 @@
+import asyncio
+import os
+import signal
+from contextlib import asynccontextmanager, suppress
+
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from better_search.api.health_route import router as health_router
 from better_search.api.search_route import router as search_router
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.lib.vectorstore.hybrid_search import HybridSearch
+
+logger = get_logger()
+
+
+async def _build_searcher() -> HybridSearch:
+    # Model loading and warmup are blocking, keep them off the event loop
+    # so the health endpoints answer while they run.
+    searcher = await asyncio.to_thread(
+        HybridSearch, settings.SEARCH_COLLECTION_NAME, mode=settings.SEARCH_MODE
+    )
+    try:
+        await asyncio.to_thread(searcher.warmup, settings.SEARCH_WARMUP_QUERIES)
+    except BaseException:
+        await searcher.aclose()
+        raise
+    return searcher
+
+
+async def load_searcher(app: FastAPI):
+    delay = settings.SEARCH_LOAD_RETRY_SECONDS
+    error = "no load attempts configured"
+    for attempt in range(1, settings.SEARCH_LOAD_MAX_ATTEMPTS + 1):
+        try:
+            app.state.searcher = await _build_searcher()
+            break
+        except Exception as e:
+            logger.error(
+                f"Failed to load the searcher "
+                f"(attempt {attempt}/{settings.SEARCH_LOAD_MAX_ATTEMPTS}): {e}"
+            )
+            error = str(e)
+            if attempt < settings.SEARCH_LOAD_MAX_ATTEMPTS:
+                await asyncio.sleep(delay)
+                delay *= 2
+    else:
+        logger.critical("Giving up on loading the searcher")
+        app.state.load_error = error
+        if settings.SEARCH_LOAD_EXIT_ON_FAILURE:
+            logger.critical("Shutting down, SEARCH_LOAD_EXIT_ON_FAILURE is set")
+            os.kill(os.getpid(), signal.SIGTERM)
+        return
+
+    app.state.ready = True
+    logger.info("Searcher loaded and warmed up")
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.searcher = None
+    app.state.ready = False
+    app.state.load_error = None
+    loader = asyncio.create_task(load_searcher(app))
+
+    yield
+
+    loader.cancel()
+    with suppress(asyncio.CancelledError):
+        await loader
+
+    app.state.ready = False
+    if app.state.searcher is not None:
+        await app.state.searcher.aclose()
+        app.state.searcher = None
 
 
 def get_application() -> FastAPI:
-    app = FastAPI()
+    app = FastAPI(lifespan=lifespan)
 
     app.add_middleware(
         CORSMiddleware,
@@ -15,6 +87,7 @@ def get_application() -> FastAPI:
         allow_headers=["*"],
     )
 
+    app.include_router(health_router)
     app.include_router(search_router)
 
     return app
@@ -1,3 +1,5 @@
+from typing import Optional
+
 from pydantic import Field
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
@@ -7,17 +9,33 @@ class Settings(BaseSettings):
 
     PODCAST_INDEX_API_KEY: str
     PODCAST_INDEX_API_SECRET: str
+    PODCAST_INDEX_BASE_URL: str = "https://api.podcastindex.org/api/1.0"
+    # Used by the async crawler, the token bucket spaces out request starts
+    PODCAST_INDEX_MAX_CONCURRENCY: int = 8
+    PODCAST_INDEX_RATE_PER_SECOND: float = 5.0
+    PODCAST_INDEX_MAX_RETRIES: int = 4
+    PODCAST_INDEX_TIMEOUT_SECONDS: float = 30.0
+    # Validate responses into the slim Ingest* schemas straight from the
+    # response bytes instead of building the full response models
+    PODCAST_INDEX_SLIM_SCHEMAS: bool = True
+    # Raw API responses kept by load_from_index --archive for replays
+    RAW_ARCHIVE_DIR: str = "data/raw_archive"
 
     REDIS_HOST: str = Field(default="redis")
     REDIS_PORT: str = Field(default="6379")
 
     CELERY_BROKER_URL: str = Field(default="redis://redis:6379/0")
     CELERY_RESULT_BACKEND: str = Field(default="redis://redis:6379/0")
+    # Runs tasks (and whole workflows) inline in the caller, no broker or
+    # worker needed. Pairs with CELERY_BROKER_URL=memory:// for local runs.
+    CELERY_TASK_ALWAYS_EAGER: bool = False
 
     POSTGRES_USER: str
     POSTGRES_PASSWORD: str
     POSTGRES_DB: str
     DATABASE_URL: str
+    ASYNC_DB_POOL_SIZE: int = 10
+    ASYNC_DB_MAX_OVERFLOW: int = 10
 
     OPENAI_API_KEY: str
 
@@ -27,7 +45,70 @@ class Settings(BaseSettings):
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
     SPARSE_EMBEDDING_MODEL: str = "Qdrant/bm25"
 
+    # Processes computing BM25 vectors while indexing, 0 keeps it in process
+    SPARSE_EMBEDDING_WORKERS: int = 2
+    # Points per upsert request and upsert requests in flight while indexing
+    UPLOAD_BATCH_SIZE: int = 128
+    UPLOAD_PARALLELISM: int = 4
+    UPLOAD_MAX_RETRIES: int = 3
+    # How long flush() waits for the collection to apply every queued upsert
+    UPLOAD_CONSISTENCY_TIMEOUT_SECONDS: float = 300.0
+    # Document vectors computed while indexing, reused by later rebuilds
+    EMBEDDING_STORE_ENABLED: bool = True
+    EMBEDDING_STORE_DIR: str = "data/embedding_store"
+
     QDRANT_BASE_URL: str = "http://host.docker.internal:6333"
+    SEARCH_COLLECTION_NAME: str = "podcast_episodes_"
+    SEARCH_MODE: str = "local"
+    # Embedded at startup, include long queries so the dense model runs too
+    SEARCH_WARMUP_QUERIES: list[str] = [
+        "ثمانية",
+        "Joe Rogan",
+        "الصحة النفسية وطريقة تفكير العقل وحل المشاكل",
+        "how to build a startup from scratch",
+    ]
+    # Attempts at loading the searcher at startup, the delay doubles after
+    # each failure. When all fail /health/ready reports "failed", and the
+    # process also stops itself with SEARCH_LOAD_EXIT_ON_FAILURE. Leave that
+    # off under uvicorn --workers, the respawned worker would crash loop.
+    SEARCH_LOAD_MAX_ATTEMPTS: int = 5
+    SEARCH_LOAD_RETRY_SECONDS: float = 5.0
+    SEARCH_LOAD_EXIT_ON_FAILURE: bool = False
+    # Serve the displayed episode fields from the qdrant payload written with
+    # load_to_vdb --display-payload, the db is only read for points without it
+    SEARCH_RESULTS_FROM_PAYLOAD: bool = False
+    # One of better_search.lib.vectorstore.hybrid_search.SEARCH_PROFILES
+    DEFAULT_SEARCH_PROFILE: str = "exact"
+    # Overrides the profiles' oversampling, binary quantization wants ~3
+    SEARCH_QUANTIZATION_OVERSAMPLING: Optional[float] = None
+
+    SEARCH_CACHE_ENABLED: bool = True
+    SEARCH_CACHE_MAX_SIZE: int = 2048
+    SEARCH_CACHE_TTL_SECONDS: int = 600
+    SEARCH_CACHE_REDIS_ENABLED: bool = False
+    # A stalled redis costs a request at most this much before it is skipped
+    SEARCH_CACHE_REDIS_TIMEOUT_SECONDS: float = 0.5
+    # Without redis, invalidate_search_cache bumps a generation file here
+    # that the API workers poll, so share it between indexer and API
+    SEARCH_CACHE_GENERATION_DIR: str = "data/search_cache"
+    # How long a worker trusts its copy of a collection's cache generation
+    SEARCH_CACHE_GENERATION_REFRESH_SECONDS: float = 5.0
+
+    EMBEDDING_CACHE_ENABLED: bool = True
+    EMBEDDING_CACHE_MAX_SIZE: int = 4096
+
+    # "inprocess" loads the local models in every API worker, "server" sends
+    # local query embedding to the shared embedding_server process instead
+    EMBEDDING_BACKEND: str = "inprocess"
+    EMBEDDING_SERVER_SOCKET: str = "/tmp/better_search_embeddings.sock"
+    EMBEDDING_SERVER_MAX_BATCH_SIZE: int = 32
+    EMBEDDING_SERVER_MAX_WAIT_MS: float = 5.0
+    EMBEDDING_SERVER_TIMEOUT_SECONDS: float = 10.0
+
+    # Threads used to run query embedding off the event loop in async search
+    EMBEDDING_EXECUTOR_WORKERS: int = 2
+    # Threads computing dense query vectors concurrently with the sparse ones
+    DENSE_EMBEDDING_WORKERS: int = 2
 
 
 settings = Settings()
@@ -0,0 +1,56 @@
+from typing import Optional, Sequence
+
+import numpy as np
+from fastembed import SparseEmbedding
+
+from better_search.lib.cache.lru import TTLLRUCache
+
+
+class QueryEmbeddingCache:
+    def __init__(self, max_size: int):
+        self._cache = TTLLRUCache(max_size=max_size)
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, model_name: str, text: str):
+        value = self._cache.get((model_name, text))
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def get_dense(self, model_name: str, text: str) -> Optional[np.ndarray]:
+        return self._get(model_name, text)
+
+    def set_dense(
+        self, model_name: str, text: str, vector: Sequence[float]
+    ) -> np.ndarray:
+        # OpenAI returns python lists of floats, ~4x the size of a float32 array
+        vector = np.asarray(vector, dtype=np.float32)
+        vector.setflags(write=False)
+        self._cache.set((model_name, text), vector)
+        return vector
+
+    def get_sparse(self, model_name: str, text: str) -> Optional[SparseEmbedding]:
+        return self._get(model_name, text)
+
+    def set_sparse(
+        self, model_name: str, text: str, vector: SparseEmbedding
+    ) -> SparseEmbedding:
+        # bm25 token ids are abs() of a signed 32 bit hash, so they fit uint32
+        vector = SparseEmbedding(
+            values=np.asarray(vector.values, dtype=np.float32),
+            indices=np.asarray(vector.indices, dtype=np.uint32),
+        )
+        self._cache.set((model_name, text), vector)
+        return vector
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "entries": len(self._cache),
+        }
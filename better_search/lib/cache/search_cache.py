@@ -0,0 +1,204 @@
+import hashlib
+import json
+import time
+from pathlib import Path
+from typing import Optional
+
+import redis
+from redis import asyncio as aioredis
+
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.lib.cache.lru import TTLLRUCache
+from better_search.lib.text.normalize import normalize_query
+
+logger = get_logger()
+
+KEY_PREFIX = "better_search:search"
+
+
+def generation_key(collection: str) -> str:
+    return f"{KEY_PREFIX}:generation:{collection}"
+
+
+def generation_path(collection: str) -> Path:
+    return Path(settings.SEARCH_CACHE_GENERATION_DIR) / f"{collection}.generation"
+
+
+def read_local_generation(collection: str) -> int:
+    try:
+        return int(generation_path(collection).read_text() or 0)
+    except (FileNotFoundError, ValueError):
+        return 0
+
+
+def bump_local_generation(collection: str) -> int:
+    path = generation_path(collection)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    generation = read_local_generation(collection) + 1
+    # Written aside and renamed so readers never see a partial file
+    tmp_path = path.with_suffix(".tmp")
+    tmp_path.write_text(str(generation))
+    tmp_path.replace(path)
+    return generation
+
+
+def redis_options() -> dict:
+    return {
+        "host": settings.REDIS_HOST,
+        "port": int(settings.REDIS_PORT),
+        "socket_timeout": settings.SEARCH_CACHE_REDIS_TIMEOUT_SECONDS,
+        "socket_connect_timeout": settings.SEARCH_CACHE_REDIS_TIMEOUT_SECONDS,
+    }
+
+
+def make_cache_key(
+    query: str, mode: str, collection: str, generation: int, profile: str
+) -> str:
+    digest = hashlib.sha1(normalize_query(query).encode("utf-8")).hexdigest()
+    return f"{KEY_PREFIX}:{collection}:{generation}:{mode}:{profile}:{digest}"
+
+
+class SearchResultCache:
+    def __init__(
+        self,
+        max_size: int,
+        ttl_seconds: int,
+        redis_client: Optional[aioredis.Redis] = None,
+    ):
+        self.ttl_seconds = ttl_seconds
+        self._local = TTLLRUCache(max_size=max_size, ttl_seconds=ttl_seconds)
+        self._redis = redis_client
+        # collection -> (generation, fetched_at). Bumping the generation (in
+        # redis, or the generation file without it) orphans every key of the
+        # collection on all workers at once.
+        self._generations: dict[str, tuple[int, float]] = {}
+
+        self.local_hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_settings(cls) -> "SearchResultCache":
+        redis_client = None
+        if settings.SEARCH_CACHE_REDIS_ENABLED:
+            redis_client = aioredis.Redis(**redis_options())
+        return cls(
+            max_size=settings.SEARCH_CACHE_MAX_SIZE,
+            ttl_seconds=settings.SEARCH_CACHE_TTL_SECONDS,
+            redis_client=redis_client,
+        )
+
+    async def _generation(self, collection: str) -> int:
+        cached = self._generations.get(collection)
+        now = time.monotonic()
+        if (
+            cached
+            and now - cached[1] < settings.SEARCH_CACHE_GENERATION_REFRESH_SECONDS
+        ):
+            return cached[0]
+
+        if self._redis is None:
+            generation = read_local_generation(collection)
+        else:
+            try:
+                generation = int(await self._redis.get(generation_key(collection)) or 0)
+            except redis.RedisError as e:
+                logger.warning(f"Could not read search cache generation: {e}")
+                generation = cached[0] if cached else 0
+
+        if cached and generation != cached[0]:
+            # The old entries can never be hit again, free them right away
+            self._local.clear()
+        self._generations[collection] = (generation, now)
+        return generation
+
+    async def get(
+        self, query: str, mode: str, collection: str, profile: str
+    ) -> Optional[list]:
+        key = make_cache_key(
+            query, mode, collection, await self._generation(collection), profile
+        )
+
+        value = self._local.get(key)
+        if value is not None:
+            self.local_hits += 1
+            return value
+
+        if self._redis is not None:
+            try:
+                raw = await self._redis.get(key)
+            except redis.RedisError as e:
+                logger.warning(f"Search cache redis get failed: {e}")
+                raw = None
+
+            if raw is not None:
+                value = json.loads(raw)
+                self._local.set(key, value)
+                self.redis_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    async def set(
+        self, query: str, mode: str, collection: str, profile: str, results: list
+    ):
+        key = make_cache_key(
+            query, mode, collection, await self._generation(collection), profile
+        )
+        self._local.set(key, results)
+
+        if self._redis is not None:
+            try:
+                await self._redis.set(key, json.dumps(results), ex=self.ttl_seconds)
+            except redis.RedisError as e:
+                logger.warning(f"Search cache redis set failed: {e}")
+
+    async def invalidate(self, collection: str):
+        if self._redis is None:
+            generation = bump_local_generation(collection)
+        else:
+            try:
+                generation = await self._redis.incr(generation_key(collection))
+            except redis.RedisError as e:
+                # Other workers keep their entries until redis is back or the
+                # TTL runs out, this one at least stops serving them
+                logger.error(f"Failed to invalidate search cache for {collection}: {e}")
+                cached = self._generations.get(collection)
+                generation = (cached[0] if cached else 0) + 1
+
+        self._local.clear()
+        self._generations[collection] = (generation, time.monotonic())
+        logger.info(f"Search cache for {collection} moved to generation {generation}")
+
+    def stats(self) -> dict:
+        hits = self.local_hits + self.redis_hits
+        total = hits + self.misses
+        return {
+            "hits": hits,
+            "local_hits": self.local_hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "hit_rate": hits / total if total else 0.0,
+            "local_entries": len(self._local),
+        }
+
+
+# Used by the indexing scripts. API workers see the bump within
+# SEARCH_CACHE_GENERATION_REFRESH_SECONDS, through redis when the tier is
+# enabled and through the generation file otherwise.
+def invalidate_search_cache(collection: str):
+    if not settings.SEARCH_CACHE_REDIS_ENABLED:
+        generation = bump_local_generation(collection)
+        logger.info(f"Search cache for {collection} moved to generation {generation}")
+        return
+
+    client = redis.Redis(**redis_options())
+    try:
+        generation = client.incr(generation_key(collection))
+        logger.info(f"Search cache for {collection} moved to generation {generation}")
+    except redis.RedisError as e:
+        logger.error(f"Failed to invalidate search cache for {collection}: {e}")
+    finally:
+        client.close()
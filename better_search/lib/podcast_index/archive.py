@@ -0,0 +1,138 @@
+import datetime
+import gzip
+import json
+import threading
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.lib.podcast_index.dal import add_bulk_episodes, add_bulk_podcasts
+from better_search.lib.podcast_index.parsing import (
+    parse_episodes_results,
+    parse_search_results,
+    parse_trending_results,
+)
+
+logger = get_logger()
+
+# Replay order within a crawl date, feeds have to exist before their episodes
+ARCHIVE_KINDS = ["search", "trending", "episodes"]
+ARCHIVE_SUFFIX = ".raw.gz"
+
+
+class RawArchive:
+    # Raw API responses, one directory per crawl date and one gzip file per
+    # response kind. A record is a JSON header line (kind, fetched_at, request
+    # and the body size) followed by the response body exactly as received
+    # and a newline. Files are only ever appended to, every run adds a new
+    # gzip member which gzip readers decode transparently.
+    def __init__(self, root: str = settings.RAW_ARCHIVE_DIR):
+        self.root = Path(root)
+        self._files: Dict[Path, gzip.GzipFile] = {}
+        self._lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def write(
+        self, kind: str, request: Dict[str, Any], body: Union[bytes, Dict[str, Any]]
+    ):
+        # Blocking (gzip), async callers run it on a thread. python-podcastindex
+        # only hands out decoded responses, those are encoded back to JSON.
+        if not isinstance(body, bytes):
+            body = json.dumps(body, ensure_ascii=False).encode("utf-8")
+        now = datetime.datetime.now(datetime.timezone.utc)
+        path = self.root / now.date().isoformat() / f"{kind}{ARCHIVE_SUFFIX}"
+        header = json.dumps(
+            {
+                "kind": kind,
+                "fetched_at": now.isoformat(),
+                "request": request,
+                "size": len(body),
+            },
+            ensure_ascii=False,
+        )
+        with self._lock:
+            archive_file = self._files.get(path)
+            if archive_file is None:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                # gzip's default level 9 costs the crawl more than the
+                # handful of bytes it saves over 6 on JSON
+                archive_file = gzip.open(path, "ab", compresslevel=6)
+                self._files[path] = archive_file
+            archive_file.write(header.encode("utf-8") + b"\n" + body + b"\n")
+
+    def close(self):
+        with self._lock:
+            for archive_file in self._files.values():
+                archive_file.close()
+            self._files.clear()
+
+    def dates(self) -> List[str]:
+        return sorted(path.name for path in self.root.iterdir() if path.is_dir())
+
+    def records(self, dates: Optional[List[str]] = None) -> Iterator[Dict[str, Any]]:
+        # Header fields plus the raw response bytes under "body"
+        for date in dates or self.dates():
+            for kind in ARCHIVE_KINDS:
+                path = self.root / date / f"{kind}{ARCHIVE_SUFFIX}"
+                if path.exists():
+                    yield from self._read(path)
+
+    @staticmethod
+    def _read(path: Path) -> Iterator[Dict[str, Any]]:
+        with gzip.open(path, "rb") as archive_file:
+            try:
+                while header := archive_file.readline():
+                    record = json.loads(header)
+                    body = archive_file.read(record["size"])
+                    if len(body) < record["size"] or archive_file.read(1) != b"\n":
+                        raise EOFError("record body is cut short")
+                    record["body"] = body
+                    yield record
+            except (EOFError, ValueError, OSError, zlib.error) as e:
+                # A run killed mid write leaves a torn record (or gzip member),
+                # nothing after it can be framed again
+                logger.warning(f"Stopped reading {path} at a torn record: {e}")
+
+
+def replay_archive(
+    archive: RawArchive, session: Session, dates: Optional[List[str]] = None
+) -> Dict[str, int]:
+    # Re-ingests through the same dal functions as a live crawl
+    stats = {"podcasts": 0, "episodes": 0, "failed": 0}
+    for record in archive.records(dates):
+        try:
+            if record["kind"] == "episodes":
+                results = parse_episodes_results(record["body"])
+                count = (
+                    add_bulk_episodes(results.items, session) if results.items else 0
+                )
+                key = "episodes"
+            else:
+                parse = (
+                    parse_search_results
+                    if record["kind"] == "search"
+                    else parse_trending_results
+                )
+                results = parse(record["body"])
+                count = add_bulk_podcasts(podcasts=results.feeds, session=session)
+                key = "podcasts"
+        except Exception as e:
+            logger.error(f"Skipping archived {record['kind']} response: {e}")
+            count = None
+
+        if count is None:
+            stats["failed"] += 1
+        else:
+            stats[key] += count
+
+    logger.info(f"Replayed archive {archive.root}: {stats}")
+    return stats
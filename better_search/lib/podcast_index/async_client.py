@@ -0,0 +1,168 @@
+import asyncio
+import hashlib
+import random
+import time
+from typing import List, Optional, Union
+
+import httpx
+
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.lib.podcast_index.schemas import SearchFeed, TrendingFeed
+
+logger = get_logger()
+
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity or max(1.0, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    async def acquire(self):
+        # Waiters queue on the lock, so tokens are handed out in FIFO order
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class AsyncPodcastIndex:
+    def __init__(
+        self,
+        api_key: str = settings.PODCAST_INDEX_API_KEY,
+        api_secret: str = settings.PODCAST_INDEX_API_SECRET,
+        base_url: str = settings.PODCAST_INDEX_BASE_URL,
+        concurrency: int = settings.PODCAST_INDEX_MAX_CONCURRENCY,
+        rate_per_second: float = settings.PODCAST_INDEX_RATE_PER_SECOND,
+        max_retries: int = settings.PODCAST_INDEX_MAX_RETRIES,
+        timeout: float = settings.PODCAST_INDEX_TIMEOUT_SECONDS,
+    ):
+        self.api_key = api_key
+        self.api_secret = api_secret
+        self.max_retries = max_retries
+        self.requests = 0
+        self.retries = 0
+        self._client = httpx.AsyncClient(
+            base_url=base_url,
+            timeout=timeout,
+            limits=httpx.Limits(max_connections=concurrency),
+        )
+        self._semaphore = asyncio.Semaphore(concurrency)
+        self._bucket = TokenBucket(rate_per_second)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self._client.aclose()
+
+    def _headers(self) -> dict:
+        # Same scheme as the python-podcastindex client: sha1 of
+        # key + secret + unix time, recomputed for every attempt
+        epoch_time = str(int(time.time()))
+        digest = hashlib.sha1(
+            (self.api_key + self.api_secret + epoch_time).encode()
+        ).hexdigest()
+        return {
+            "X-Auth-Date": epoch_time,
+            "X-Auth-Key": self.api_key,
+            "Authorization": digest,
+            "User-Agent": "better-search",
+        }
+
+    async def _request(self, path: str, payload: dict) -> bytes:
+        # The undecoded body, parsing.py validates it straight from the bytes
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            async with self._semaphore:
+                await self._bucket.acquire()
+                self.requests += 1
+                try:
+                    response = await self._client.post(
+                        path, data=payload, headers=self._headers()
+                    )
+                    if response.status_code not in RETRY_STATUS_CODES:
+                        response.raise_for_status()
+                        return response.content
+                    error = f"HTTP {response.status_code}"
+                    retry_after = response.headers.get("Retry-After")
+                except httpx.TransportError as e:
+                    error = repr(e)
+
+            if attempt == self.max_retries:
+                raise RuntimeError(
+                    f"{path} failed after {self.max_retries + 1} attempts: {error}"
+                )
+
+            # The slot is released while backing off so other requests proceed
+            self.retries += 1
+            delay = (
+                float(retry_after)
+                if retry_after and retry_after.isdigit()
+                else 2**attempt + random.random()
+            )
+            logger.warning(f"{path} failed ({error}), retrying in {delay:.1f}s")
+            await asyncio.sleep(delay)
+
+    async def search(self, query: str, clean: bool = False) -> bytes:
+        payload = {"q": query}
+        if clean:
+            payload["clean"] = 1
+        return await self._request("/search/byterm", payload)
+
+    async def trending_podcasts(
+        self,
+        max: int = 10,
+        since: Optional[int] = None,
+        lang: Optional[List[str]] = None,
+        categories: Optional[List[int]] = None,
+        not_categories: Optional[List[int]] = None,
+    ) -> bytes:
+        payload = {}
+        if max:
+            payload["max"] = max
+        if since:
+            payload["since"] = since
+        if lang:
+            payload["lang"] = ",".join(str(i) for i in lang)
+        if categories:
+            payload["cat"] = ",".join(str(i) for i in categories)
+        if not_categories:
+            payload["notcat"] = ",".join(str(i) for i in not_categories)
+        return await self._request("/podcasts/trending", payload)
+
+    async def episodes(
+        self,
+        podcast: Union[TrendingFeed, SearchFeed],
+        max_results: int = 1000,
+        fulltext: bool = True,
+        since: Optional[int] = None,
+    ) -> Optional[bytes]:
+        # Same lookup order as utils.get_podcast_episodes
+        if getattr(podcast, "podcastGuid", None):
+            path, payload = "/episodes/bypodcastguid", {"guid": podcast.podcastGuid}
+        elif getattr(podcast, "itunesId", None):
+            path, payload = "/episodes/byitunesid", {"id": podcast.itunesId}
+        elif getattr(podcast, "id", None):
+            path, payload = "/episodes/byfeedid", {"id": podcast.id}
+        else:
+            return None
+
+        payload["max"] = max_results
+        if since:
+            payload["since"] = since
+        if fulltext:
+            payload["fulltext"] = True
+        return await self._request(path, payload)
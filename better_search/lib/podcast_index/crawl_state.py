@@ -0,0 +1,65 @@
+from typing import List, Optional, Tuple, Union
+
+from better_search.lib.podcast_index.schemas import (
+    IngestEpisode,
+    IngestFeed,
+    PodcastEpisode,
+    SearchFeed,
+    TrendingFeed,
+)
+
+Feed = Union[SearchFeed, TrendingFeed, IngestFeed]
+
+
+def feed_markers(feed: Feed) -> Tuple[Optional[int], Optional[int]]:
+    # Search results carry lastUpdateTime and newestItemPubdate, trending
+    # results only the newest item as newestItemPublishTime
+    newest_item = getattr(feed, "newestItemPubdate", None) or getattr(
+        feed, "newestItemPublishTime", None
+    )
+    return getattr(feed, "lastUpdateTime", None), newest_item
+
+
+def _not_newer(current: Optional[int], seen: Optional[int]) -> bool:
+    return current is None or (seen is not None and current <= seen)
+
+
+def is_feed_unchanged(feed: Feed, state) -> bool:
+    if state is None:
+        return False
+
+    last_update, newest_item = feed_markers(feed)
+    if last_update is None and newest_item is None:
+        return False
+    return _not_newer(last_update, state.last_update_time) and _not_newer(
+        newest_item, state.newest_item_pubdate
+    )
+
+
+def episodes_since(state) -> Optional[int]:
+    # Inclusive on the API side, episodes sharing the watermark second come
+    # back again and are dropped as existing guids
+    return state.newest_episode_at if state is not None else None
+
+
+def next_crawl_state(
+    feed: Feed, episodes: List[Union[PodcastEpisode, IngestEpisode]], state
+) -> dict:
+    last_update, newest_item = feed_markers(feed)
+    newest_episode = max(
+        (episode.datePublished for episode in episodes),
+        default=None,
+    )
+    if state is not None and state.newest_episode_at is not None:
+        newest_episode = max(newest_episode or 0, state.newest_episode_at)
+    # Never mark the feed as seen beyond what was stored, otherwise an episode
+    # the API lists but did not return yet would be skipped for good
+    if newest_item is not None and newest_episode is not None:
+        newest_item = min(newest_item, newest_episode)
+
+    return dict(
+        podcastindex_id=feed.id,
+        last_update_time=last_update,
+        newest_item_pubdate=newest_item,
+        newest_episode_at=newest_episode,
+    )
@@ -0,0 +1,180 @@
+import asyncio
+from collections import Counter
+from typing import Callable, Dict, List, Optional, Union
+
+from sqlalchemy.orm import Session
+
+from better_search.core.logger import get_logger
+from better_search.lib.podcast_index.archive import RawArchive
+from better_search.lib.podcast_index.async_client import AsyncPodcastIndex
+from better_search.lib.podcast_index.crawl_state import (
+    episodes_since,
+    is_feed_unchanged,
+)
+from better_search.lib.podcast_index.dal import (
+    add_bulk_episodes,
+    add_bulk_podcasts,
+    save_feed_crawl_state,
+)
+from better_search.lib.podcast_index.parsing import (
+    parse_episodes_results,
+    parse_search_results,
+    parse_trending_results,
+)
+from better_search.lib.podcast_index.schemas import (
+    IngestEpisode,
+    IngestFeed,
+    PodcastEpisode,
+    SearchFeed,
+    TrendingFeed,
+)
+
+logger = get_logger()
+
+Feed = Union[SearchFeed, TrendingFeed, IngestFeed]
+Episode = Union[PodcastEpisode, IngestEpisode]
+
+
+class DbWriter:
+    def __init__(self, session: Session):
+        self.session = session
+
+    def podcasts(self, feeds: List[Feed]) -> Optional[int]:
+        return add_bulk_podcasts(podcasts=feeds, session=self.session)
+
+    def episodes(self, episodes: List[Episode]) -> Optional[int]:
+        return add_bulk_episodes(episodes, self.session)
+
+    def crawl_state(self, feed: Feed, episodes: List[Episode]):
+        return save_feed_crawl_state(feed, episodes, self.session)
+
+
+class PodcastIndexCrawler:
+    def __init__(
+        self,
+        client: AsyncPodcastIndex,
+        write_podcasts: Callable[[List[Feed]], Optional[int]],
+        write_episodes: Callable[[List[Episode]], Optional[int]],
+        queue_size: int = 64,
+        archive: Optional[RawArchive] = None,
+        write_state: Optional[Callable[[Feed, List[Episode]], None]] = None,
+        states: Optional[Dict[int, object]] = None,
+    ):
+        # write_state records the watermarks of every stored feed. Passing the
+        # known states turns on sync mode: unchanged feeds are skipped and the
+        # rest only fetch episodes published since their watermark.
+        self.client = client
+        self.write_podcasts = write_podcasts
+        self.write_episodes = write_episodes
+        self.queue_size = queue_size
+        self.archive = archive
+        self.write_state = write_state
+        self.states = states
+        self.stats = Counter()
+
+    async def run(self, queries: List[str], trending: List[dict]) -> Counter:
+        # Fetchers only talk to the API, a single writer drains the queue into
+        # the db so the (sync) session is never shared between tasks. The
+        # queue is FIFO, so a feed is always written before its episodes.
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        writer = asyncio.create_task(self._writer(queue))
+        try:
+            await asyncio.gather(
+                *(self._crawl_search(query, queue) for query in queries),
+                *(self._crawl_trending(kwargs, queue) for kwargs in trending),
+            )
+        finally:
+            await queue.put(None)
+            await writer
+
+        self.stats["requests"] = self.client.requests
+        self.stats["retries"] = self.client.retries
+        return self.stats
+
+    async def _writer(self, queue: asyncio.Queue):
+        while (item := await queue.get()) is not None:
+            kind, rows, label, feed = item
+            write = self.write_podcasts if kind == "podcasts" else self.write_episodes
+            try:
+                count = await asyncio.to_thread(write, rows) if rows else 0
+                if count is not None and feed is not None and self.write_state:
+                    await asyncio.to_thread(self.write_state, feed, rows)
+            except Exception as e:
+                count = None
+                logger.error(f"Error saving {kind} for {label}: {e}")
+
+            if count is None:
+                self.stats[f"{kind}_failed"] += 1
+                logger.error(f"Failed to save {kind} for {label}")
+            else:
+                self.stats[f"{kind}_saved"] += count
+                logger.info(f"{count} {kind} for {label} were inserted to the database")
+
+    async def _archive(self, kind: str, request: dict, raw: bytes):
+        # The gzip write would stall every in-flight fetch on the event loop
+        if self.archive:
+            await asyncio.to_thread(self.archive.write, kind, request, raw)
+
+    async def _crawl_feeds(self, feeds: List[Feed], label: str, queue: asyncio.Queue):
+        await queue.put(("podcasts", feeds, label, None))
+
+        if self.states is not None:
+            changed = [
+                feed
+                for feed in feeds
+                if not is_feed_unchanged(feed, self.states.get(feed.id))
+            ]
+            self.stats["feeds_skipped"] += len(feeds) - len(changed)
+            feeds = changed
+        await asyncio.gather(*(self._crawl_episodes(feed, queue) for feed in feeds))
+
+    async def _crawl_search(self, query: str, queue: asyncio.Queue):
+        try:
+            raw = await self.client.search(query, clean=True)
+            await self._archive("search", {"q": query, "clean": True}, raw)
+            results = parse_search_results(raw)
+        except Exception as e:
+            logger.error(f"Error searching podcasts for {query}: {e}")
+            return
+
+        if results.status == "true":
+            logger.info(f"Got {results.count} podcast for query ({results.query})")
+            await self._crawl_feeds(results.feeds, f"query {query}", queue)
+
+    async def _crawl_trending(self, kwargs: dict, queue: asyncio.Queue):
+        label = f"trending {kwargs.get('lang')} {kwargs.get('categories')}"
+        try:
+            raw = await self.client.trending_podcasts(**kwargs)
+            await self._archive("trending", kwargs, raw)
+            results = parse_trending_results(raw)
+        except Exception as e:
+            logger.error(f"Error fetching {label} podcasts: {e}")
+            return
+
+        if results.status == "true":
+            logger.info(f"Found {results.count} {label} podcasts")
+            await self._crawl_feeds(results.feeds, label, queue)
+
+    async def _crawl_episodes(self, podcast: Feed, queue: asyncio.Queue):
+        since = None
+        if self.states is not None:
+            since = episodes_since(self.states.get(podcast.id))
+        try:
+            raw = await self.client.episodes(podcast, since=since)
+            if raw is not None:
+                request = {"feed_id": podcast.id, "since": since}
+                await self._archive("episodes", request, raw)
+            episodes = parse_episodes_results(raw) if raw is not None else None
+        except Exception as e:
+            logger.error(f"Error processing episodes for {podcast.title}: {e}")
+            return
+
+        if episodes and episodes.status == "true" and episodes.items:
+            logger.info(f"Got {len(episodes.items)} episodes for {podcast.title}")
+            await queue.put(("episodes", episodes.items, podcast.title, podcast))
+        elif since is not None and episodes and episodes.status == "true":
+            # Nothing new since the watermark, still record the feed markers
+            logger.info(f"No new episodes for {podcast.title}")
+            await queue.put(("episodes", [], podcast.title, podcast))
+        else:
+            logger.warning(f"No episodes found for podcast: {podcast.title}")
@@ -1,18 +1,25 @@
+import hashlib
 from datetime import datetime
-from typing import Union
+from typing import Optional, Union
 
-from sqlalchemy import select
+from sqlalchemy import case, func, literal_column, select, tuple_
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
 
-from better_search.lib.podcast_index.models import Podcast, Episode
+from better_search.lib.podcast_index.crawl_state import next_crawl_state
+from better_search.lib.podcast_index.models import FeedCrawlState, Podcast, Episode
+from better_search.lib.text.normalize import clean_description, make_snippet
 from better_search.lib.podcast_index.schemas import (
     SearchResults,
     TrendingResults,
     PodcastEpisode,
     SearchFeed,
     TrendingFeed,
+    IngestEpisode,
+    IngestFeed,
 )
 
 
@@ -38,97 +45,198 @@ def add_podcast(podcast: SearchFeed, session: Session):
         return None
 
 
-def get_existing_podcasts(urls: list[str], session: Session) -> dict:
-    query = select(Podcast).where(Podcast.url.in_(urls))
-    results = session.execute(query)
-    return {podcast.url: podcast for podcast in results.scalars()}
+def _md5(text: str) -> str:
+    return hashlib.md5(text.encode("utf-8")).hexdigest()
 
 
-def add_bulk_podcasts(
-    podcasts: list[Union[SearchFeed, TrendingFeed]], session: Session
-):
-    try:
-        podcast_urls = [podcast.url for podcast in podcasts]
-        existing_podcasts = get_existing_podcasts(podcast_urls, session)
+def _get_stored_rows(
+    model, key: str, keys: list, columns: list[str], session: Session, hashed=()
+) -> dict:
+    # The stored values an upsert of these keys would compare against, the
+    # hashed (long text) columns come back as their md5
+    table = model.__table__
+    query = select(
+        table.c[key],
+        *(
+            (
+                func.md5(table.c[column]).label(column)
+                if column in hashed
+                else table.c[column]
+            )
+            for column in columns
+        ),
+    ).where(table.c[key].in_(keys))
+    return {row[0]: row._mapping for row in session.execute(query)}
 
-        new_podcasts = [
-            podcast for podcast in podcasts if podcast.url not in existing_podcasts
-        ]
 
-        if new_podcasts:
-            podcasts_model = [
-                Podcast(
-                    url=podcast.url,
-                    title=podcast.title,
-                    description=(
-                        podcast.description if hasattr(podcast, "description") else None
-                    ),
-                    author=podcast.author if hasattr(podcast, "author") else None,
-                    image_url=podcast.image,
-                    itunesId=podcast.itunesId if hasattr(podcast, "itunesId") else None,
-                    podcastGuid=(
-                        podcast.podcastGuid if hasattr(podcast, "podcastGuid") else None
-                    ),
-                    podcastindex_id=podcast.id,
-                    categories=(
-                        list(podcast.categories.values()) if podcast.categories else []
-                    ),
-                )
-                for podcast in new_podcasts
-            ]
-            session.add_all(podcasts_model)
-            session.commit()
+def _is_unchanged(row: dict, stored, hashed=()) -> bool:
+    # Same rule as the ON CONFLICT WHERE below: a NULL keeps the stored value
+    return stored is not None and all(
+        row[column] is None
+        or (_md5(row[column]) if column in hashed else row[column]) == value
+        for column, value in stored.items()
+        if column in row
+    )
 
-        return len(existing_podcasts) + len(new_podcasts)
-    except IntegrityError:
+
+def _upsert_rows(model, rows: list[dict], key: str, session: Session) -> dict:
+    # INSERT ... ON CONFLICT sent as an executemany: the statement is compiled
+    # once and cached, sqlalchemy's insertmanyvalues batches the rows into
+    # multi-row VALUES. Conflicting rows are only rewritten when a field
+    # actually changed, and xmax = 0 in RETURNING tells fresh inserts from
+    # updates. Unchanged rows are not returned at all. Incoming NULLs keep the
+    # stored value, search and trending feeds do not carry the same fields.
+    table = model.__table__
+    # Postgres refuses to update the same row twice in one statement, so the
+    # batch is deduplicated (last one wins). Sorting by key makes concurrent
+    # writers lock rows in the same order.
+    rows = sorted({row[key]: row for row in rows}.values(), key=lambda row: row[key])
+    if not rows:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    stmt = pg_insert(table)
+    columns = [column for column in rows[0] if column != key]
+    updates = {
+        column: func.coalesce(stmt.excluded[column], table.c[column])
+        for column in columns
+    }
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_=updates,
+        where=tuple_(*(table.c[column] for column in columns)).is_distinct_from(
+            tuple_(*updates.values())
+        ),
+    ).returning(literal_column("xmax = 0"))
+
+    inserted = session.execute(stmt, rows).scalars().all()
+    return {
+        "inserted": sum(inserted),
+        "updated": len(inserted) - sum(inserted),
+        "unchanged": len(rows) - len(inserted),
+    }
+
+
+def upsert_podcasts(
+    podcasts: list[Union[SearchFeed, TrendingFeed, IngestFeed]], session: Session
+) -> Optional[dict]:
+    if not podcasts:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+
+    rows = [
+        dict(
+            url=podcast.url,
+            title=podcast.title,
+            description=getattr(podcast, "description", None),
+            author=getattr(podcast, "author", None),
+            image_url=podcast.image,
+            itunesId=getattr(podcast, "itunesId", None),
+            podcastGuid=getattr(podcast, "podcastGuid", None),
+            podcastindex_id=podcast.id,
+            categories=list(podcast.categories.values()) if podcast.categories else [],
+        )
+        for podcast in podcasts
+    ]
+    try:
+        # Feeds that match the stored row are not sent at all, an ON CONFLICT
+        # that skips them still has to find and lock every row
+        stored = _get_stored_rows(
+            Podcast,
+            "url",
+            [row["url"] for row in rows],
+            [column for column in rows[0] if column != "url"],
+            session,
+            hashed=("description",),
+        )
+        changed = [
+            row
+            for row in rows
+            if not _is_unchanged(row, stored.get(row["url"]), ("description",))
+        ]
+        stats = _upsert_rows(Podcast, changed, "url", session)
+        stats["unchanged"] += len(rows) - len(changed)
+        session.commit()
+        return stats
+    except IntegrityError as e:
+        print(f"IntegrityError while saving podcasts: {str(e)}")
         session.rollback()
         return None
 
 
+def add_bulk_podcasts(
+    podcasts: list[Union[SearchFeed, TrendingFeed, IngestFeed]], session: Session
+):
+    stats = upsert_podcasts(podcasts, session)
+    if stats is None:
+        return None
+    return stats["inserted"] + stats["updated"] + stats["unchanged"]
+
+
 def get_podcast_id(podcastindex_id: int, session: Session):
     query = select(Podcast.id).where(Podcast.podcastindex_id == podcastindex_id)
     results = session.execute(query)
     return results.scalar()
 
 
-def get_existing_episode_guids(guids: list[str], session: Session) -> set[str]:
-    query = select(Episode.guid).where(Episode.guid.in_(guids))
-    results = session.scalars(query)
-    return set(results)
+def _episode_content_hash(
+    episode: Union[PodcastEpisode, IngestEpisode], podcast_id: int
+) -> str:
+    # Runs for every crawled episode, so a plain unit separated string
+    # rather than json
+    fields = (
+        f"{episode.title}\x1f{episode.description}\x1f{episode.datePublished}"
+        f"\x1f{episode.duration}\x1f{episode.feedItunesId}\x1f{episode.image}"
+        f"\x1f{episode.id}\x1f{podcast_id}"
+    )
+    return hashlib.sha1(fields.encode("utf-8")).hexdigest()
 
 
-def add_bulk_episodes(episodes: list[PodcastEpisode], session: Session):
+def upsert_episodes(
+    episodes: list[Union[PodcastEpisode, IngestEpisode]], session: Session
+) -> Optional[dict]:
+    if not episodes:
+        return {"inserted": 0, "updated": 0, "unchanged": 0}
+
     try:
         podcast_id = get_podcast_id(episodes[0].feedId, session)
         if not podcast_id:
             return None
 
-        episode_guids = [episode.guid for episode in episodes]
-        existing_guids = get_existing_episode_guids(episode_guids, session)
-        new_episodes = [
-            episode for episode in episodes if episode.guid not in existing_guids
-        ]
-
-        if not new_episodes:
-            return 0
-
-        episodes_model = [
-            Episode(
-                title=episode.title,
-                description=episode.description,
-                guid=episode.guid,
-                date_published=datetime.fromtimestamp(episode.datePublished),
-                duration=episode.duration,
-                feedItunesId=episode.feedItunesId,
-                image=episode.image,
-                podcastindex_id=episode.id,
-                podcast_id=podcast_id,
+        # Most of a re-crawl is unchanged. Episodes whose stored content_hash
+        # matches are dropped before the upsert (one narrow SELECT), so they
+        # are neither cleaned, which is the html parsing, nor sent.
+        stored = dict(
+            session.execute(
+                select(Episode.guid, Episode.content_hash).where(
+                    Episode.guid.in_([episode.guid for episode in episodes])
+                )
+            ).all()
+        )
+        rows = []
+        for episode in episodes:
+            content_hash = _episode_content_hash(episode, podcast_id)
+            if stored.get(episode.guid) == content_hash:
+                continue
+            cleaned = clean_description(episode.description)
+            rows.append(
+                dict(
+                    title=episode.title,
+                    description=episode.description,
+                    clean_description=cleaned,
+                    snippet=make_snippet(cleaned),
+                    content_hash=content_hash,
+                    guid=episode.guid,
+                    date_published=datetime.fromtimestamp(episode.datePublished),
+                    duration=episode.duration,
+                    feedItunesId=episode.feedItunesId,
+                    image=episode.image,
+                    podcastindex_id=episode.id,
+                    podcast_id=podcast_id,
+                )
             )
-            for episode in new_episodes
-        ]
-        session.add_all(episodes_model)
+        stats = _upsert_rows(Episode, rows, "guid", session)
+        stats["unchanged"] += len(episodes) - len(rows)
         session.commit()
-        return len(episodes_model)
+        return stats
     except IntegrityError as e:
         print(f"IntegrityError while saving episodes: {str(e)}")
         session.rollback()
@@ -137,3 +245,86 @@ def add_bulk_episodes(episodes: list[PodcastEpisode], session: Session):
         print(f"Unexpected error while saving episodes: {str(e)}")
         session.rollback()
         return None
+
+
+def add_bulk_episodes(
+    episodes: list[Union[PodcastEpisode, IngestEpisode]], session: Session
+):
+    stats = upsert_episodes(episodes, session)
+    return stats["inserted"] if stats is not None else None
+
+
+def get_feed_crawl_states(
+    podcastindex_ids: Optional[list[int]], session: Session
+) -> dict:
+    # Plain rows rather than ORM objects, they stay readable after a commit
+    # and can be handed to other threads. None loads every feed.
+    query = select(
+        FeedCrawlState.podcastindex_id,
+        FeedCrawlState.last_update_time,
+        FeedCrawlState.newest_item_pubdate,
+        FeedCrawlState.newest_episode_at,
+    )
+    if podcastindex_ids is not None:
+        query = query.where(FeedCrawlState.podcastindex_id.in_(podcastindex_ids))
+    results = session.execute(query)
+    return {row.podcastindex_id: row for row in results}
+
+
+def save_feed_crawl_state(
+    feed: Union[SearchFeed, TrendingFeed, IngestFeed],
+    episodes: list[Union[PodcastEpisode, IngestEpisode]],
+    session: Session,
+):
+    # Only called once the feed's episodes are stored, so a failed write
+    # keeps the old watermark and the episodes are fetched again next run
+    state = session.get(FeedCrawlState, feed.id)
+    values = next_crawl_state(feed, episodes, state)
+    if state is None:
+        state = FeedCrawlState(podcastindex_id=feed.id)
+        session.add(state)
+    state.last_update_time = values["last_update_time"]
+    state.newest_item_pubdate = values["newest_item_pubdate"]
+    state.newest_episode_at = values["newest_episode_at"]
+    state.last_crawled_at = datetime.utcnow()
+    session.commit()
+    return values
+
+
+def _episodes_display_query(episode_ids: list[int]):
+    return (
+        select(
+            Episode.id,
+            Episode.image,
+            Episode.clean_description,
+            Episode.snippet,
+            # The raw html only crosses the wire for rows not backfilled yet
+            case(
+                (Episode.clean_description.is_(None), Episode.description),
+                else_=None,
+            ).label("description"),
+            Episode.duration,
+            Episode.date_published,
+            Podcast.image_url.label("podcast_image_url"),
+        )
+        .join(Podcast, Episode.podcast_id == Podcast.id)
+        .where(Episode.id.in_(episode_ids))
+    )
+
+
+def get_episodes_display_info(episode_ids: list[int], session: Session) -> dict:
+    if not episode_ids:
+        return {}
+
+    results = session.execute(_episodes_display_query(episode_ids))
+    return {row.id: row for row in results}
+
+
+async def aget_episodes_display_info(
+    episode_ids: list[int], session: AsyncSession
+) -> dict:
+    if not episode_ids:
+        return {}
+
+    results = await session.execute(_episodes_display_query(episode_ids))
+    return {row.id: row for row in results}
@@ -37,6 +37,11 @@ class Episode(Base):
     id = Column(Integer, primary_key=True, index=True)
     title = Column(String(255), nullable=False)
     description = Column(Text)
+    # Computed at ingestion so search never parses the raw RSS html
+    clean_description = Column(Text, nullable=True)
+    snippet = Column(String(320), nullable=True)
+    # sha1 of the ingested fields, a re-crawl skips episodes that match it
+    content_hash = Column(String(40), nullable=True)
     guid = Column(String(512), nullable=False, unique=True)
     date_published = Column(DateTime, nullable=True)
     duration = Column(Integer)  # in seconds
@@ -46,3 +51,14 @@ class Episode(Base):
     podcast_id = Column(Integer, ForeignKey("podcasts.id"), nullable=False)
 
     podcast = relationship("Podcast", back_populates="episodes")
+
+
+class FeedCrawlState(Base):
+    __tablename__ = "feed_crawl_state"
+
+    # Watermarks are unix timestamps as reported by Podcast Index
+    podcastindex_id = Column(BigInteger, primary_key=True)
+    last_update_time = Column(BigInteger, nullable=True)
+    newest_item_pubdate = Column(BigInteger, nullable=True)
+    newest_episode_at = Column(BigInteger, nullable=True)
+    last_crawled_at = Column(DateTime, nullable=False)
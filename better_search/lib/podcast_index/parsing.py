@@ -0,0 +1,44 @@
+import json
+from typing import Any, Dict, Union
+
+from pydantic import BaseModel
+
+from better_search.core.config import settings
+from better_search.lib.podcast_index.schemas import (
+    EpisodesResults,
+    IngestEpisodesResults,
+    IngestFeedResults,
+    SearchResults,
+    TrendingResults,
+)
+
+# Response body as bytes (async client and archive replays) or already decoded
+# (python-podcastindex)
+Payload = Union[bytes, str, Dict[str, Any]]
+
+ParsedSearch = Union[SearchResults, IngestFeedResults]
+ParsedTrending = Union[TrendingResults, IngestFeedResults]
+ParsedEpisodes = Union[EpisodesResults, IngestEpisodesResults]
+
+
+def _parse(full: type[BaseModel], slim: type[BaseModel], payload: Payload):
+    if settings.PODCAST_INDEX_SLIM_SCHEMAS:
+        if isinstance(payload, dict):
+            return slim.model_validate(payload)
+        return slim.model_validate_json(payload)
+
+    if not isinstance(payload, dict):
+        payload = json.loads(payload)
+    return full(**payload)
+
+
+def parse_search_results(payload: Payload) -> ParsedSearch:
+    return _parse(SearchResults, IngestFeedResults, payload)
+
+
+def parse_trending_results(payload: Payload) -> ParsedTrending:
+    return _parse(TrendingResults, IngestFeedResults, payload)
+
+
+def parse_episodes_results(payload: Payload) -> ParsedEpisodes:
+    return _parse(EpisodesResults, IngestEpisodesResults, payload)
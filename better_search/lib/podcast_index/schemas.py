@@ -106,3 +106,45 @@ class TrendingResults(BaseModel):
     max: int
     since: str
     description: str
+
+
+# Slim ingestion schemas, only the fields the crawler and dal.py read. Unknown
+# keys are ignored, so validating a response skips the rest of the payload.
+class IngestFeed(BaseModel):
+    id: int
+    url: str
+    title: str
+    description: Optional[str] = None
+    author: Optional[str] = None
+    image: Optional[str] = None
+    itunesId: Optional[int] = None
+    podcastGuid: Optional[str] = None
+    categories: Optional[Dict[str, str]] = None
+    lastUpdateTime: Optional[int] = None
+    newestItemPubdate: Optional[int] = None
+    newestItemPublishTime: Optional[int] = None
+
+
+class IngestEpisode(BaseModel):
+    id: int
+    title: str
+    description: str
+    guid: str
+    datePublished: int
+    duration: int
+    image: Optional[str] = None
+    feedItunesId: Optional[int] = None
+    feedId: Optional[int] = None
+
+
+class IngestFeedResults(BaseModel):
+    status: str
+    feeds: List[IngestFeed]
+    count: int
+    query: Optional[str] = None
+
+
+class IngestEpisodesResults(BaseModel):
+    status: str
+    items: List[IngestEpisode]
+    count: int
@@ -1,20 +1,28 @@
-import re
-import unicodedata
 from typing import List, Optional, Tuple, Dict, Any, Union
 
 from better_search.core.config import settings
 from better_search.core.logger import get_logger
+from better_search.lib.podcast_index.archive import RawArchive
+from better_search.lib.text.normalize import (  # noqa: F401
+    clean_description,
+    normalize_arabic,
+    normalize_query,
+)
+from better_search.lib.podcast_index.parsing import (
+    ParsedEpisodes,
+    ParsedSearch,
+    ParsedTrending,
+    parse_episodes_results,
+    parse_search_results,
+    parse_trending_results,
+)
 from better_search.lib.podcast_index.schemas import (
-    TrendingResults,
-    SearchResults,
     TrendingFeed,
     SearchFeed,
-    PodcastEpisode,
-    EpisodesResults,
+    IngestFeed,
 )
 
 import podcastindex
-from bs4 import BeautifulSoup
 
 logger = get_logger()
 
@@ -37,27 +45,37 @@ def get_trending_podcasts(
     categories: Optional[List[int]] = None,
     not_categories: Optional[List[int]] = None,
     since: Optional[int] = None,
-) -> Tuple[Optional[TrendingResults], Optional[Dict[str, Any]]]:
+    archive: Optional[RawArchive] = None,
+) -> Tuple[Optional[ParsedTrending], Optional[Dict[str, Any]]]:
     try:
-        trending_raw = index.trendingPodcasts(
+        request = dict(
             lang=language,
             max=max_results,
             categories=categories,
             not_categories=not_categories,
             since=since,
         )
-        return TrendingResults(**trending_raw), trending_raw
+        trending_raw = index.trendingPodcasts(**request)
+        if archive:
+            archive.write("trending", request, trending_raw)
+        return parse_trending_results(trending_raw), trending_raw
     except Exception as e:
         logger.error(f"Error fetching trending podcasts: {e}")
         return None, None
 
 
 def search_podcasts(
-    index, query: str, clean: bool = True, max_results: int = 50
-) -> Tuple[Optional[SearchResults], Optional[Dict[str, Any]]]:
+    index,
+    query: str,
+    clean: bool = True,
+    max_results: int = 50,
+    archive: Optional[RawArchive] = None,
+) -> Tuple[Optional[ParsedSearch], Optional[Dict[str, Any]]]:
     try:
         search_raw = index.search(query, clean=clean)
-        return SearchResults(**search_raw), search_raw
+        if archive:
+            archive.write("search", {"q": query, "clean": clean}, search_raw)
+        return parse_search_results(search_raw), search_raw
     except Exception as e:
         logger.error(f"Error searching podcasts: {e}")
         return None, None
@@ -65,28 +83,39 @@ def search_podcasts(
 
 def get_podcast_episodes(
     index,
-    podcast: Union[TrendingFeed, SearchFeed],
+    podcast: Union[TrendingFeed, SearchFeed, IngestFeed],
     max_results: int = 1000,
     fulltext: bool = True,
-) -> Optional[EpisodesResults]:
+    archive: Optional[RawArchive] = None,
+    since: Optional[int] = None,
+) -> Optional[ParsedEpisodes]:
     episodes_raw = None
 
     try:
         if hasattr(podcast, "podcastGuid") and podcast.podcastGuid:
             episodes_raw = index.episodesByPodcastGuid(
-                podcast.podcastGuid, max_results=max_results, fulltext=fulltext
+                podcast.podcastGuid,
+                since=since,
+                max_results=max_results,
+                fulltext=fulltext,
             )
             logger.info(f"Retrieved episodes by podcast GUID: {podcast.podcastGuid}")
 
         elif hasattr(podcast, "itunesId") and podcast.itunesId and not episodes_raw:
             episodes_raw = index.episodesByItunesId(
-                podcast.itunesId, max_results=max_results, fulltext=fulltext
+                podcast.itunesId,
+                since=since,
+                max_results=max_results,
+                fulltext=fulltext,
             )
             logger.info(f"Retrieved episodes by iTunes ID: {podcast.itunesId}")
 
         elif hasattr(podcast, "id") and podcast.id and not episodes_raw:
             episodes_raw = index.episodesByFeedId(
-                podcast.id, max_results=max_results, fulltext=fulltext
+                podcast.id,
+                since=since,
+                max_results=max_results,
+                fulltext=fulltext,
             )
             logger.info(f"Retrieved episodes by feed ID: {podcast.id}")
 
@@ -97,7 +126,11 @@ def get_podcast_episodes(
             return None
 
         if episodes_raw and isinstance(episodes_raw, dict):
-            return EpisodesResults(**episodes_raw)
+            if archive:
+                archive.write(
+                    "episodes", {"feed_id": podcast.id, "since": since}, episodes_raw
+                )
+            return parse_episodes_results(episodes_raw)
         return None
 
     except Exception as e:
@@ -128,39 +161,3 @@ def format_duration(seconds: int) -> str:
     if hours > 0:
         return f"{hours}:{minutes:02d}:{remaining_seconds:02d}"
     return f"{minutes}:{remaining_seconds:02d}"
-
-
-def clean_description(text: str) -> str:
-    if not text:
-        return ""
-
-    soup = BeautifulSoup(text, "html.parser")
-
-    clean_text = soup.get_text(separator=" ", strip=True)
-
-    clean_text = re.sub(
-        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
-        "",
-        clean_text,
-    )
-
-    clean_text = re.sub(r"[\w\.-]+@[\w\.-]+\.\w+", "", clean_text)
-
-    clean_text = re.sub(r"\s+", " ", clean_text)
-    clean_text = clean_text.strip()
-
-    return clean_text
-
-
-def normalize_arabic(text: str) -> str:
-    tashkeel = re.compile(r"[\u0617-\u061A\u064B-\u0652]")
-    text = tashkeel.sub("", text)
-
-    text = re.sub("\u0640", "", text)
-
-    text = re.sub("[إأٱآا]", "ا", text)
-    text = re.sub("ى", "ي", text)
-    text = re.sub("ة", "ه", text)
-
-    text = unicodedata.normalize("NFKC", text)
-    return text
@@ -0,0 +1,130 @@
+import html
+import re
+import unicodedata
+from concurrent.futures import Executor, ProcessPoolExecutor
+from html.entities import name2codepoint
+from typing import Callable, Optional
+
+from bs4 import BeautifulSoup
+
+# Arabic folding in one str.translate pass: tashkeel and tatweel are dropped,
+# alef variants fold to bare alef, alef maksura to ya and ta marbuta to ha.
+_ARABIC_TABLE = str.maketrans(
+    {
+        **{chr(c): None for c in range(0x0617, 0x061A + 1)},
+        **{chr(c): None for c in range(0x064B, 0x0652 + 1)},
+        "\u0640": None,
+        "إ": "ا",
+        "أ": "ا",
+        "ٱ": "ا",
+        "آ": "ا",
+        "ى": "ي",
+        "ة": "ه",
+    }
+)
+
+_URL_RE = re.compile(
+    r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+)
+_EMAIL_RE = re.compile(r"[\w\.-]+@[\w\.-]+\.\w+")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+# Plain tags (quoted attributes may contain ">") are stripped with a regex,
+# anything html.parser treats specially is left to BeautifulSoup.
+_TAG_RE = re.compile(r"</?[a-zA-Z][^>\"']*(?:(?:\"[^\"]*\"|'[^']*')[^>\"']*)*>")
+_RAW_TEXT_RE = re.compile(r"<\s*(?:script|style)\b", re.IGNORECASE)
+_ENTITY_RE = re.compile(r"&(?:#[0-9]+|#[xX][0-9a-fA-F]+|[a-zA-Z][a-zA-Z0-9]*);")
+_AMPERSAND_RE = re.compile(r"&[#a-zA-Z]")
+
+SNIPPET_MAX_CHARS = 300
+
+
+def _is_simple_entity(match: re.Match) -> bool:
+    entity = match.group(0)[1:-1]
+    return entity.startswith("#") or entity in name2codepoint
+
+
+def _fast_html_text(text: str):
+    # Returns None when the markup needs the real parser
+    if "&" in text:
+        entities = list(_ENTITY_RE.finditer(text))
+        if not all(_is_simple_entity(match) for match in entities):
+            return None
+        if len(entities) != len(_AMPERSAND_RE.findall(text)):
+            return None
+
+    if "<" in text:
+        if _RAW_TEXT_RE.search(text):
+            return None
+        pieces = _TAG_RE.split(text)
+        if any("<" in piece for piece in pieces):
+            return None
+    else:
+        pieces = [text]
+
+    # Mirrors get_text(separator=" ", strip=True)
+    pieces = (html.unescape(piece).strip() for piece in pieces)
+    return " ".join(piece for piece in pieces if piece)
+
+
+def html_to_text(text: str) -> str:
+    fast = _fast_html_text(text)
+    if fast is not None:
+        return fast
+    return BeautifulSoup(text, "html.parser").get_text(separator=" ", strip=True)
+
+
+def clean_description(text: str) -> str:
+    if not text:
+        return ""
+
+    clean_text = html_to_text(text)
+    clean_text = _URL_RE.sub("", clean_text)
+    clean_text = _EMAIL_RE.sub("", clean_text)
+    return _WHITESPACE_RE.sub(" ", clean_text).strip()
+
+
+def normalize_arabic(text: str) -> str:
+    text = text.translate(_ARABIC_TABLE)
+    if not unicodedata.is_normalized("NFKC", text):
+        text = unicodedata.normalize("NFKC", text)
+    return text
+
+
+def make_snippet(text: str, max_chars: int = SNIPPET_MAX_CHARS) -> str:
+    if len(text) <= max_chars:
+        return text
+
+    # Cut at the last word boundary that leaves room for the ellipsis
+    cut = text[: max_chars - 1]
+    if " " in cut:
+        cut = cut[: cut.rindex(" ")]
+    return cut.rstrip() + "…"
+
+
+def normalize_query(query: str) -> str:
+    return " ".join(normalize_arabic(query).split())
+
+
+def normalize_description(text: str) -> str:
+    return normalize_arabic(clean_description(text))
+
+
+def map_texts(
+    func: Callable[[str], str],
+    texts: list[str],
+    workers: int = 0,
+    chunksize: int = 256,
+    executor: Optional[Executor] = None,
+) -> list[str]:
+    # func has to be a module level function so it can be sent to the workers.
+    # Callers mapping many batches pass their own executor, a new pool per
+    # call pays for process startup and imports every time.
+    if len(texts) <= chunksize or (executor is None and workers <= 1):
+        return [func(text) for text in texts]
+
+    if executor is not None:
+        return list(executor.map(func, texts, chunksize=chunksize))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return list(pool.map(func, texts, chunksize=chunksize))
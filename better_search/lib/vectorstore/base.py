@@ -1,11 +1,51 @@
 from pathlib import Path
+from typing import Literal, Optional
 from uuid import uuid4
 
 from better_search.core.config import settings
+from better_search.lib.vectorstore.uploader import ParallelUploader
 
 from pydantic import UUID4
 from qdrant_client import QdrantClient, models
 
+DOCUMENT_MIN_TOKEN_LEN = 2
+
+# Payload fields used in filters, "document" backs the keyword prefetch of
+# HybridSearch and the ids/categories are used to scope searches.
+PAYLOAD_INDEXES = {
+    "document": models.TextIndexParams(
+        type=models.TextIndexType.TEXT,
+        tokenizer=models.TokenizerType.WORD,
+        min_token_len=DOCUMENT_MIN_TOKEN_LEN,
+        lowercase=True,
+    ),
+    "podcast_id": models.PayloadSchemaType.INTEGER,
+    "episode_id": models.PayloadSchemaType.INTEGER,
+    "podcast_categories": models.PayloadSchemaType.KEYWORD,
+}
+
+QuantizationType = Literal["none", "scalar", "binary"]
+
+
+def get_quantization_config(
+    quantization: Optional[QuantizationType],
+) -> Optional[models.QuantizationConfig]:
+    # Quantized vectors stay in RAM for the HNSW walk, the float32 originals
+    # are only read from disk when rescoring the oversampled candidates.
+    if quantization == "scalar":
+        return models.ScalarQuantization(
+            scalar=models.ScalarQuantizationConfig(
+                type=models.ScalarType.INT8,
+                quantile=0.99,
+                always_ram=True,
+            )
+        )
+    if quantization == "binary":
+        return models.BinaryQuantization(
+            binary=models.BinaryQuantizationConfig(always_ram=True)
+        )
+    return None
+
 
 class VectorStore:
     def __init__(self, client: QdrantClient = None):
@@ -19,7 +59,12 @@ class VectorStore:
                 path.mkdir(parents=True)
                 self.client = QdrantClient(path=path)
 
-    def create_collection(self, collection_name: str, vector_size: int = 1536):
+    def create_collection(
+        self,
+        collection_name: str,
+        vector_size: int = 1536,
+        quantization: Optional[QuantizationType] = None,
+    ):
         if not self.client.collection_exists(collection_name):
             self.client.create_collection(
                 collection_name=collection_name,
@@ -28,12 +73,34 @@ class VectorStore:
                     distance=models.Distance.COSINE,
                     on_disk=True,
                 ),
+                quantization_config=get_quantization_config(quantization),
             )
             print(f"Collection {collection_name} created")
+            self.create_payload_indexes(collection_name)
             return True
 
         print(f"Collection {collection_name} already exists")
 
+    def create_payload_indexes(self, collection_name: str):
+        if not self.client.collection_exists(collection_name):
+            print(f"Collection {collection_name} does not exist")
+            return
+
+        # Only missing indexes are created, so this doubles as a backfill for
+        # collections built before the indexes existed.
+        existing = self.client.get_collection(collection_name).payload_schema
+        for field_name, field_schema in PAYLOAD_INDEXES.items():
+            if field_name in existing:
+                continue
+
+            self.client.create_payload_index(
+                collection_name=collection_name,
+                field_name=field_name,
+                field_schema=field_schema,
+                wait=True,
+            )
+            print(f"Payload index on {field_name} created in {collection_name}")
+
     def delete_collection(self, collection_name: str):
         if not self.client.collection_exists(collection_name):
             print(f"Collection {collection_name} does not exist")
@@ -48,6 +115,8 @@ class VectorStore:
         vectors: list[list[float]],
         payload: list[dict] = None,
         ids: list[str] = None,
+        batch_size: int = settings.UPLOAD_BATCH_SIZE,
+        parallelism: int = settings.UPLOAD_PARALLELISM,
     ):
         if not self.client.collection_exists(collection_name):
             print(f"Collection {collection_name} does not exist")
@@ -56,16 +125,23 @@ class VectorStore:
         if not ids:
             ids = [str(uuid4()) for _ in range(len(vectors))]
 
-        points = [
+        points = (
             models.PointStruct(
                 id=ids[idx],
                 vector=vector,
                 payload=payload[idx] if payload else {},
             )
             for idx, vector in enumerate(vectors)
-        ]
+        )
 
-        self.client.upsert(collection_name=collection_name, points=points)
+        # Sent in chunks over parallel requests instead of one giant upsert
+        with ParallelUploader(
+            self.client,
+            collection_name,
+            batch_size=batch_size,
+            parallelism=parallelism,
+        ) as uploader:
+            uploader.add(points)
         print(f"{len(vectors)} Vectors inserted in collection {collection_name}")
 
     def update_vectors(
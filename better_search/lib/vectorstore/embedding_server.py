@@ -0,0 +1,266 @@
+import asyncio
+import json
+import os
+import socket
+import struct
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable
+
+import numpy as np
+from fastembed import SparseEmbedding
+from fastembed.embedding import TextEmbedding
+from fastembed.sparse.bm25 import Bm25
+
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+
+logger = get_logger()
+
+# Every message is a 4 byte length prefixed JSON header followed by a 4 byte
+# length prefixed binary body. Requests carry {"kind", "text"} and no body,
+# responses carry the vector as raw float32 (dense) or uint32 indices followed
+# by float32 values (sparse).
+_LENGTH = struct.Struct("!I")
+
+
+def _pack(header: dict, body: bytes = b"") -> bytes:
+    header_bytes = json.dumps(header).encode("utf-8")
+    return (
+        _LENGTH.pack(len(header_bytes)) + header_bytes + _LENGTH.pack(len(body)) + body
+    )
+
+
+async def _read_message(reader: asyncio.StreamReader) -> tuple[bytes, bytes]:
+    # The header is returned undecoded, so a malformed one still leaves the
+    # stream at the next message
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    header = await reader.readexactly(size)
+    (size,) = _LENGTH.unpack(await reader.readexactly(_LENGTH.size))
+    body = await reader.readexactly(size) if size else b""
+    return header, body
+
+
+def _recv_exactly(sock: socket.socket, size: int) -> bytes:
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            raise ConnectionError("Embedding server closed the connection")
+        buffer.extend(chunk)
+    return bytes(buffer)
+
+
+def _encode_vector(kind: str, vector) -> tuple[dict, bytes]:
+    if kind == "dense":
+        return {"ok": True}, np.asarray(vector, dtype=np.float32).tobytes()
+
+    indices = np.asarray(vector.indices, dtype=np.uint32)
+    values = np.asarray(vector.values, dtype=np.float32)
+    return {"ok": True, "n": len(indices)}, indices.tobytes() + values.tobytes()
+
+
+def _decode_vector(kind: str, header: dict, body: bytes):
+    if kind == "dense":
+        return np.frombuffer(body, dtype=np.float32)
+
+    n = header["n"]
+    return SparseEmbedding(
+        indices=np.frombuffer(body, dtype=np.uint32, count=n),
+        values=np.frombuffer(body, dtype=np.float32, offset=n * 4, count=n),
+    )
+
+
+class EmbeddingServer:
+    def __init__(
+        self,
+        socket_path: str = settings.EMBEDDING_SERVER_SOCKET,
+        max_batch_size: int = settings.EMBEDDING_SERVER_MAX_BATCH_SIZE,
+        max_wait_ms: float = settings.EMBEDDING_SERVER_MAX_WAIT_MS,
+    ):
+        self.socket_path = socket_path
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.dense_model = TextEmbedding(settings.LOCAL_EMBEDDING_MODEL)
+        self.sparse_model = Bm25(settings.SPARSE_EMBEDDING_MODEL)
+        # One thread per model, ONNX parallelizes each batch internally
+        self._executor = ThreadPoolExecutor(
+            max_workers=2, thread_name_prefix="embedding-server"
+        )
+        self._queues: dict[str, asyncio.Queue] = {}
+
+    def _embed_dense(self, texts: list[str]) -> list:
+        return list(self.dense_model.query_embed(texts))
+
+    def _embed_sparse(self, texts: list[str]) -> list:
+        return list(self.sparse_model.query_embed(texts))
+
+    async def _batcher(self, queue: asyncio.Queue, embed: Callable):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await queue.get()]
+
+            # Collect whatever else arrives within the wait window
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+
+            texts = [text for text, _ in batch]
+            try:
+                vectors = await loop.run_in_executor(self._executor, embed, texts)
+            except Exception as e:
+                logger.error(f"Embedding batch of {len(texts)} failed: {e}")
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), vector in zip(batch, vectors):
+                if not future.done():
+                    future.set_result(vector)
+
+    def _parse_request(self, raw_request: bytes) -> tuple[str, str]:
+        try:
+            request = json.loads(raw_request)
+        except ValueError as e:
+            raise ValueError(f"malformed request header: {e}")
+        if not isinstance(request, dict):
+            raise ValueError("request header is not an object")
+
+        kind = request.get("kind")
+        if kind not in self._queues:
+            raise ValueError(
+                f"unknown kind {kind!r}, expected one of {sorted(self._queues)}"
+            )
+        if not isinstance(request.get("text"), str):
+            raise ValueError("request text is missing or not a string")
+        return kind, request["text"]
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        loop = asyncio.get_running_loop()
+        try:
+            while True:
+                raw_request, _ = await _read_message(reader)
+                try:
+                    kind, text = self._parse_request(raw_request)
+                    future = loop.create_future()
+                    await self._queues[kind].put((text, future))
+                    header, body = _encode_vector(kind, await future)
+                except Exception as e:
+                    header, body = {"ok": False, "error": str(e)}, b""
+                writer.write(_pack(header, body))
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def serve(self):
+        self._queues = {"dense": asyncio.Queue(), "sparse": asyncio.Queue()}
+        batchers = [
+            asyncio.create_task(
+                self._batcher(self._queues["dense"], self._embed_dense)
+            ),
+            asyncio.create_task(
+                self._batcher(self._queues["sparse"], self._embed_sparse)
+            ),
+        ]
+
+        if os.path.exists(self.socket_path):
+            os.unlink(self.socket_path)
+        server = await asyncio.start_unix_server(
+            self._handle_connection, path=self.socket_path
+        )
+        logger.info(
+            f"Embedding server listening on {self.socket_path} "
+            f"(max batch {self.max_batch_size}, max wait {self.max_wait * 1000}ms)"
+        )
+        try:
+            async with server:
+                await server.serve_forever()
+        finally:
+            for batcher in batchers:
+                batcher.cancel()
+
+
+class EmbeddingClient:
+    def __init__(
+        self,
+        socket_path: str = settings.EMBEDDING_SERVER_SOCKET,
+        timeout: float = settings.EMBEDDING_SERVER_TIMEOUT_SECONDS,
+    ):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        # Requests are sequential per connection, so each thread keeps its own
+        self._local = threading.local()
+
+    def _connection(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _close(self):
+        sock = getattr(self._local, "sock", None)
+        if sock is not None:
+            sock.close()
+            self._local.sock = None
+
+    def _request(self, kind: str, text: str):
+        message = _pack({"kind": kind, "text": text})
+        for attempt in range(2):
+            try:
+                sock = self._connection()
+                sock.sendall(message)
+                (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+                header = json.loads(_recv_exactly(sock, size))
+                (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+                body = _recv_exactly(sock, size) if size else b""
+                break
+            except (OSError, ConnectionError):
+                # A stale connection (e.g. server restart) gets one retry
+                self._close()
+                if attempt:
+                    raise
+
+        if not header["ok"]:
+            raise RuntimeError(f"Embedding server error: {header['error']}")
+        return _decode_vector(kind, header, body)
+
+    def embed_dense(self, text: str) -> np.ndarray:
+        return self._request("dense", text)
+
+    def embed_sparse(self, text: str) -> SparseEmbedding:
+        return self._request("sparse", text)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--socket", default=settings.EMBEDDING_SERVER_SOCKET)
+    parser.add_argument(
+        "--max-batch-size", type=int, default=settings.EMBEDDING_SERVER_MAX_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--max-wait-ms", type=float, default=settings.EMBEDDING_SERVER_MAX_WAIT_MS
+    )
+    args = parser.parse_args()
+
+    server = EmbeddingServer(
+        socket_path=args.socket,
+        max_batch_size=args.max_batch_size,
+        max_wait_ms=args.max_wait_ms,
+    )
+    asyncio.run(server.serve())
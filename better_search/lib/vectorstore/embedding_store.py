@@ -0,0 +1,209 @@
+import json
+import shutil
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+
+from better_search.core.logger import get_logger
+
+logger = get_logger()
+
+# A store holds the vectors of one (model, dims) pair in fixed width float32
+# shards, rows are appended and never rewritten in place. The index file is a
+# flat array of (sha256 digest, shard, row) records appended after the rows
+# they point to. A crash can leave unreferenced rows and a torn row at the end
+# of a shard, the torn row is cut off before the next append so new rows land
+# on whole row offsets.
+INDEX_DTYPE = np.dtype([("hash", "u1", (32,)), ("shard", "<u4"), ("row", "<u4")])
+DEFAULT_SHARD_ROWS = 65536
+
+
+def store_path(root: str, model: str, dims: int) -> Path:
+    return Path(root) / f"{model.replace('/', '--')}-{dims}"
+
+
+class EmbeddingStore:
+    def __init__(
+        self, root: str, model: str, dims: int, shard_rows: int = DEFAULT_SHARD_ROWS
+    ):
+        self.root = root
+        self.model = model
+        self.dims = dims
+        self.shard_rows = shard_rows
+        self.path = store_path(root, model, dims)
+        self.path.mkdir(parents=True, exist_ok=True)
+
+        meta_path = self.path / "meta.json"
+        if not meta_path.exists():
+            meta_path.write_text(json.dumps({"model": model, "dims": dims}))
+
+        self._index: dict[bytes, tuple[int, int]] = {}
+        self._maps: dict[int, np.memmap] = {}
+        self._load_index()
+
+    @property
+    def _index_path(self) -> Path:
+        return self.path / "index.bin"
+
+    def _shard_path(self, shard: int) -> Path:
+        return self.path / f"shard_{shard:05d}.f32"
+
+    def _shard_rows(self, shard: int) -> int:
+        path = self._shard_path(shard)
+        return path.stat().st_size // (self.dims * 4) if path.exists() else 0
+
+    def _append_rows(self, shard: int, rows: np.ndarray):
+        with open(self._shard_path(shard), "ab") as f:
+            f.truncate(self._shard_rows(shard) * self.dims * 4)
+            f.write(rows.tobytes())
+
+    def _load_index(self):
+        self._index.clear()
+        self._maps.clear()
+        if not self._index_path.exists():
+            return
+
+        raw = self._index_path.read_bytes()
+        # Ignore a torn record from an interrupted write
+        usable = len(raw) - len(raw) % INDEX_DTYPE.itemsize
+        records = np.frombuffer(raw[:usable], dtype=INDEX_DTYPE)
+        for digest, shard, row in zip(
+            records["hash"], records["shard"].tolist(), records["row"].tolist()
+        ):
+            self._index[digest.tobytes()] = (shard, row)
+
+    def _last_shard(self) -> int:
+        shards = sorted(self.path.glob("shard_*.f32"))
+        return int(shards[-1].stem.split("_")[1]) if shards else 0
+
+    def _memmap(self, shard: int, row: int) -> np.memmap:
+        vectors = self._maps.get(shard)
+        if vectors is None or row >= len(vectors):
+            # The shard grew since it was mapped, map it again at its new size
+            vectors = np.memmap(
+                self._shard_path(shard),
+                dtype=np.float32,
+                mode="r",
+                shape=(self._shard_rows(shard), self.dims),
+            )
+            self._maps[shard] = vectors
+        return vectors
+
+    def _vector(self, digest: bytes) -> np.ndarray:
+        shard, row = self._index[digest]
+        return self._memmap(shard, row)[row]
+
+    def __len__(self) -> int:
+        return len(self._index)
+
+    def __contains__(self, content_hash: str) -> bool:
+        return bytes.fromhex(content_hash) in self._index
+
+    def get_many(self, content_hashes: list[str]) -> list[Optional[np.ndarray]]:
+        vectors = []
+        for content_hash in content_hashes:
+            digest = bytes.fromhex(content_hash)
+            vectors.append(self._vector(digest) if digest in self._index else None)
+        return vectors
+
+    def put_many(self, content_hashes: list[str], vectors) -> int:
+        # Meant for a single writer, i.e. one indexing run at a time
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.dims)
+        pending: dict[bytes, int] = {}
+        for i, content_hash in enumerate(content_hashes):
+            digest = bytes.fromhex(content_hash)
+            if digest not in self._index and digest not in pending:
+                pending[digest] = i
+        if not pending:
+            return 0
+
+        digests = list(pending)
+        rows = vectors[list(pending.values())]
+        records = np.zeros(len(digests), dtype=INDEX_DTYPE)
+
+        shard = self._last_shard()
+        written = 0
+        while written < len(rows):
+            shard_rows = self._shard_rows(shard)
+            room = self.shard_rows - shard_rows
+            if room <= 0:
+                shard += 1
+                continue
+
+            chunk = rows[written : written + room]
+            self._append_rows(shard, chunk)
+            records["shard"][written : written + len(chunk)] = shard
+            records["row"][written : written + len(chunk)] = np.arange(
+                shard_rows, shard_rows + len(chunk)
+            )
+            written += len(chunk)
+
+        records["hash"] = np.frombuffer(b"".join(digests), dtype=np.uint8).reshape(
+            -1, 32
+        )
+        with open(self._index_path, "ab") as f:
+            f.write(records.tobytes())
+
+        for digest, shard, row in zip(
+            digests, records["shard"].tolist(), records["row"].tolist()
+        ):
+            self._index[digest] = (shard, row)
+        return len(digests)
+
+    def stats(self) -> dict:
+        files = list(self.path.iterdir())
+        return {
+            "model": self.model,
+            "dims": self.dims,
+            "entries": len(self._index),
+            "shards": len([f for f in files if f.suffix == ".f32"]),
+            "bytes": sum(f.stat().st_size for f in files),
+        }
+
+    def compact(self, keep: Optional[Iterable[str]] = None) -> int:
+        # Rewrites the store with only the kept hashes (all when keep is None),
+        # which also drops rows orphaned by interrupted writes.
+        if keep is None:
+            kept = list(self._index)
+        else:
+            wanted = {bytes.fromhex(content_hash) for content_hash in keep}
+            kept = [digest for digest in self._index if digest in wanted]
+        removed = len(self._index) - len(kept)
+
+        # Copy shard by shard so rows are read sequentially
+        kept.sort(key=self._index.__getitem__)
+        tmp_root = Path(self.root) / ".compact"
+        if tmp_root.exists():
+            shutil.rmtree(tmp_root)
+        compacted = EmbeddingStore(
+            str(tmp_root), self.model, self.dims, self.shard_rows
+        )
+        for start in range(0, len(kept), self.shard_rows):
+            digests = kept[start : start + self.shard_rows]
+            compacted.put_many(
+                [digest.hex() for digest in digests],
+                np.stack([self._vector(digest) for digest in digests]),
+            )
+
+        self._maps.clear()
+        old_path = self.path.with_name(self.path.name + ".old")
+        self.path.rename(old_path)
+        compacted.path.rename(self.path)
+        shutil.rmtree(old_path)
+        shutil.rmtree(tmp_root)
+        self._load_index()
+
+        logger.info(
+            f"Compacted embedding store {self.path}: kept {len(kept)}, "
+            f"removed {removed}"
+        )
+        return removed
+
+
+def list_stores(root: str) -> list[EmbeddingStore]:
+    stores = []
+    for meta_path in sorted(Path(root).glob("*/meta.json")):
+        meta = json.loads(meta_path.read_text())
+        stores.append(EmbeddingStore(root, meta["model"], meta["dims"]))
+    return stores
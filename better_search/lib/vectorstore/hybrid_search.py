@@ -1,5 +1,10 @@
-from typing import Annotated
-from qdrant_client import QdrantClient, models
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Annotated, Literal, Optional
+from qdrant_client import AsyncQdrantClient, QdrantClient, models
+from fastembed import SparseEmbedding
 from fastembed.embedding import TextEmbedding
 from fastembed.sparse.bm25 import Bm25
 
@@ -8,6 +13,44 @@ from pydantic import BaseModel
 from openai import OpenAI
 
 from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.lib.vectorstore.base import DOCUMENT_MIN_TOKEN_LEN
+from better_search.lib.vectorstore.embedding_server import EmbeddingClient
+from better_search.lib.cache.embedding_cache import QueryEmbeddingCache
+from better_search.lib.text.normalize import normalize_query
+
+logger = get_logger()
+
+# Payload keys read by _to_results, the (large) "document" is never fetched
+RESULT_PAYLOAD_FIELDS = [
+    "podcast_id",
+    "episode_id",
+    "title",
+    "podcast_name",
+    "podcast_author",
+    "podcast_categories",
+]
+
+# Written by the indexer with --display-payload, lets the route skip the db
+# Points indexed before "description" was added fall back to the db
+DISPLAY_PAYLOAD_FIELDS = [
+    "image",
+    "description",
+    "snippet",
+    "duration_formatted",
+    "date_published",
+]
+
+# Queries up to this many terms only use the sparse prefetches
+SHORT_QUERY_MAX_TERMS = 3
+
+
+class EpisodeDisplay(BaseModel):
+    image: Optional[str] = None
+    description: Optional[str] = None
+    snippet: Optional[str] = None
+    duration_formatted: Optional[str] = None
+    date_published: Optional[str] = None
 
 
 class HybridSearchResult(BaseModel):
@@ -18,6 +61,85 @@ class HybridSearchResult(BaseModel):
     podcast_author: str
     podcast_categoires: list
     sim_score: float
+    # Set when the point carries the display payload
+    display: Optional[EpisodeDisplay] = None
+
+
+class SearchProfile(BaseModel):
+    exact: bool
+    hnsw_ef: Optional[int] = None
+    dense_limit: int
+    sparse_limit: int
+    # Only used on quantized collections: ignore the quantized vectors, or
+    # fetch limit * oversampling candidates and rescore them on the originals
+    ignore_quantization: bool = False
+    oversampling: float = 2.0
+
+    def search_params(self) -> models.SearchParams:
+        return models.SearchParams(
+            hnsw_ef=self.hnsw_ef,
+            exact=self.exact,
+            quantization=models.QuantizationSearchParams(
+                ignore=self.ignore_quantization,
+                rescore=True,
+                oversampling=settings.SEARCH_QUANTIZATION_OVERSAMPLING
+                or self.oversampling,
+            ),
+        )
+
+
+SearchProfileName = Literal["exact", "balanced", "fast"]
+
+# exact brute-forces every prefetch (the historic behaviour), the others walk
+# the HNSW graph with a smaller ef and fewer candidates per prefetch.
+SEARCH_PROFILES: dict[str, SearchProfile] = {
+    "exact": SearchProfile(
+        exact=True,
+        hnsw_ef=256,
+        dense_limit=15,
+        sparse_limit=40,
+        ignore_quantization=True,
+    ),
+    "balanced": SearchProfile(
+        exact=False, hnsw_ef=128, dense_limit=15, sparse_limit=40, oversampling=2.0
+    ),
+    "fast": SearchProfile(
+        exact=False, hnsw_ef=64, dense_limit=10, sparse_limit=25, oversampling=1.5
+    ),
+}
+
+
+def get_search_profile(name: Optional[str] = None) -> SearchProfile:
+    return SEARCH_PROFILES[name or settings.DEFAULT_SEARCH_PROFILE]
+
+
+class EmbeddingTimings:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.dense_ms = 0.0
+        self.sparse_ms = 0.0
+        self.wall_ms = 0.0
+
+    def record(self, dense_ms: float, sparse_ms: float, wall_ms: float):
+        with self._lock:
+            self.count += 1
+            self.dense_ms += dense_ms
+            self.sparse_ms += sparse_ms
+            self.wall_ms += wall_ms
+
+    def stats(self) -> dict:
+        if not self.count:
+            return {"count": 0}
+        sequential_ms = (self.dense_ms + self.sparse_ms) / self.count
+        wall_ms = self.wall_ms / self.count
+        return {
+            "count": self.count,
+            "avg_dense_ms": self.dense_ms / self.count,
+            "avg_sparse_ms": self.sparse_ms / self.count,
+            "avg_wall_ms": wall_ms,
+            "avg_saved_ms": sequential_ms - wall_ms,
+        }
 
 
 class HybridSearch:
@@ -26,18 +148,103 @@ class HybridSearch:
         collection_name: str,
         url: str = settings.QDRANT_BASE_URL,
         mode: Annotated[str, "either 'openai' or 'local'"] = "local",
+        display_from_payload: bool = settings.SEARCH_RESULTS_FROM_PAYLOAD,
     ):
         self.collection_name = collection_name
+        self.payload_fields = RESULT_PAYLOAD_FIELDS + (
+            DISPLAY_PAYLOAD_FIELDS if display_from_payload else []
+        )
         self.client = QdrantClient(url=url)
+        self.async_client = AsyncQdrantClient(url=url)
         self.mode = mode
+        # With the server backend the local models live in one shared process
+        self.embedding_client = (
+            EmbeddingClient() if settings.EMBEDDING_BACKEND == "server" else None
+        )
         if mode == "local":
-            self.DENSE_MODEL = TextEmbedding(settings.LOCAL_EMBEDDING_MODEL)
+            self.DENSE_MODEL = (
+                None
+                if self.embedding_client
+                else TextEmbedding(settings.LOCAL_EMBEDDING_MODEL)
+            )
+            self.dense_model_name = settings.LOCAL_EMBEDDING_MODEL
         else:
             self.DENSE_MODEL = OpenAI(api_key=settings.OPENAI_API_KEY)
-        self.SPARSE_MODEL = Bm25(settings.SPARSE_EMBEDDING_MODEL)
+            self.dense_model_name = f"{settings.OPENAI_EMBEDDING_MODEL}:1536"
+        self.SPARSE_MODEL = (
+            None if self.embedding_client else Bm25(settings.SPARSE_EMBEDDING_MODEL)
+        )
+        self.embedding_cache = (
+            QueryEmbeddingCache(max_size=settings.EMBEDDING_CACHE_MAX_SIZE)
+            if settings.EMBEDDING_CACHE_ENABLED
+            else None
+        )
+        # Embedding is CPU bound (or a blocking HTTP call in openai mode), so the
+        # async path runs it on a bounded pool instead of the event loop.
+        self._executor = ThreadPoolExecutor(
+            max_workers=settings.EMBEDDING_EXECUTOR_WORKERS,
+            thread_name_prefix="query-embed",
+        )
+        # Dense runs here while the calling thread computes the sparse vector
+        self._dense_executor = ThreadPoolExecutor(
+            max_workers=settings.DENSE_EMBEDDING_WORKERS,
+            thread_name_prefix="query-embed-dense",
+        )
+        self.embedding_timings = EmbeddingTimings()
+
+    def warmup(self, queries: list[str]):
+        # The first inference of an ONNX session pays for graph optimization
+        # and allocations, run it before taking traffic.
+        for query in queries:
+            start = time.perf_counter()
+            self._get_query_embeddings(query)
+            logger.info(
+                f"Warmup query ({len(query.split())} terms) embedded in "
+                f"{(time.perf_counter() - start) * 1000:.1f}ms"
+            )
+
+    async def aclose(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._dense_executor.shutdown(wait=False, cancel_futures=True)
+        await self.async_client.close()
+        self.client.close()
 
     def _get_query_embeddings(self, query: str):
-        if self.mode == "local":
+        query = normalize_query(query)
+
+        # Short queries are answered by the sparse prefetches alone
+        if len(query.split()) <= SHORT_QUERY_MAX_TERMS:
+            return None, self._get_sparse_embedding(query)
+
+        start = time.perf_counter()
+        dense_future = self._dense_executor.submit(self._timed_dense_embedding, query)
+        query_sparse_vector = self._get_sparse_embedding(query)
+        sparse_ms = (time.perf_counter() - start) * 1000
+        query_dense_vector, dense_ms = dense_future.result()
+        wall_ms = (time.perf_counter() - start) * 1000
+
+        self.embedding_timings.record(dense_ms, sparse_ms, wall_ms)
+        logger.debug(
+            f"[{self.mode}] query embedding dense={dense_ms:.1f}ms "
+            f"sparse={sparse_ms:.1f}ms wall={wall_ms:.1f}ms "
+            f"saved={dense_ms + sparse_ms - wall_ms:.1f}ms"
+        )
+        return query_dense_vector, query_sparse_vector
+
+    def _timed_dense_embedding(self, query: str):
+        start = time.perf_counter()
+        query_dense_vector = self._get_dense_embedding(query)
+        return query_dense_vector, (time.perf_counter() - start) * 1000
+
+    def _get_dense_embedding(self, query: str):
+        if self.embedding_cache:
+            cached = self.embedding_cache.get_dense(self.dense_model_name, query)
+            if cached is not None:
+                return cached
+
+        if self.mode == "local" and self.embedding_client:
+            query_dense_vector = self.embedding_client.embed_dense(query)
+        elif self.mode == "local":
             query_dense_vector = next(self.DENSE_MODEL.query_embed(query))
         else:
             response = self.DENSE_MODEL.embeddings.create(
@@ -45,99 +252,169 @@ class HybridSearch:
             )
             query_dense_vector = response.data[0].embedding
 
-        query_sparse_vector = next(self.SPARSE_MODEL.query_embed(query))
-        return query_dense_vector, query_sparse_vector
+        if self.embedding_cache:
+            return self.embedding_cache.set_dense(
+                self.dense_model_name, query, query_dense_vector
+            )
+        return query_dense_vector
+
+    def _get_sparse_embedding(self, query: str):
+        model_name = settings.SPARSE_EMBEDDING_MODEL
+        if self.embedding_cache:
+            cached = self.embedding_cache.get_sparse(model_name, query)
+            if cached is not None:
+                return cached
+
+        if self.embedding_client:
+            query_sparse_vector = self.embedding_client.embed_sparse(query)
+        else:
+            query_sparse_vector = next(self.SPARSE_MODEL.query_embed(query))
+
+        if self.embedding_cache:
+            return self.embedding_cache.set_sparse(
+                model_name, query, query_sparse_vector
+            )
+        return query_sparse_vector
 
-    def search(self, query: str):
+    def search(
+        self, query: str, profile: Optional[SearchProfileName] = None
+    ) -> list[HybridSearchResult]:
         query_dense_vector, query_sparse_vector = self._get_query_embeddings(query)
 
+        result = self.client.query_points(
+            **self._query_points_kwargs(
+                query, query_dense_vector, query_sparse_vector, profile
+            )
+        )
+        return self._to_results(result.points)
+
+    async def asearch(
+        self, query: str, profile: Optional[SearchProfileName] = None
+    ) -> list[HybridSearchResult]:
+        loop = asyncio.get_running_loop()
+        query_dense_vector, query_sparse_vector = await loop.run_in_executor(
+            self._executor, self._get_query_embeddings, query
+        )
+
+        result = await self.async_client.query_points(
+            **self._query_points_kwargs(
+                query, query_dense_vector, query_sparse_vector, profile
+            )
+        )
+        return self._to_results(result.points)
+
+    def _query_points_kwargs(
+        self,
+        query: str,
+        query_dense_vector,
+        query_sparse_vector,
+        profile: Optional[SearchProfileName] = None,
+    ) -> dict:
         prefetch = self._get_prefetch(
             length=len(query.split()),
             query=query,
             query_dense_vector=query_dense_vector,
             query_sparse_vector=query_sparse_vector,
+            profile=get_search_profile(profile),
         )
-
-        result = self.client.query_points(
+        return dict(
             collection_name=self.collection_name,
             prefetch=prefetch,
             query=models.FusionQuery(fusion=models.Fusion.RRF),
             limit=10,
-            with_payload=True,
+            with_payload=self.payload_fields,
         )
 
-        response = [
+    def _to_results(self, points: list[models.ScoredPoint]) -> list[HybridSearchResult]:
+        return [
             HybridSearchResult(
                 podcast_id=r.payload["podcast_id"],
                 episode_id=r.payload["episode_id"],
-                episode_title=r.payload["document"].split("\n")[2],
+                episode_title=r.payload["title"],
                 podcast_title=r.payload["podcast_name"],
                 podcast_author=r.payload["podcast_author"],
                 podcast_categoires=r.payload["podcast_categories"],
                 sim_score=r.score,
+                display=(
+                    EpisodeDisplay(**r.payload)
+                    if all(field in r.payload for field in DISPLAY_PAYLOAD_FIELDS)
+                    else None
+                ),
             )
-            for r in result.points
+            for r in points
         ]
-        return response
 
     def _get_prefetch(
         self,
         length: int,
         query: str,
-        query_dense_vector: list[float],
-        query_sparse_vector: list[float],
+        query_dense_vector: Optional[list[float]],
+        query_sparse_vector: SparseEmbedding,
+        profile: SearchProfile,
     ):
-        if length <= 3:
-            prefetch = [
-                models.Prefetch(
-                    query=models.SparseVector(**query_sparse_vector.as_object()),
-                    using="bm25" if self.mode == "openai" else "fast-sparse-bm25",
-                    limit=40,
-                    params=models.SearchParams(hnsw_ef=256, exact=True),
-                ),
-                models.Prefetch(
-                    query=models.SparseVector(**query_sparse_vector.as_object()),
-                    using="bm25" if self.mode == "openai" else "fast-sparse-bm25",
-                    limit=40,
-                    params=models.SearchParams(hnsw_ef=256, exact=True),
-                    filter=models.Filter(
-                        should=models.FieldCondition(
-                            key="documents", match=models.MatchAny(any=query.split())
+        return build_prefetch(
+            mode=self.mode,
+            length=length,
+            query=query,
+            query_dense_vector=query_dense_vector,
+            query_sparse_vector=query_sparse_vector,
+            profile=profile,
+        )
+
+
+def build_prefetch(
+    mode: str,
+    length: int,
+    query: str,
+    query_dense_vector: Optional[list[float]],
+    query_sparse_vector: SparseEmbedding,
+    profile: SearchProfile,
+) -> list[models.Prefetch]:
+    sparse_using = "bm25" if mode == "openai" else "fast-sparse-bm25"
+    params = profile.search_params()
+
+    prefetch = [
+        models.Prefetch(
+            query=models.SparseVector(**query_sparse_vector.as_object()),
+            using=sparse_using,
+            limit=profile.sparse_limit,
+            params=params,
+        ),
+    ]
+
+    # Restrict the second sparse prefetch to documents containing any of the
+    # query words, served by the full-text index on "document".
+    words = [word for word in query.split() if len(word) >= DOCUMENT_MIN_TOKEN_LEN]
+    if words:
+        prefetch.append(
+            models.Prefetch(
+                query=models.SparseVector(**query_sparse_vector.as_object()),
+                using=sparse_using,
+                limit=profile.sparse_limit,
+                params=params,
+                filter=models.Filter(
+                    should=[
+                        models.FieldCondition(
+                            key="document", match=models.MatchText(text=word)
                         )
-                    ),
-                ),
-            ]
-        else:
-            prefetch = [
-                models.Prefetch(
-                    query=query_dense_vector,
-                    using=(
-                        "openai"
-                        if self.mode == "openai"
-                        else "fast-paraphrase-multilingual-minilm-l12-v2"
-                    ),
-                    limit=15,
-                    params=models.SearchParams(
-                        hnsw_ef=256,
-                        exact=True,
-                    ),
+                        for word in words
+                    ]
                 ),
-                models.Prefetch(
-                    query=models.SparseVector(**query_sparse_vector.as_object()),
-                    using="bm25" if self.mode == "openai" else "fast-sparse-bm25",
-                    limit=40,
-                    params=models.SearchParams(hnsw_ef=256, exact=True),
-                ),
-                models.Prefetch(
-                    query=models.SparseVector(**query_sparse_vector.as_object()),
-                    using="bm25" if self.mode == "openai" else "fast-sparse-bm25",
-                    limit=40,
-                    params=models.SearchParams(hnsw_ef=256, exact=True),
-                    filter=models.Filter(
-                        should=models.FieldCondition(
-                            key="documents", match=models.MatchAny(any=query.split())
-                        )
-                    ),
+            )
+        )
+
+    if length > SHORT_QUERY_MAX_TERMS and query_dense_vector is not None:
+        prefetch.insert(
+            0,
+            models.Prefetch(
+                query=query_dense_vector,
+                using=(
+                    "openai"
+                    if mode == "openai"
+                    else "fast-paraphrase-multilingual-minilm-l12-v2"
                 ),
-            ]
-        return prefetch
+                limit=profile.dense_limit,
+                params=params,
+            ),
+        )
+    return prefetch
@@ -0,0 +1,547 @@
+import hashlib
+import json
+import multiprocessing
+import time
+from collections import defaultdict
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
+from itertools import islice
+from datetime import datetime
+from typing import Iterable, Iterator, Literal, Optional
+
+import numpy as np
+from fastembed.embedding import TextEmbedding
+from fastembed.sparse.bm25 import Bm25
+from openai import OpenAI
+from pydantic import BaseModel
+from qdrant_client import QdrantClient, models
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.lib.podcast_index.models import Episode, Podcast
+from better_search.lib.podcast_index.utils import format_duration
+from better_search.lib.text.normalize import (
+    clean_description,
+    make_snippet,
+    normalize_arabic,
+    normalize_description,
+)
+from better_search.lib.vectorstore.base import (
+    QuantizationType,
+    VectorStore,
+    get_quantization_config,
+)
+from better_search.lib.vectorstore.embedding_store import EmbeddingStore
+from better_search.lib.vectorstore.uploader import ParallelUploader
+
+logger = get_logger()
+
+EmbeddingType = Literal["local", "openai"]
+
+# Vector names of the two collection layouts, the local ones follow the naming
+# qdrant_client's fastembed integration used when the collection was created.
+VECTOR_NAMES: dict[str, tuple[str, str]] = {
+    "local": (
+        f"fast-{settings.LOCAL_EMBEDDING_MODEL.split('/')[-1].lower()}",
+        f"fast-sparse-{settings.SPARSE_EMBEDDING_MODEL.split('/')[-1].lower()}",
+    ),
+    "openai": ("openai", "bm25"),
+}
+LOCAL_EMBEDDING_SIZE = 384
+OPENAI_EMBEDDING_SIZE = 1536
+
+
+class EpisodeInfo(BaseModel):
+    episode_id: int
+    title: str
+    description: str
+    clean_description: Optional[str] = None
+    podcast_id: int
+    podcast_name: str
+    podcast_author: str
+    podcast_categories: list
+    # Only needed for the display payload
+    snippet: Optional[str] = None
+    image: Optional[str] = None
+    podcast_image_url: Optional[str] = None
+    duration: Optional[int] = None
+    date_published: Optional[datetime] = None
+
+
+def iter_podcast_with_episodes(
+    ids: list[int], session: Session, batch_size: int = 500
+) -> Iterator[list[EpisodeInfo]]:
+    query = (
+        select(
+            Episode.title,
+            Episode.description,
+            Episode.clean_description,
+            Episode.snippet,
+            Episode.image,
+            Episode.duration,
+            Episode.date_published,
+            Podcast.image_url.label("podcast_image_url"),
+            Podcast.title.label("podcast_name"),
+            Podcast.author.label("podcast_author"),
+            Podcast.categories.label("podcast_categories"),
+            Podcast.id.label("podcast_id"),
+            Episode.id.label("episode_id"),
+        )
+        .join(
+            Podcast,
+            Episode.podcast_id == Podcast.id,
+        )
+        .where(Episode.podcast_id.in_(ids))
+    )
+    # yield_per streams through a server side cursor, only one partition of
+    # rows is held in memory at a time.
+    result = session.execute(query, execution_options={"yield_per": batch_size})
+
+    for rows in result.partitions():
+        yield [EpisodeInfo(**row._mapping) for row in rows]
+
+
+def build_document(episode: EpisodeInfo) -> str:
+    # Rows ingested (or backfilled) since the clean_description column was
+    # added skip the html cleaning
+    if episode.clean_description is not None:
+        description = normalize_arabic(episode.clean_description)
+    else:
+        description = normalize_description(episode.description)
+
+    return (
+        f"{normalize_arabic(episode.podcast_name)}\n"
+        f"{normalize_arabic(episode.podcast_author)}\n"
+        f"{normalize_arabic(episode.title)}\n"
+        f"{description}"
+    )
+
+
+def episode_payload(episode: EpisodeInfo) -> dict:
+    # The search only reads these keys, the episode title is kept as its own
+    # field so it never has to be parsed back out of the document.
+    return {
+        "podcast_id": episode.podcast_id,
+        "episode_id": episode.episode_id,
+        "title": episode.title,
+        "podcast_name": episode.podcast_name,
+        "podcast_author": episode.podcast_author,
+        "podcast_categories": episode.podcast_categories,
+    }
+
+
+def display_payload(episode: EpisodeInfo) -> dict:
+    # What the search route shows for a hit, stored so results can be served
+    # without a db round trip. display_hash lets delta runs detect changes
+    # that do not touch the embedded document (e.g. a new image).
+    description = episode.clean_description
+    snippet = episode.snippet
+    if description is None:
+        description = clean_description(episode.description)
+    if snippet is None:
+        snippet = make_snippet(description)
+
+    display = {
+        "image": episode.image or episode.podcast_image_url,
+        "description": description,
+        "snippet": snippet,
+        "duration_formatted": format_duration(episode.duration),
+        "date_published": (
+            episode.date_published.isoformat() if episode.date_published else None
+        ),
+    }
+    display["display_hash"] = content_hash(json.dumps(display, sort_keys=True))
+    return display
+
+
+def content_hash(document: str) -> str:
+    return hashlib.sha256(document.encode("utf-8")).hexdigest()
+
+
+def batched(iterable: Iterable, size: int) -> Iterator[list]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def create_collection(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    embedding_type: EmbeddingType,
+    quantization: QuantizationType = "none",
+):
+    if not qdrant_client.collection_exists(collection_name):
+        dense_name, sparse_name = VECTOR_NAMES[embedding_type]
+        quantization_config = get_quantization_config(quantization)
+        qdrant_client.create_collection(
+            collection_name=collection_name,
+            vectors_config={
+                dense_name: models.VectorParams(
+                    size=(
+                        LOCAL_EMBEDDING_SIZE
+                        if embedding_type == "local"
+                        else OPENAI_EMBEDDING_SIZE
+                    ),
+                    distance=models.Distance.COSINE,
+                    # With quantization the originals are only read to rescore
+                    on_disk=True if quantization_config else None,
+                )
+            },
+            quantization_config=quantization_config,
+            sparse_vectors_config={
+                sparse_name: models.SparseVectorParams(
+                    index=models.SparseIndexParams(on_disk=False),
+                    # fastembed's bm25 leaves idf to qdrant in the local layout
+                    modifier=(
+                        models.Modifier.IDF if embedding_type == "local" else None
+                    ),
+                )
+            },
+        )
+        logger.info(f"Collection {collection_name} created")
+
+    VectorStore(qdrant_client).create_payload_indexes(collection_name)
+
+
+def open_embedding_store(embedding_type: EmbeddingType) -> EmbeddingStore:
+    if embedding_type == "local":
+        return EmbeddingStore(
+            settings.EMBEDDING_STORE_DIR,
+            settings.LOCAL_EMBEDDING_MODEL,
+            LOCAL_EMBEDDING_SIZE,
+        )
+    return EmbeddingStore(
+        settings.EMBEDDING_STORE_DIR,
+        settings.OPENAI_EMBEDDING_MODEL,
+        OPENAI_EMBEDDING_SIZE,
+    )
+
+
+class DenseEmbedder:
+    def __init__(
+        self,
+        embedding_type: EmbeddingType,
+        openai_batch_size: int = 100,
+        store: Optional[EmbeddingStore] = None,
+    ):
+        self.embedding_type = embedding_type
+        self.openai_batch_size = openai_batch_size
+        self.store = store
+        self.store_hits = 0
+        if embedding_type == "local":
+            self.model = TextEmbedding(settings.LOCAL_EMBEDDING_MODEL)
+        else:
+            self.model = OpenAI(api_key=settings.OPENAI_API_KEY)
+
+    def embed(self, documents: list[str], hashes: Optional[list[str]] = None) -> list:
+        if self.store is None or hashes is None:
+            return self._embed(documents)
+
+        # Only documents the store has never seen go to the model
+        vectors = self.store.get_many(hashes)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            embedded = self._embed([documents[i] for i in missing])
+            self.store.put_many([hashes[i] for i in missing], embedded)
+            for i, vector in zip(missing, embedded):
+                vectors[i] = vector
+        self.store_hits += len(documents) - len(missing)
+
+        return [
+            vector.tolist() if isinstance(vector, np.ndarray) else vector
+            for vector in vectors
+        ]
+
+    def _embed(self, documents: list[str]) -> list:
+        if self.embedding_type == "local":
+            return [vector.tolist() for vector in self.model.embed(documents)]
+
+        embeddings = []
+        for batch in batched(documents, self.openai_batch_size):
+            response = self.model.embeddings.create(
+                model=settings.OPENAI_EMBEDDING_MODEL, input=batch
+            )
+            embeddings.extend(item.embedding for item in response.data)
+        return embeddings
+
+
+_worker_sparse_model: Optional[Bm25] = None
+
+
+def _init_sparse_worker():
+    # Loaded once per worker process instead of once per batch
+    global _worker_sparse_model
+    _worker_sparse_model = Bm25(settings.SPARSE_EMBEDDING_MODEL)
+
+
+def _embed_sparse_chunk(documents: list[str]) -> tuple[list[dict], float]:
+    start = time.perf_counter()
+    vectors = [
+        vector.as_object()
+        for vector in _worker_sparse_model.embed(documents, batch_size=len(documents))
+    ]
+    return vectors, time.perf_counter() - start
+
+
+class SparseEmbedder:
+    def __init__(self, workers: int = settings.SPARSE_EMBEDDING_WORKERS):
+        self.workers = workers
+        # Bm25 is pure python tokenization, so it needs processes to use more
+        # than one core. With no workers it runs on a thread of this process,
+        # which still overlaps it with the (network bound) dense stage.
+        # Workers are spawned, not forked: by now the dense model's ONNX
+        # session and its threads exist, and a forked copy of them can hang.
+        if workers > 0:
+            self._executor = ProcessPoolExecutor(
+                max_workers=workers,
+                initializer=_init_sparse_worker,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        else:
+            _init_sparse_worker()
+            self._executor = ThreadPoolExecutor(max_workers=1)
+
+    def submit(self, documents: list[str]) -> list[Future]:
+        chunk_size = -(-len(documents) // max(self.workers, 1))
+        return [
+            self._executor.submit(_embed_sparse_chunk, chunk)
+            for chunk in batched(documents, chunk_size)
+        ]
+
+    @staticmethod
+    def collect(futures: list[Future]) -> tuple[list[dict], float]:
+        vectors, seconds = [], 0.0
+        for future in futures:
+            chunk_vectors, chunk_seconds = future.result()
+            vectors.extend(chunk_vectors)
+            # Chunks run side by side, the slowest one is the stage time
+            seconds = max(seconds, chunk_seconds)
+        return vectors, seconds
+
+    def close(self):
+        self._executor.shutdown()
+
+
+class StageThroughput:
+    def __init__(self):
+        self.docs: dict[str, int] = defaultdict(int)
+        self.seconds: dict[str, float] = defaultdict(float)
+
+    def record(self, stage: str, docs: int, seconds: float):
+        self.docs[stage] += docs
+        self.seconds[stage] += seconds
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{stage} {self.docs[stage] / seconds:.1f} docs/s"
+            for stage, seconds in self.seconds.items()
+            if seconds > 0
+        )
+
+
+def get_indexed_hashes(
+    qdrant_client: QdrantClient, collection_name: str, ids: list[int]
+) -> dict[int, dict]:
+    points = qdrant_client.retrieve(
+        collection_name=collection_name,
+        ids=ids,
+        with_payload=["content_hash", "display_hash"],
+        with_vectors=False,
+    )
+    return {point.id: point.payload for point in points}
+
+
+def delete_stale_points(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    session: Session,
+    page_size: int = 1000,
+) -> int:
+    # Point ids are episode ids, drop the points whose episode left the db
+    deleted = 0
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=page_size,
+            offset=offset,
+            with_payload=False,
+            with_vectors=False,
+        )
+        ids = [point.id for point in points]
+        if ids:
+            existing = set(
+                session.scalars(select(Episode.id).where(Episode.id.in_(ids)))
+            )
+            stale = [point_id for point_id in ids if point_id not in existing]
+            if stale:
+                qdrant_client.delete(
+                    collection_name=collection_name,
+                    points_selector=models.PointIdsList(points=stale),
+                )
+                deleted += len(stale)
+
+        if offset is None:
+            break
+
+    logger.info(f"Deleted {deleted} stale points from {collection_name}")
+    return deleted
+
+
+def index_episodes(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    embedding_type: EmbeddingType,
+    episode_batches: Iterable[list[EpisodeInfo]],
+    delta: bool = False,
+    use_store: bool = settings.EMBEDDING_STORE_ENABLED,
+    sparse_workers: int = settings.SPARSE_EMBEDDING_WORKERS,
+    upload_batch_size: int = settings.UPLOAD_BATCH_SIZE,
+    upload_parallelism: int = settings.UPLOAD_PARALLELISM,
+    with_display: bool = False,
+) -> int:
+    dense_name, sparse_name = VECTOR_NAMES[embedding_type]
+    dense_embedder = DenseEmbedder(
+        embedding_type,
+        store=open_embedding_store(embedding_type) if use_store else None,
+    )
+    sparse_embedder = SparseEmbedder(workers=sparse_workers)
+    throughput = StageThroughput()
+    try:
+        with ParallelUploader(
+            qdrant_client,
+            collection_name,
+            batch_size=upload_batch_size,
+            parallelism=upload_parallelism,
+        ) as uploader:
+            indexed, skipped = _index_batches(
+                qdrant_client,
+                collection_name,
+                (dense_name, sparse_name),
+                episode_batches,
+                delta,
+                with_display,
+                dense_embedder,
+                sparse_embedder,
+                uploader,
+                throughput,
+            )
+            stage_start = time.perf_counter()
+            uploader.flush()
+            throughput.record("upsert", 0, time.perf_counter() - stage_start)
+    finally:
+        sparse_embedder.close()
+
+    logger.info(
+        f"Embedding ended successfully, {indexed} episodes indexed "
+        f"({dense_embedder.store_hits} dense vectors from the store) "
+        f"and {skipped} unchanged"
+    )
+    logger.info(f"Stage throughput: {throughput.summary()}")
+    return indexed
+
+
+def _index_batches(
+    qdrant_client: QdrantClient,
+    collection_name: str,
+    vector_names: tuple[str, str],
+    episode_batches: Iterable[list[EpisodeInfo]],
+    delta: bool,
+    with_display: bool,
+    dense_embedder: DenseEmbedder,
+    sparse_embedder: SparseEmbedder,
+    uploader: ParallelUploader,
+    throughput: StageThroughput,
+) -> tuple[int, int]:
+    dense_name, sparse_name = vector_names
+
+    # Each batch goes through clean -> embed before the next one is read and
+    # is handed to the uploader, whose bounded queue keeps memory flat while
+    # upserts run in the background.
+    indexed, skipped = 0, 0
+    start = time.perf_counter()
+    for episodes in episode_batches:
+        stage_start = time.perf_counter()
+        documents = [build_document(episode) for episode in episodes]
+        hashes = [content_hash(document) for document in documents]
+        displays = [
+            display_payload(episode) if with_display else {} for episode in episodes
+        ]
+        throughput.record("clean", len(documents), time.perf_counter() - stage_start)
+
+        if delta:
+            # Only embed episodes that are new or whose document changed,
+            # display-only changes are patched onto the existing points
+            indexed_hashes = get_indexed_hashes(
+                qdrant_client,
+                collection_name,
+                [episode.episode_id for episode in episodes],
+            )
+            changed, display_updates = [], []
+            for i, (episode, document_hash, display) in enumerate(
+                zip(episodes, hashes, displays)
+            ):
+                indexed_payload = indexed_hashes.get(episode.episode_id, {})
+                if indexed_payload.get("content_hash") != document_hash:
+                    changed.append(i)
+                elif with_display and (
+                    indexed_payload.get("display_hash") != display["display_hash"]
+                ):
+                    display_updates.append(
+                        models.SetPayloadOperation(
+                            set_payload=models.SetPayload(
+                                payload=display, points=[episode.episode_id]
+                            )
+                        )
+                    )
+
+            if display_updates:
+                qdrant_client.batch_update_points(
+                    collection_name=collection_name,
+                    update_operations=display_updates,
+                )
+            skipped += len(episodes) - len(changed)
+            episodes = [episodes[i] for i in changed]
+            documents = [documents[i] for i in changed]
+            hashes = [hashes[i] for i in changed]
+            displays = [displays[i] for i in changed]
+            if not episodes:
+                continue
+
+        # Sparse vectors are computed by the workers while the dense model
+        # (or the OpenAI API) handles the same batch
+        sparse_futures = sparse_embedder.submit(documents)
+        stage_start = time.perf_counter()
+        dense_vectors = dense_embedder.embed(documents, hashes)
+        throughput.record("dense", len(documents), time.perf_counter() - stage_start)
+        sparse_vectors, sparse_seconds = sparse_embedder.collect(sparse_futures)
+        throughput.record("sparse", len(documents), sparse_seconds)
+
+        points = [
+            models.PointStruct(
+                id=episode.episode_id,
+                vector={
+                    dense_name: dense_vectors[i],
+                    sparse_name: models.SparseVector(**sparse_vectors[i]),
+                },
+                payload={
+                    **episode_payload(episode),
+                    **displays[i],
+                    "document": documents[i],
+                    "content_hash": hashes[i],
+                },
+            )
+            for i, episode in enumerate(episodes)
+        ]
+        stage_start = time.perf_counter()
+        uploader.add(points)
+        throughput.record("upsert", len(points), time.perf_counter() - stage_start)
+
+        indexed += len(points)
+        logger.info(
+            f"Embedded {indexed} episodes into {collection_name} "
+            f"({indexed / (time.perf_counter() - start):.1f} docs/s)"
+        )
+
+    return indexed, skipped
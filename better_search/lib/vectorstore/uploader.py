@@ -0,0 +1,153 @@
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor, wait
+from typing import Iterable, Optional
+
+from qdrant_client import QdrantClient, models
+
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+
+logger = get_logger()
+
+# Between collection status checks while waiting for queued upserts
+STATUS_POLL_SECONDS = 0.5
+
+
+class ParallelUploader:
+    def __init__(
+        self,
+        client: QdrantClient,
+        collection_name: str,
+        batch_size: int = settings.UPLOAD_BATCH_SIZE,
+        parallelism: int = settings.UPLOAD_PARALLELISM,
+        max_retries: int = settings.UPLOAD_MAX_RETRIES,
+        consistency_timeout: float = settings.UPLOAD_CONSISTENCY_TIMEOUT_SECONDS,
+    ):
+        self.client = client
+        self.collection_name = collection_name
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.consistency_timeout = consistency_timeout
+        self.uploaded = 0
+
+        # The embedded (path / :memory:) client is not thread safe and applies
+        # upserts synchronously anyway, so its batches are upserted inline.
+        self._inline = bool(
+            client.init_options.get("path")
+            or client.init_options.get("location") == ":memory:"
+        )
+
+        self._executor = ThreadPoolExecutor(
+            max_workers=parallelism, thread_name_prefix="qdrant-upload"
+        )
+        # Backpressure: at most two batches per stream are queued or in flight,
+        # add() blocks until one of them is acknowledged.
+        self._slots = threading.BoundedSemaphore(parallelism * 2)
+        self._buffer: list[models.PointStruct] = []
+        self._futures: list[Future] = []
+        # Highest operation id acknowledged by a wait=False upsert
+        self._last_operation_id: Optional[int] = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.flush()
+        self._executor.shutdown(wait=exc_type is None, cancel_futures=True)
+
+    def _upsert(
+        self, points: list[models.PointStruct], wait: bool
+    ) -> models.UpdateResult:
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self.client.upsert(
+                    collection_name=self.collection_name, points=points, wait=wait
+                )
+            except Exception as e:
+                if attempt == self.max_retries:
+                    raise
+                delay = 0.5 * 2**attempt
+                logger.warning(
+                    f"Upsert of {len(points)} points into {self.collection_name} "
+                    f"failed ({e}), retrying in {delay}s"
+                )
+                time.sleep(delay)
+
+    def _done(self, future: Future):
+        self._slots.release()
+
+    def _check(self, futures: list[Future]):
+        # A batch that still fails after its retries stops the whole upload
+        for future in futures:
+            if future.exception() is not None:
+                raise RuntimeError(
+                    f"Uploading to {self.collection_name} failed"
+                ) from future.exception()
+            self.uploaded += future.batch_size
+            operation_id = future.result().operation_id
+            if operation_id is not None:
+                self._last_operation_id = max(
+                    operation_id, self._last_operation_id or operation_id
+                )
+
+    def _submit(self, points: list[models.PointStruct]):
+        if self._inline:
+            self._upsert(points, wait=True)
+            self.uploaded += len(points)
+            return
+
+        done, pending = [], []
+        for future in self._futures:
+            (done if future.done() else pending).append(future)
+        self._futures = pending
+        self._check(done)
+
+        self._slots.acquire()
+        future = self._executor.submit(self._upsert, points, False)
+        future.batch_size = len(points)
+        future.add_done_callback(self._done)
+        self._futures.append(future)
+
+    def add(self, points: Iterable[models.PointStruct]):
+        for point in points:
+            self._buffer.append(point)
+            if len(self._buffer) >= self.batch_size:
+                self._submit(self._buffer)
+                self._buffer = []
+
+    def flush(self):
+        if self._buffer:
+            self._submit(self._buffer)
+            self._buffer = []
+
+        wait(self._futures)
+        self._check(self._futures)
+        self._futures = []
+
+        if self._last_operation_id is not None:
+            self._wait_until_applied()
+            self._last_operation_id = None
+
+    def _wait_until_applied(self):
+        # A wait=False upsert is acknowledged once it is queued. Operation ids
+        # are per shard and can't be queried, so wait for the collection to
+        # report green: every shard has applied its queued updates and no
+        # optimization is pending.
+        deadline = time.monotonic() + self.consistency_timeout
+        while True:
+            status = self.client.get_collection(self.collection_name).status
+            if status == models.CollectionStatus.GREEN:
+                return
+            if status == models.CollectionStatus.RED:
+                raise RuntimeError(
+                    f"Collection {self.collection_name} is red after uploading"
+                )
+            if time.monotonic() >= deadline:
+                raise RuntimeError(
+                    f"Collection {self.collection_name} still {status.value} "
+                    f"{self.consistency_timeout}s after the last upsert "
+                    f"(operation {self._last_operation_id})"
+                )
+            time.sleep(STATUS_POLL_SECONDS)
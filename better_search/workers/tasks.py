@@ -0,0 +1,256 @@
+import asyncio
+from collections import Counter
+from typing import Optional
+
+from celery import chain, chord
+from qdrant_client import QdrantClient
+
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.db.database import get_db_context
+from better_search.lib.cache.search_cache import invalidate_search_cache
+from better_search.lib.podcast_index.async_client import AsyncPodcastIndex
+from better_search.lib.podcast_index.crawl_state import (
+    episodes_since,
+    is_feed_unchanged,
+)
+from better_search.lib.podcast_index.dal import (
+    add_bulk_episodes,
+    add_bulk_podcasts,
+    get_feed_crawl_states,
+    save_feed_crawl_state,
+)
+from better_search.lib.podcast_index.parsing import (
+    parse_episodes_results,
+    parse_search_results,
+    parse_trending_results,
+)
+from better_search.lib.podcast_index.schemas import IngestFeed
+from better_search.lib.vectorstore.base import QuantizationType
+from better_search.lib.vectorstore.indexing import (
+    EmbeddingType,
+    create_collection,
+    delete_stale_points,
+    index_episodes,
+    iter_podcast_with_episodes,
+)
+from better_search.workers.app import celery_app
+
+logger = get_logger()
+
+# Celery rate limits are per worker node, the API budget is shared by all of
+# them, so size PODCAST_INDEX_RATE_PER_SECOND for one node
+API_RATE_LIMIT = f"{settings.PODCAST_INDEX_RATE_PER_SECOND}/s"
+
+
+def _call_api(method: str, *args, **kwargs) -> Optional[bytes]:
+    # One request per task, the client still brings the retries and
+    # Retry-After handling of the async crawler. Errors left after those are
+    # logged and swallowed, a raising task would fail the whole chord.
+    async def run():
+        async with AsyncPodcastIndex(concurrency=1) as client:
+            return await getattr(client, method)(*args, **kwargs)
+
+    try:
+        return asyncio.run(run())
+    except Exception as e:
+        logger.error(f"Podcast Index {method} {args} failed: {e}")
+        return None
+
+
+def _store_feeds(parse, raw: Optional[bytes], label: str) -> list[dict]:
+    # Feeds are stored before their episodes are fanned out, the returned
+    # dicts are the slim feeds the crawl_feed tasks receive
+    try:
+        results = parse(raw) if raw is not None else None
+    except Exception as e:
+        logger.error(f"Error parsing podcasts for {label}: {e}")
+        results = None
+
+    if results is None or results.status != "true" or not results.feeds:
+        logger.warning(f"No podcasts found for {label}")
+        return []
+
+    with get_db_context() as session:
+        if add_bulk_podcasts(podcasts=results.feeds, session=session) is None:
+            logger.error(f"Failed to save podcasts for {label}")
+            return []
+
+    logger.info(f"Stored {len(results.feeds)} podcasts for {label}")
+    return [
+        IngestFeed.model_validate(feed, from_attributes=True).model_dump()
+        for feed in results.feeds
+    ]
+
+
+@celery_app.task(rate_limit=API_RATE_LIMIT)
+def refresh_search(query: str) -> list[dict]:
+    raw = _call_api("search", query, clean=True)
+    return _store_feeds(parse_search_results, raw, f"query {query}")
+
+
+@celery_app.task(rate_limit=API_RATE_LIMIT)
+def refresh_trending(
+    lang: str, category: int, max_results: int = 50, since: Optional[int] = None
+) -> list[dict]:
+    raw = _call_api(
+        "trending_podcasts",
+        max=max_results,
+        since=since,
+        lang=[lang],
+        categories=[category],
+    )
+    return _store_feeds(parse_trending_results, raw, f"trending {lang} {category}")
+
+
+@celery_app.task(rate_limit=API_RATE_LIMIT)
+def crawl_feed(feed: dict, sync: bool = False) -> dict:
+    podcast = IngestFeed.model_validate(feed)
+    with get_db_context() as session:
+        since = None
+        if sync:
+            state = get_feed_crawl_states([podcast.id], session).get(podcast.id)
+            if is_feed_unchanged(podcast, state):
+                return {"feeds_skipped": 1}
+            since = episodes_since(state)
+
+        raw = _call_api("episodes", podcast, since=since)
+        try:
+            episodes = parse_episodes_results(raw) if raw is not None else None
+        except Exception as e:
+            logger.error(f"Error parsing episodes for {podcast.title}: {e}")
+            episodes = None
+
+        if episodes is None or episodes.status != "true":
+            logger.warning(f"No episodes found for podcast: {podcast.title}")
+            return {"feeds_failed": 1}
+
+        count = add_bulk_episodes(episodes.items, session) if episodes.items else 0
+        if count is None:
+            logger.error(f"Failed to save episodes for {podcast.title}")
+            return {"feeds_failed": 1}
+
+        if sync:
+            save_feed_crawl_state(podcast, episodes.items, session)
+        logger.info(f"{count} episodes for {podcast.title} were inserted")
+        return {"feeds_crawled": 1, "episodes_saved": count}
+
+
+@celery_app.task
+def merge_stats(results: list[dict]) -> dict:
+    total = Counter()
+    for stats in results:
+        total.update(stats)
+    return dict(total)
+
+
+@celery_app.task(bind=True)
+def crawl_feeds(self, listings: list[list[dict]], sync: bool = False) -> dict:
+    # Fan-in of the listing tasks. A feed found by several listings is only
+    # crawled once, then the episodes fan out again, one task per feed.
+    feeds = {feed["id"]: feed for listing in listings for feed in listing}
+    if not feeds:
+        return {}
+
+    logger.info(f"Crawling episodes of {len(feeds)} feeds")
+    return self.replace(
+        chord((crawl_feed.s(feed, sync) for feed in feeds.values()), merge_stats.s())
+    )
+
+
+def crawl_workflow(queries: list[str], trending: list[dict], sync: bool = False):
+    # trending holds refresh_trending kwargs. The result of the workflow is
+    # the merged crawl_feed stats.
+    listings = [refresh_search.s(query) for query in queries] + [
+        refresh_trending.s(**kwargs) for kwargs in trending
+    ]
+    return chord(listings, crawl_feeds.s(sync=sync))
+
+
+@celery_app.task
+def prepare_collection(
+    collection_name: str,
+    embedding_type: EmbeddingType,
+    quantization: QuantizationType = "none",
+):
+    create_collection(
+        qdrant_client=QdrantClient(url=settings.QDRANT_BASE_URL),
+        collection_name=collection_name,
+        embedding_type=embedding_type,
+        quantization=quantization,
+    )
+
+
+@celery_app.task
+def index_shard(
+    podcast_ids: list[int],
+    collection_name: str,
+    embedding_type: EmbeddingType,
+    batch_size: int = 256,
+    delta: bool = False,
+    with_display: bool = False,
+) -> int:
+    # The embedding store's files are not safe for concurrent writers, and
+    # prefork workers are daemonic so they can not start the sparse process
+    # pool. Both stay off here.
+    with get_db_context() as session:
+        indexed = index_episodes(
+            qdrant_client=QdrantClient(url=settings.QDRANT_BASE_URL),
+            collection_name=collection_name,
+            embedding_type=embedding_type,
+            episode_batches=iter_podcast_with_episodes(
+                podcast_ids, session, batch_size=batch_size
+            ),
+            delta=delta,
+            use_store=False,
+            sparse_workers=0,
+            with_display=with_display,
+        )
+    logger.info(f"Indexed {indexed} episodes of {len(podcast_ids)} podcasts")
+    return indexed
+
+
+@celery_app.task
+def finish_index(counts: list[int], collection_name: str, delta: bool = False) -> dict:
+    deleted = 0
+    if delta:
+        with get_db_context() as session:
+            deleted = delete_stale_points(
+                QdrantClient(url=settings.QDRANT_BASE_URL), collection_name, session
+            )
+
+    invalidate_search_cache(collection_name)
+    return {"indexed": sum(counts), "deleted": deleted}
+
+
+def index_workflow(
+    podcast_ids: list[int],
+    collection_name: str,
+    embedding_type: EmbeddingType,
+    shard_size: int = 8,
+    quantization: QuantizationType = "none",
+    batch_size: int = 256,
+    delta: bool = False,
+    with_display: bool = False,
+):
+    shards = [
+        podcast_ids[start : start + shard_size]
+        for start in range(0, len(podcast_ids), shard_size)
+    ]
+    return chain(
+        prepare_collection.si(collection_name, embedding_type, quantization),
+        chord(
+            (
+                index_shard.si(
+                    shard,
+                    collection_name,
+                    embedding_type,
+                    batch_size,
+                    delta,
+                    with_display,
+                )
+                for shard in shards
+            ),
+            finish_index.s(collection_name, delta),
+        ),
+    )
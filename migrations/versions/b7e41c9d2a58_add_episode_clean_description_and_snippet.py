@@ -0,0 +1,28 @@
+"""add episode clean_description and snippet
+
+Revision ID: b7e41c9d2a58
+Revises: 6e3922af94d3
+Create Date: 2026-10-18 11:20:12.483915
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "b7e41c9d2a58"
+down_revision = "6e3922af94d3"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column("episodes", sa.Column("clean_description", sa.Text(), nullable=True))
+    op.add_column(
+        "episodes", sa.Column("snippet", sa.String(length=320), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("episodes", "snippet")
+    op.drop_column("episodes", "clean_description")
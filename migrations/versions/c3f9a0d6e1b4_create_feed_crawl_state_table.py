@@ -0,0 +1,32 @@
+"""create feed_crawl_state table
+
+Revision ID: c3f9a0d6e1b4
+Revises: b7e41c9d2a58
+Create Date: 2026-10-18 14:02:37.118204
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "c3f9a0d6e1b4"
+down_revision = "b7e41c9d2a58"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "feed_crawl_state",
+        sa.Column("podcastindex_id", sa.BigInteger(), nullable=False),
+        sa.Column("last_update_time", sa.BigInteger(), nullable=True),
+        sa.Column("newest_item_pubdate", sa.BigInteger(), nullable=True),
+        sa.Column("newest_episode_at", sa.BigInteger(), nullable=True),
+        sa.Column("last_crawled_at", sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint("podcastindex_id"),
+    )
+
+
+def downgrade() -> None:
+    op.drop_table("feed_crawl_state")
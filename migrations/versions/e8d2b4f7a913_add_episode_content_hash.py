@@ -0,0 +1,26 @@
+"""add episode content_hash
+
+Revision ID: e8d2b4f7a913
+Revises: c3f9a0d6e1b4
+Create Date: 2026-10-18 12:41:37.204518
+
+"""
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = "e8d2b4f7a913"
+down_revision = "c3f9a0d6e1b4"
+branch_labels = None
+depends_on = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "episodes", sa.Column("content_hash", sa.String(length=40), nullable=True)
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("episodes", "content_hash")
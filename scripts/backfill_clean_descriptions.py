@@ -0,0 +1,78 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+
+from sqlalchemy import select, update
+
+from better_search.db.database import get_db_context
+from better_search.core.logger import get_logger
+from better_search.lib.podcast_index.models import Episode
+from better_search.lib.text.normalize import clean_description, make_snippet, map_texts
+
+logger = get_logger()
+
+
+def main(batch_size: int = 1000, workers: int = 0, recompute: bool = False):
+    updated = 0
+    last_id = 0
+    # One pool for the whole run
+    pool = ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+    with pool as executor, get_db_context() as session:
+        while True:
+            # Keyset pagination on the primary key, rows updated in a previous
+            # batch are never read again
+            query = (
+                select(Episode.id, Episode.description)
+                .where(Episode.id > last_id)
+                .order_by(Episode.id)
+                .limit(batch_size)
+            )
+            if not recompute:
+                query = query.where(Episode.clean_description.is_(None))
+            rows = session.execute(query).all()
+            if not rows:
+                break
+
+            cleaned = map_texts(
+                clean_description,
+                [row.description or "" for row in rows],
+                executor=executor,
+            )
+            session.execute(
+                update(Episode),
+                [
+                    {
+                        "id": row.id,
+                        "clean_description": text,
+                        "snippet": make_snippet(text),
+                    }
+                    for row, text in zip(rows, cleaned)
+                ],
+            )
+            session.commit()
+
+            updated += len(rows)
+            last_id = rows[-1].id
+            logger.info(f"Backfilled {updated} episodes (up to id {last_id})")
+
+    logger.info(f"Backfill done, {updated} episodes updated")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=0,
+        help="Processes cleaning descriptions, 0 cleans them in this process",
+    )
+    parser.add_argument(
+        "--recompute",
+        action="store_true",
+        help="Also rewrite rows that already have a clean description",
+    )
+    args = parser.parse_args()
+
+    main(batch_size=args.batch_size, workers=args.workers, recompute=args.recompute)
@@ -0,0 +1,258 @@
+"""ON CONFLICT bulk upserts against the old read-then-insert helpers.
+
+The reference implementations below are the add_bulk_podcasts /
+add_bulk_episodes that lived in better_search.lib.podcast_index.dal. They
+select the existing urls/guids, build ORM objects for the rest and add_all
+them. Both run the same workload in feed-sized batches (one call per feed,
+like the crawler):
+
+    cold    every episode is new
+    recrawl every episode is already stored (the daily refresh)
+    changed --changed of the episodes have a new title/description
+
+Everything happens in a scratch schema that is dropped afterwards, so it is
+safe to point at the dev database. Needs postgres, DATABASE_URL is used
+unless --database-url is given.
+
+    python scripts/benchmarks/bulk_upsert.py --feeds 100 --episodes 1000
+"""
+
+import argparse
+import random
+import time
+from datetime import datetime
+
+from sqlalchemy import create_engine, select, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from better_search.core.config import settings
+from better_search.db.database import Base
+from better_search.lib.podcast_index.dal import (
+    get_podcast_id,
+    upsert_episodes,
+    upsert_podcasts,
+)
+from better_search.lib.podcast_index.models import Episode, Podcast
+from better_search.lib.podcast_index.schemas import PodcastEpisode, TrendingFeed
+from better_search.lib.text.normalize import clean_description, make_snippet
+
+SCHEMA = "bench_bulk_upsert"
+
+
+def get_existing_podcasts(urls: list[str], session: Session) -> dict:
+    query = select(Podcast).where(Podcast.url.in_(urls))
+    results = session.execute(query)
+    return {podcast.url: podcast for podcast in results.scalars()}
+
+
+def get_existing_episode_guids(guids: list[str], session: Session) -> set[str]:
+    query = select(Episode.guid).where(Episode.guid.in_(guids))
+    results = session.scalars(query)
+    return set(results)
+
+
+def reference_add_bulk_podcasts(podcasts, session: Session):
+    try:
+        podcast_urls = [podcast.url for podcast in podcasts]
+        existing_podcasts = get_existing_podcasts(podcast_urls, session)
+
+        new_podcasts = [
+            podcast for podcast in podcasts if podcast.url not in existing_podcasts
+        ]
+
+        if new_podcasts:
+            podcasts_model = [
+                Podcast(
+                    url=podcast.url,
+                    title=podcast.title,
+                    description=(
+                        podcast.description if hasattr(podcast, "description") else None
+                    ),
+                    author=podcast.author if hasattr(podcast, "author") else None,
+                    image_url=podcast.image,
+                    itunesId=podcast.itunesId if hasattr(podcast, "itunesId") else None,
+                    podcastGuid=(
+                        podcast.podcastGuid if hasattr(podcast, "podcastGuid") else None
+                    ),
+                    podcastindex_id=podcast.id,
+                    categories=(
+                        list(podcast.categories.values()) if podcast.categories else []
+                    ),
+                )
+                for podcast in new_podcasts
+            ]
+            session.add_all(podcasts_model)
+            session.commit()
+
+        return len(existing_podcasts) + len(new_podcasts)
+    except IntegrityError:
+        session.rollback()
+        return None
+
+
+def reference_add_bulk_episodes(episodes, session: Session):
+    try:
+        podcast_id = get_podcast_id(episodes[0].feedId, session)
+        if not podcast_id:
+            return None
+
+        episode_guids = [episode.guid for episode in episodes]
+        existing_guids = get_existing_episode_guids(episode_guids, session)
+        new_episodes = [
+            episode for episode in episodes if episode.guid not in existing_guids
+        ]
+
+        if not new_episodes:
+            return 0
+
+        episodes_model = []
+        for episode in new_episodes:
+            cleaned = clean_description(episode.description)
+            episodes_model.append(
+                Episode(
+                    title=episode.title,
+                    description=episode.description,
+                    clean_description=cleaned,
+                    snippet=make_snippet(cleaned),
+                    guid=episode.guid,
+                    date_published=datetime.fromtimestamp(episode.datePublished),
+                    duration=episode.duration,
+                    feedItunesId=episode.feedItunesId,
+                    image=episode.image,
+                    podcastindex_id=episode.id,
+                    podcast_id=podcast_id,
+                )
+            )
+        session.add_all(episodes_model)
+        session.commit()
+        return len(episodes_model)
+    except IntegrityError:
+        session.rollback()
+        return None
+
+
+def make_feed(feed_id: int) -> TrendingFeed:
+    return TrendingFeed(
+        id=feed_id,
+        url=f"https://feeds.example.com/{feed_id}.xml",
+        title=f"Podcast {feed_id}",
+        description="A podcast",
+        author="Author",
+        image="https://example.com/image.png",
+        artwork="https://example.com/image.png",
+        newestItemPublishTime=1_700_000_000,
+        trendScore=9,
+        language="en",
+        categories={"9": "Business"},
+    )
+
+
+def make_episode(feed_id: int, i: int, revision: int = 0) -> PodcastEpisode:
+    suffix = f" (rev {revision})" if revision else ""
+    return PodcastEpisode(
+        id=feed_id * 100_000 + i,
+        title=f"Episode {i}{suffix}",
+        link="https://example.com",
+        description=(
+            f"<p>Episode {i} of podcast {feed_id}{suffix}.</p>"
+            + "<p>We talk about <b>things</b> &amp; stuff. " * 8
+            + "Links: https://example.com/show-notes</p>"
+        ),
+        guid=f"{feed_id}-{i}",
+        datePublished=1_700_000_000 - i * 86_400,
+        datePublishedPretty="",
+        dateCrawled=1_700_000_000,
+        enclosureUrl="https://example.com/a.mp3",
+        enclosureType="audio/mpeg",
+        enclosureLength=1,
+        duration=3600,
+        explicit=0,
+        feedId=feed_id,
+    )
+
+
+def run(engine, feeds, batches, write_podcasts, write_episodes) -> float:
+    start = time.perf_counter()
+    with Session(engine) as session:
+        write_podcasts(feeds, session)
+        for batch in batches:
+            if write_episodes(batch, session) is None:
+                raise RuntimeError("episode batch failed")
+    return time.perf_counter() - start
+
+
+def settle(engine):
+    # What autovacuum does between two daily crawls, without it the phase
+    # after a bulk load pays for hint bits and runs on empty statistics
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(text("VACUUM ANALYZE episodes, podcasts"))
+
+
+def reset(engine):
+    with engine.begin() as conn:
+        conn.execute(text("TRUNCATE episodes, podcasts RESTART IDENTITY CASCADE"))
+
+
+def main(args):
+    engine = create_engine(
+        args.database_url,
+        connect_args={"options": f"-csearch_path={SCHEMA}"},
+    )
+    with engine.begin() as conn:
+        conn.execute(text(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE"))
+        conn.execute(text(f"CREATE SCHEMA {SCHEMA}"))
+    Base.metadata.create_all(engine, tables=[Podcast.__table__, Episode.__table__])
+
+    feeds = [make_feed(feed_id) for feed_id in range(1, args.feeds + 1)]
+    batches = [
+        [make_episode(feed.id, i) for i in range(args.episodes)] for feed in feeds
+    ]
+    changed = [
+        [
+            (
+                make_episode(episode.feedId, i, 1)
+                if random.random() < args.changed
+                else episode
+            )
+            for i, episode in enumerate(batch)
+        ]
+        for batch in batches
+    ]
+    total = args.feeds * args.episodes
+    print(f"{args.feeds} feeds x {args.episodes} episodes = {total} episodes")
+
+    implementations = {
+        "read-then-insert": (reference_add_bulk_podcasts, reference_add_bulk_episodes),
+        "on conflict": (upsert_podcasts, upsert_episodes),
+    }
+    try:
+        for name, (write_podcasts, write_episodes) in implementations.items():
+            reset(engine)
+            cold = run(engine, feeds, batches, write_podcasts, write_episodes)
+            settle(engine)
+            recrawl = run(engine, feeds, batches, write_podcasts, write_episodes)
+            settle(engine)
+            updated = run(engine, feeds, changed, write_podcasts, write_episodes)
+            with engine.connect() as conn:
+                stored = conn.execute(text("SELECT count(*) FROM episodes")).scalar()
+                revised = conn.execute(
+                    text("SELECT count(*) FROM episodes WHERE title LIKE '%(rev 1)'")
+                ).scalar()
+            print(
+                f"{name:>16}: cold {cold:6.2f}s ({total / cold:7.0f} eps/s)"
+                f"  recrawl {recrawl:6.2f}s  changed {updated:6.2f}s"
+                f"  stored {stored}, revised {revised}"
+            )
+    finally:
+        with engine.begin() as conn:
+            conn.execute(text(f"DROP SCHEMA {SCHEMA} CASCADE"))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", default=settings.DATABASE_URL)
+    parser.add_argument("--feeds", type=int, default=100)
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--changed", type=float, default=0.1)
+    main(parser.parse_args())
@@ -0,0 +1,238 @@
+"""Async Podcast Index crawler against a local stand-in API.
+
+Starts a threaded HTTP server that mimics the endpoints the crawler uses
+(auth headers are verified, responses are synthetic), adds --latency-ms to
+every response and fails --error-rate of them with 429/503 so the retries
+are exercised. Writes go to in-memory counters, so no db is needed. The
+sequential estimate is requests x latency, what load_from_index.py without
+--async would spend waiting.
+
+With --sync a second, incremental crawl follows the full one, using the
+watermarks the first crawl recorded (kept in memory here). In between,
+--changed of the feeds publish one new episode, the rest are unchanged.
+
+--archive also writes every response to a RawArchive in a temporary
+directory, to see what archiving costs the crawl.
+
+    python scripts/benchmarks/crawler.py --concurrency 16 --rate 50
+    python scripts/benchmarks/crawler.py --sync --feeds 50 --items 200
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import random
+import tempfile
+import threading
+import time
+from contextlib import nullcontext
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+from urllib.parse import parse_qs
+
+from better_search.lib.podcast_index.archive import RawArchive
+from better_search.lib.podcast_index.async_client import AsyncPodcastIndex
+from better_search.lib.podcast_index.crawl_state import next_crawl_state
+from better_search.lib.podcast_index.crawler import PodcastIndexCrawler
+
+API_KEY, API_SECRET = "bench-key", "bench-secret"
+NEWEST = 1_700_000_000
+
+
+def newest(feed_id: int, updated: set) -> int:
+    return NEWEST + 86_400 if feed_id in updated else NEWEST
+
+
+def feed(feed_id: int, updated: set) -> dict:
+    return {
+        "id": feed_id,
+        "url": f"https://feeds.example.com/{feed_id}.xml",
+        "title": f"Podcast {feed_id}",
+        "description": "A podcast",
+        "author": "Author",
+        "image": "https://example.com/image.png",
+        "artwork": "https://example.com/image.png",
+        "newestItemPublishTime": newest(feed_id, updated),
+        "itunesId": None,
+        "trendScore": 9,
+        "language": "en",
+        "categories": {"9": "Business"},
+    }
+
+
+def episodes(feed_id: int, count: int, updated: set, since: int) -> dict:
+    items = [
+        {
+            "id": feed_id * 10_000 + i,
+            "title": f"Episode {i}",
+            "link": "https://example.com",
+            "description": "<p>Episode description</p>",
+            "guid": f"{feed_id}-{i}",
+            "datePublished": newest(feed_id, updated) - i * 86_400,
+            "datePublishedPretty": "",
+            "dateCrawled": 1_700_000_000,
+            "enclosureUrl": "https://example.com/a.mp3",
+            "enclosureType": "audio/mpeg",
+            "enclosureLength": 1,
+            "duration": 3600,
+            "explicit": 0,
+            "feedId": feed_id,
+        }
+        for i in range(count)
+        if newest(feed_id, updated) - i * 86_400 >= since
+    ]
+    return {
+        "status": "true",
+        "items": items,
+        "count": len(items),
+        "query": feed_id,
+        "description": "",
+    }
+
+
+def make_handler(
+    latency: float, error_rate: float, feeds: int, items: int, updated: set
+):
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def reply(self, status: int, body: dict):
+            data = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length", 0))
+            form = {
+                k: v[0] for k, v in parse_qs(self.rfile.read(length).decode()).items()
+            }
+            time.sleep(latency)
+
+            expected = hashlib.sha1(
+                (API_KEY + API_SECRET + self.headers["X-Auth-Date"]).encode()
+            ).hexdigest()
+            if self.headers.get("Authorization") != expected:
+                return self.reply(401, {"status": "false"})
+            if random.random() < error_rate:
+                return self.reply(random.choice([429, 503]), {"status": "false"})
+
+            if self.path.endswith("/podcasts/trending"):
+                base = int(form.get("cat", 0)) * 1000
+                return self.reply(
+                    200,
+                    {
+                        "status": "true",
+                        "feeds": [feed(base + i, updated) for i in range(feeds)],
+                        "count": feeds,
+                        "max": feeds,
+                        "since": "0",
+                        "description": "",
+                    },
+                )
+            if self.path.endswith("/episodes/byfeedid"):
+                since = int(form.get("since", 0))
+                return self.reply(200, episodes(int(form["id"]), items, updated, since))
+            self.reply(404, {"status": "false"})
+
+    return Handler
+
+
+async def crawl(args, base_url: str, states: dict, sync: bool, archive=None):
+    counts = {"podcasts": 0, "episodes": 0}
+
+    def write(kind):
+        def _write(rows):
+            counts[kind] += len(rows)
+            return len(rows)
+
+        return _write
+
+    def write_state(podcast, rows):
+        values = next_crawl_state(podcast, rows, states.get(podcast.id))
+        states[podcast.id] = SimpleNamespace(**values)
+
+    trending = [dict(lang=["en"], max=args.feeds, categories=[c]) for c in range(1, 25)]
+    async with AsyncPodcastIndex(
+        api_key=API_KEY,
+        api_secret=API_SECRET,
+        base_url=base_url,
+        concurrency=args.concurrency,
+        rate_per_second=args.rate,
+        max_retries=6,
+    ) as client:
+        crawler = PodcastIndexCrawler(
+            client,
+            write("podcasts"),
+            write("episodes"),
+            archive=archive,
+            write_state=write_state,
+            states=dict(states) if sync else None,
+        )
+        start = time.perf_counter()
+        stats = await crawler.run([], trending)
+        return time.perf_counter() - start, stats, counts
+
+
+def report(label: str, args, seconds: float, stats, counts: dict):
+    sequential = stats["requests"] * args.latency_ms / 1000
+    print(f"[{label}]")
+    print(f"requests: {stats['requests']} ({stats['retries']} retries)")
+    print(f"written:  {counts['podcasts']} podcasts, {counts['episodes']} episodes")
+    print(f"skipped:  {stats['feeds_skipped']} unchanged feeds")
+    print(f"async:    {seconds:.1f}s ({stats['requests'] / seconds:.1f} req/s)")
+    print(f"sequential estimate: {sequential:.1f}s")
+
+
+def main(args):
+    updated = set()
+    server = ThreadingHTTPServer(
+        ("127.0.0.1", 0),
+        make_handler(
+            args.latency_ms / 1000, args.error_rate, args.feeds, args.items, updated
+        ),
+    )
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/api/1.0"
+
+    states = {}
+    with (
+        tempfile.TemporaryDirectory() as archive_dir,
+        RawArchive(archive_dir) if args.archive else nullcontext() as archive,
+    ):
+        try:
+            report(
+                "full",
+                args,
+                *asyncio.run(crawl(args, base_url, states, False, archive)),
+            )
+            if args.sync:
+                feed_ids = sorted(states)
+                updated.update(
+                    random.sample(feed_ids, int(len(feed_ids) * args.changed))
+                )
+                report(
+                    "sync",
+                    args,
+                    *asyncio.run(crawl(args, base_url, states, True, archive)),
+                )
+        finally:
+            server.shutdown()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--rate", type=float, default=50)
+    parser.add_argument("--latency-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.05)
+    parser.add_argument("--feeds", type=int, default=10)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--sync", action="store_true")
+    parser.add_argument("--archive", action="store_true")
+    parser.add_argument("--changed", type=float, default=0.05)
+    main(parser.parse_args())
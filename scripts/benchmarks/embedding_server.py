@@ -0,0 +1,146 @@
+"""QPS and memory of per-worker models vs the shared embedding server.
+
+Spawns --workers processes that each embed (dense + sparse) queries from
+--threads threads for --seconds, first with the models loaded in every worker
+and then through a freshly started embedding server.
+
+    python scripts/benchmarks/embedding_server.py --workers 4 --threads 8
+"""
+
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import threading
+import time
+
+from better_search.core.config import settings
+
+QUERIES = [
+    "الصحة النفسية وطريقة تفكير العقل",
+    "ثمانية فنجان",
+    "how to raise a seed round for a startup",
+    "the history of the ottoman empire",
+    "اقتصاد النفط في الخليج",
+    "training for a first marathon",
+]
+
+
+def rss_mb(pid: str = "self") -> float:
+    with open(f"/proc/{pid}/status") as status:
+        for line in status:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0.0
+
+
+def worker(mode: str, socket_path: str, threads: int, seconds: float, results):
+    if mode == "server":
+        from better_search.lib.vectorstore.embedding_server import EmbeddingClient
+
+        client = EmbeddingClient(socket_path=socket_path)
+        embed_dense, embed_sparse = client.embed_dense, client.embed_sparse
+    else:
+        from fastembed.embedding import TextEmbedding
+        from fastembed.sparse.bm25 import Bm25
+
+        dense_model = TextEmbedding(settings.LOCAL_EMBEDDING_MODEL)
+        sparse_model = Bm25(settings.SPARSE_EMBEDDING_MODEL)
+        embed_dense = lambda text: next(dense_model.query_embed(text))
+        embed_sparse = lambda text: next(sparse_model.query_embed(text))
+
+    counts = [0] * threads
+    deadline = time.perf_counter() + seconds
+
+    def run(index: int):
+        i = index
+        while time.perf_counter() < deadline:
+            query = f"{QUERIES[i % len(QUERIES)]} {i}"
+            embed_dense(query)
+            embed_sparse(query)
+            counts[index] += 1
+            i += threads
+
+    pool = [threading.Thread(target=run, args=(i,)) for i in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+
+    results.put((sum(counts), rss_mb()))
+
+
+def run_mode(mode: str, socket_path: str, workers: int, threads: int, seconds: float):
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(
+            target=worker, args=(mode, socket_path, threads, seconds, results)
+        )
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    outcomes = [results.get() for _ in processes]
+    for process in processes:
+        process.join()
+
+    total = sum(count for count, _ in outcomes)
+    worker_rss = sum(rss for _, rss in outcomes) / len(outcomes)
+    return total / seconds, worker_rss
+
+
+def start_server(socket_path: str, max_batch_size: int, max_wait_ms: float):
+    server = subprocess.Popen(
+        [
+            sys.executable,
+            "-m",
+            "better_search.lib.vectorstore.embedding_server",
+            "--socket",
+            socket_path,
+            "--max-batch-size",
+            str(max_batch_size),
+            "--max-wait-ms",
+            str(max_wait_ms),
+        ]
+    )
+    while not os.path.exists(socket_path):
+        if server.poll() is not None:
+            raise RuntimeError("Embedding server exited during startup")
+        time.sleep(0.5)
+    return server
+
+
+def main(args):
+    socket_path = f"/tmp/better_search_bench_{os.getpid()}.sock"
+    print(f"{'mode':<10} {'QPS':>8} {'worker RSS MB':>14} {'server RSS MB':>14}")
+
+    qps, worker_rss = run_mode(
+        "inprocess", socket_path, args.workers, args.threads, args.seconds
+    )
+    print(f"{'inprocess':<10} {qps:>8.1f} {worker_rss:>14.1f} {'-':>14}")
+
+    server = start_server(socket_path, args.max_batch_size, args.max_wait_ms)
+    try:
+        qps, worker_rss = run_mode(
+            "server", socket_path, args.workers, args.threads, args.seconds
+        )
+        server_rss = rss_mb(str(server.pid))
+        print(f"{'server':<10} {qps:>8.1f} {worker_rss:>14.1f} {server_rss:>14.1f}")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=20)
+    parser.add_argument(
+        "--max-batch-size", type=int, default=settings.EMBEDDING_SERVER_MAX_BATCH_SIZE
+    )
+    parser.add_argument(
+        "--max-wait-ms", type=float, default=settings.EMBEDDING_SERVER_MAX_WAIT_MS
+    )
+    main(parser.parse_args())
@@ -0,0 +1,197 @@
+"""Parsing Podcast Index responses: full models from dicts vs slim schemas.
+
+Builds synthetic responses shaped like the real API (every field the full
+models declare, html descriptions) and times:
+
+    full **dict    EpisodesResults(**json.loads(body)), what the crawler did
+    slim dict      IngestEpisodesResults.model_validate(json.loads(body))
+    slim json      IngestEpisodesResults.model_validate_json(body)
+
+and the same for search results. Before timing, every field dal.py and the
+crawler read is compared between the full and slim parse (exit code 1 on
+any difference).
+
+    python scripts/benchmarks/ingest_parsing.py --episodes 1000 --repeat 20
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from better_search.lib.podcast_index.schemas import (
+    EpisodesResults,
+    IngestEpisode,
+    IngestEpisodesResults,
+    IngestFeed,
+    IngestFeedResults,
+    SearchResults,
+)
+
+
+def episode(i: int) -> dict:
+    return {
+        "id": 40_000_000_000 + i,
+        "title": f"Episode {i}: a conversation",
+        "link": f"https://example.com/episodes/{i}",
+        "description": "<p>In this episode we talk about <b>things</b> &amp; "
+        "stuff.</p><ul><li>Sponsor: https://example.com/sponsor</li></ul>" * 12,
+        "guid": f"urn:uuid:{i:032x}",
+        "datePublished": 1_700_000_000 - i * 86_400,
+        "datePublishedPretty": "November 14, 2023 10:13pm",
+        "dateCrawled": 1_700_000_500,
+        "enclosureUrl": f"https://cdn.example.com/{i}.mp3",
+        "enclosureType": "audio/mpeg",
+        "enclosureLength": 58_000_000,
+        "duration": 3600 + i,
+        "explicit": 0,
+        "episode": i,
+        "episodeType": "full",
+        "season": 2,
+        "image": f"https://example.com/{i}.jpg",
+        "feedItunesId": 1_500_000_000,
+        "feedUrl": "https://feeds.example.com/show.xml",
+        "feedImage": "https://example.com/show.jpg",
+        "feedId": 920_000,
+        "podcastGuid": "9b024349-ccf0-5f69-a609-6b82873eab3c",
+        "feedLanguage": "ar",
+        "feedDead": 0,
+        "feedDuplicateOf": None,
+        "chaptersUrl": None,
+        "transcriptUrl": f"https://example.com/{i}.vtt",
+    }
+
+
+def feed(i: int) -> dict:
+    return {
+        "id": 920_000 + i,
+        "title": f"Podcast {i}",
+        "url": f"https://feeds.example.com/{i}.xml",
+        "originalUrl": f"https://feeds.example.com/{i}.xml",
+        "link": "https://example.com",
+        "description": "A podcast about things and stuff. " * 10,
+        "author": "Author",
+        "ownerName": "Owner",
+        "image": "https://example.com/show.jpg",
+        "artwork": "https://example.com/show.jpg",
+        "lastUpdateTime": 1_700_000_000,
+        "lastCrawlTime": 1_700_000_100,
+        "lastParseTime": 1_700_000_200,
+        "inPollingQueue": 0,
+        "priority": 5,
+        "lastGoodHttpStatusTime": 1_700_000_100,
+        "lastHttpStatus": 200,
+        "contentType": "application/rss+xml",
+        "itunesId": 1_500_000_000 + i,
+        "generator": None,
+        "language": "ar",
+        "type": 0,
+        "dead": 0,
+        "crawlErrors": 0,
+        "parseErrors": 0,
+        "categories": {"9": "Business", "55": "News"},
+        "locked": 0,
+        "explicit": False,
+        "podcastGuid": f"{i:08x}-ccf0-5f69-a609-6b82873eab3c",
+        "medium": "podcast",
+        "episodeCount": 120,
+        "imageUrlHash": 123456789,
+        "newestItemPubdate": 1_700_000_000,
+    }
+
+
+def mismatches(full_items, slim_items, fields) -> int:
+    count = 0
+    for full, slim in zip(full_items, slim_items):
+        for field in fields:
+            if getattr(full, field) != getattr(slim, field):
+                count += 1
+                print(
+                    f"{field} differs: {getattr(full, field)!r} {getattr(slim, field)!r}"
+                )
+    return count + abs(len(full_items) - len(slim_items))
+
+
+def timed(label: str, func, body: bytes, repeat: int, baseline=None) -> float:
+    func(body)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        func(body)
+    seconds = (time.perf_counter() - start) / repeat
+    speedup = f"  {baseline / seconds:4.1f}x" if baseline else ""
+    print(f"  {label:<12} {seconds * 1000:8.2f} ms/response{speedup}")
+    return seconds
+
+
+def compare(name, body, full, slim, items, fields, repeat) -> int:
+    full_result = full(**json.loads(body))
+    slim_result = slim.model_validate_json(body)
+    errors = mismatches(
+        getattr(full_result, items), getattr(slim_result, items), fields
+    )
+
+    print(f"{name} ({len(body) / 1024:.0f} KiB, {errors} mismatches)")
+    baseline = timed("full **dict", lambda b: full(**json.loads(b)), body, repeat)
+    timed(
+        "slim dict",
+        lambda b: slim.model_validate(json.loads(b)),
+        body,
+        repeat,
+        baseline,
+    )
+    timed("slim json", slim.model_validate_json, body, repeat, baseline)
+    return errors
+
+
+def main(args):
+    episodes_body = json.dumps(
+        {
+            "status": "true",
+            "items": [episode(i) for i in range(args.episodes)],
+            "count": args.episodes,
+            "query": 920_000,
+            "description": "Found matching items.",
+        }
+    ).encode()
+    search_body = json.dumps(
+        {
+            "status": "true",
+            "feeds": [feed(i) for i in range(args.feeds)],
+            "count": args.feeds,
+            "query": "podcast",
+            "description": "Found matching feeds.",
+        }
+    ).encode()
+
+    errors = compare(
+        f"episodes x {args.episodes}",
+        episodes_body,
+        EpisodesResults,
+        IngestEpisodesResults,
+        "items",
+        IngestEpisode.model_fields,
+        args.repeat,
+    )
+    errors += compare(
+        f"search feeds x {args.feeds}",
+        search_body,
+        SearchResults,
+        IngestFeedResults,
+        "feeds",
+        # newestItemPublishTime only exists on trending feeds
+        [
+            field
+            for field in IngestFeed.model_fields
+            if field != "newestItemPublishTime"
+        ],
+        args.repeat,
+    )
+    sys.exit(1 if errors else 0)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--episodes", type=int, default=1000)
+    parser.add_argument("--feeds", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=20)
+    main(parser.parse_args())
@@ -0,0 +1,176 @@
+"""Speed of the text normalization against the old helpers.
+
+The reference implementations below are the BeautifulSoup / five pass regex
+versions that lived in better_search.lib.podcast_index.utils, both are timed
+over the same corpus. That the outputs match is checked by
+tests/test_normalize.py. Uses a synthetic corpus unless --from-db is given.
+
+    python scripts/benchmarks/normalization.py --docs 20000 --workers 4
+"""
+
+import argparse
+import random
+import re
+import time
+import unicodedata
+
+from bs4 import BeautifulSoup
+
+from better_search.lib.text.normalize import map_texts, normalize_description
+
+
+def reference_clean_description(text: str) -> str:
+    if not text:
+        return ""
+
+    soup = BeautifulSoup(text, "html.parser")
+
+    clean_text = soup.get_text(separator=" ", strip=True)
+
+    clean_text = re.sub(
+        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
+        "",
+        clean_text,
+    )
+
+    clean_text = re.sub(r"[\w\.-]+@[\w\.-]+\.\w+", "", clean_text)
+
+    clean_text = re.sub(r"\s+", " ", clean_text)
+    clean_text = clean_text.strip()
+
+    return clean_text
+
+
+def reference_normalize_arabic(text: str) -> str:
+    tashkeel = re.compile(r"[\u0617-\u061A\u064B-\u0652]")
+    text = tashkeel.sub("", text)
+
+    text = re.sub("\u0640", "", text)
+
+    text = re.sub("[إأٱآا]", "ا", text)
+    text = re.sub("ى", "ي", text)
+    text = re.sub("ة", "ه", text)
+
+    text = unicodedata.normalize("NFKC", text)
+    return text
+
+
+def reference_normalize_description(text: str) -> str:
+    return reference_normalize_arabic(reference_clean_description(text))
+
+
+WORDS = [
+    "الحَلْقَة",
+    "بودكاست",
+    "ثمانية",
+    "فنجان",
+    "مُسْتَشْفى",
+    "إدارة",
+    "أسرة",
+    "آخر",
+    "ٱلقرآن",
+    "مدرسة",
+    "طـويـل",
+    "ﷺ",
+    "ﻻ",
+    "episode",
+    "startup",
+    "5>3",
+    "café",
+    "ﬁnance",
+    "①",
+]
+FRAGMENTS = [
+    "<p>{}</p>",
+    "<br>{}",
+    "<br/>{}",
+    '<a href="https://example.com/a?b=1&amp;c=2">{}</a>',
+    "<strong>{}</strong> ",
+    "{} &amp; more",
+    "{}&nbsp;",
+    "&#39;{}&#39;",
+    "&quot;{}&quot;",
+    "&#x627;{}",
+    "{} https://t.co/abc123",
+    "{} contact@example.com",
+    "<ul><li>{}</li><li>",
+    "<p class='a>b'>{}</p>",
+    "{}\n\n\t",
+]
+# Markup that takes the BeautifulSoup path, a few percent of real descriptions
+RARE_FRAGMENTS = [
+    "Q&A {}",
+    "AT&T {}",
+    "a < b {}",
+    "<!-- note -->{}",
+    "<script>var x = '{}';</script>",
+    "<style>p {{ color: red }}</style>{}",
+    "&copy2024 {}",
+    "&unknown; {}",
+    "<3 {}",
+    "<![CDATA[{}]]>",
+]
+
+
+def synthetic_corpus(n: int, seed: int) -> list[str]:
+    rng = random.Random(seed)
+    corpus = ["", " ", "<p></p>"]
+    while len(corpus) < n:
+        parts = []
+        for _ in range(rng.randint(5, 60)):
+            word = " ".join(rng.choices(WORDS, k=rng.randint(1, 4)))
+            fragment = rng.choice(FRAGMENTS) if rng.random() < 0.4 else "{}"
+            parts.append(fragment.format(word))
+        if rng.random() < 0.05:
+            parts.append(rng.choice(RARE_FRAGMENTS).format(rng.choice(WORDS)))
+        corpus.append(" ".join(parts))
+    return corpus
+
+
+def db_corpus(limit: int) -> list[str]:
+    from sqlalchemy import select
+
+    from better_search.db.database import get_db_context
+    from better_search.lib.podcast_index.models import Episode
+
+    with get_db_context() as session:
+        return list(session.scalars(select(Episode.description).limit(limit)))
+
+
+def timed(func, corpus: list[str]) -> float:
+    start = time.perf_counter()
+    func(corpus)
+    return time.perf_counter() - start
+
+
+def main(args):
+    corpus = db_corpus(args.docs) if args.from_db else synthetic_corpus(args.docs, 0)
+    print(f"{len(corpus)} docs\n")
+
+    cases = [
+        (
+            "reference",
+            lambda docs: [reference_normalize_description(d) for d in docs],
+        ),
+        ("unified", lambda docs: [normalize_description(d) for d in docs]),
+        (
+            f"unified x{args.workers} procs",
+            lambda docs: map_texts(normalize_description, docs, workers=args.workers),
+        ),
+    ]
+    print(f"{'implementation':<22} {'seconds':>8} {'docs/s':>10}")
+    for name, func in cases:
+        seconds = timed(func, corpus)
+        print(f"{name:<22} {seconds:>8.2f} {len(corpus) / seconds:>10.0f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--docs", type=int, default=20_000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--from-db",
+        action="store_true",
+        help="Use episode descriptions from the database instead",
+    )
+    main(parser.parse_args())
@@ -0,0 +1,83 @@
+"""Response size of a hybrid search with the full payload vs the projection.
+
+Runs the same fused queries against an indexed collection twice through the
+REST API and reports the bytes qdrant sends back in each case.
+
+    python scripts/benchmarks/payload_projection.py --collection podcast_episodes_
+"""
+
+import argparse
+
+import httpx
+from qdrant_client import models
+
+from better_search.core.config import settings
+from better_search.lib.vectorstore.hybrid_search import (
+    RESULT_PAYLOAD_FIELDS,
+    HybridSearch,
+    get_search_profile,
+)
+
+QUERIES = [
+    "ثمانية",
+    "فنجان",
+    "الصحة النفسية وطريقة تفكير العقل وحل المشاكل",
+    "Lex Fridman",
+    "history of the roman empire and its fall",
+    "startup fundraising advice for first time founders",
+]
+
+
+def response_bytes(
+    http: httpx.Client, collection: str, prefetch: list, with_payload
+) -> int:
+    request = models.QueryRequest(
+        prefetch=prefetch,
+        query=models.FusionQuery(fusion=models.Fusion.RRF),
+        limit=10,
+        with_payload=with_payload,
+    )
+    response = http.post(
+        f"/collections/{collection}/points/query",
+        content=request.model_dump_json(exclude_none=True),
+        headers={"Content-Type": "application/json"},
+    )
+    response.raise_for_status()
+    return len(response.content)
+
+
+def main(collection: str, mode: str, url: str):
+    searcher = HybridSearch(collection, url=url, mode=mode)
+    http = httpx.Client(base_url=url, timeout=30)
+
+    full_total, projected_total = 0, 0
+    print(f"{'query':<50} {'full':>9} {'projected':>10}")
+    for query in QUERIES:
+        dense, sparse = searcher._get_query_embeddings(query)
+        prefetch = searcher._get_prefetch(
+            length=len(query.split()),
+            query=query,
+            query_dense_vector=dense,
+            query_sparse_vector=sparse,
+            profile=get_search_profile(),
+        )
+        full = response_bytes(http, collection, prefetch, True)
+        projected = response_bytes(http, collection, prefetch, RESULT_PAYLOAD_FIELDS)
+        full_total += full
+        projected_total += projected
+        print(f"{query[:50]:<50} {full:>9} {projected:>10}")
+
+    print(
+        f"total: {full_total} -> {projected_total} bytes "
+        f"({100 * (1 - projected_total / full_total):.1f}% smaller)"
+    )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--collection", default="podcast_episodes_")
+    parser.add_argument("--mode", choices=["local", "openai"], default="local")
+    parser.add_argument("--url", default=settings.QDRANT_BASE_URL)
+    args = parser.parse_args()
+
+    main(collection=args.collection, mode=args.mode, url=args.url)
@@ -0,0 +1,155 @@
+"""Memory, latency and recall of scalar/binary quantization vs float32.
+
+Builds one collection per quantization setting from the same synthetic
+1536-dim (openai sized) vectors and queries it with the `balanced` profile
+search params. Recall@10 is measured against brute force computed in numpy.
+Needs a qdrant server, the in-process client ignores quantization.
+
+"RSS MB" is measured: the growth of the server's memory_resident_bytes (from
+its /metrics endpoint) across building and querying the collection. The
+allocator keeps freed memory around, so for clean numbers run one setting
+per fresh server with --only. "est. MB" is the vectors kept in RAM by
+formula (float32 originals, or only the always_ram quantized copy).
+
+    python scripts/benchmarks/quantization.py --url http://localhost:6333
+    python scripts/benchmarks/quantization.py --only binary
+"""
+
+import argparse
+import time
+from typing import Optional
+
+import httpx
+import numpy as np
+from qdrant_client import QdrantClient, models
+
+from better_search.core.config import settings
+from better_search.lib.vectorstore.base import get_quantization_config
+from better_search.lib.vectorstore.hybrid_search import get_search_profile
+
+DIM = 1536
+VECTOR_NAME = "openai"
+
+
+def random_unit_vectors(rng: np.random.Generator, n: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def resident_bytes(url: str) -> Optional[int]:
+    # None when the server does not export memory metrics
+    try:
+        response = httpx.get(f"{url.rstrip('/')}/metrics", timeout=10)
+        response.raise_for_status()
+    except httpx.HTTPError:
+        return None
+    for line in response.text.splitlines():
+        if line.startswith("memory_resident_bytes "):
+            return int(float(line.split()[1]))
+    return None
+
+
+def estimated_ram_mb(quantization: str, points: int) -> float:
+    bytes_per_vector = {"none": DIM * 4, "scalar": DIM, "binary": DIM / 8}
+    return bytes_per_vector[quantization] * points / 1024**2
+
+
+def build_collection(
+    client: QdrantClient, name: str, quantization: str, corpus: np.ndarray
+):
+    if client.collection_exists(name):
+        client.delete_collection(name)
+
+    quantization_config = get_quantization_config(quantization)
+    client.create_collection(
+        collection_name=name,
+        vectors_config={
+            VECTOR_NAME: models.VectorParams(
+                size=DIM,
+                distance=models.Distance.COSINE,
+                on_disk=True if quantization_config else None,
+            )
+        },
+        quantization_config=quantization_config,
+    )
+
+    batch_size = 500
+    for start in range(0, len(corpus), batch_size):
+        batch = corpus[start : start + batch_size]
+        client.upsert(
+            collection_name=name,
+            points=models.Batch(
+                ids=list(range(start, start + len(batch))),
+                vectors={VECTOR_NAME: batch.tolist()},
+            ),
+            wait=True,
+        )
+
+    # Wait for the optimizer so HNSW and quantized segments are in place
+    while client.get_collection(name).status != models.CollectionStatus.GREEN:
+        time.sleep(1)
+
+
+def main(url: str, points: int, n_queries: int, seed: int, only: Optional[str]):
+    rng = np.random.default_rng(seed)
+    client = QdrantClient(url=url, timeout=120)
+
+    corpus = random_unit_vectors(rng, points)
+    queries = random_unit_vectors(rng, n_queries)
+    truth = np.argsort(-(queries @ corpus.T), axis=1)[:, :10]
+    params = get_search_profile("balanced").search_params()
+
+    print(
+        f"{'quantization':<13} {'RSS MB':>8} {'est. MB':>8} {'p50 ms':>8} "
+        f"{'p99 ms':>8} {'recall@10':>10}"
+    )
+    for quantization in [only] if only else ["none", "scalar", "binary"]:
+        name = f"bench_quantization_{quantization}"
+        before = resident_bytes(url)
+        build_collection(client, name, quantization, corpus)
+
+        latencies, recalls = [], []
+        for query, expected in zip(queries, truth):
+            start = time.perf_counter()
+            response = client.query_points(
+                collection_name=name,
+                query=query.tolist(),
+                using=VECTOR_NAME,
+                limit=10,
+                search_params=params,
+            )
+            latencies.append((time.perf_counter() - start) * 1000)
+            found = {point.id for point in response.points}
+            recalls.append(len(found & set(expected.tolist())) / 10)
+
+        after = resident_bytes(url)
+        measured = (
+            f"{(after - before) / 1024**2:>8.1f}"
+            if before is not None and after is not None
+            else f"{'n/a':>8}"
+        )
+        print(
+            f"{quantization:<13} {measured} "
+            f"{estimated_ram_mb(quantization, points):>8.1f} "
+            f"{np.percentile(latencies, 50):>8.2f} "
+            f"{np.percentile(latencies, 99):>8.2f} {np.mean(recalls):>10.3f}"
+        )
+        client.delete_collection(name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--url", default=settings.QDRANT_BASE_URL)
+    parser.add_argument("--points", type=int, default=50_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", choices=["none", "scalar", "binary"])
+    args = parser.parse_args()
+
+    main(
+        url=args.url,
+        points=args.points,
+        n_queries=args.queries,
+        seed=args.seed,
+        only=args.only,
+    )
@@ -0,0 +1,162 @@
+"""Recall vs latency of the hybrid search profiles on a synthetic corpus.
+
+Every profile is compared with the `exact` profile, whose fused top 10 is used
+as ground truth. It needs a real qdrant server (QDRANT_BASE_URL by default):
+the local (in-process / path) mode always scans, every profile would be exact.
+Queries only start once the server reports the HNSW index as built.
+
+    python scripts/benchmarks/search_profiles.py --points 20000 --queries 200
+"""
+
+import argparse
+import sys
+import time
+
+import numpy as np
+from fastembed import SparseEmbedding
+from qdrant_client import QdrantClient, models
+
+from better_search.core.config import settings
+from better_search.lib.vectorstore.hybrid_search import (
+    SEARCH_PROFILES,
+    build_prefetch,
+)
+
+COLLECTION_NAME = "bench_search_profiles"
+DENSE_NAME = "fast-paraphrase-multilingual-minilm-l12-v2"
+SPARSE_NAME = "fast-sparse-bm25"
+DIM = 384
+VOCAB_SIZE = 30_000
+TERMS_PER_DOC = 60
+
+
+def random_sparse(rng: np.random.Generator, terms: int) -> SparseEmbedding:
+    indices = rng.choice(VOCAB_SIZE, size=terms, replace=False)
+    values = rng.random(terms, dtype=np.float32)
+    return SparseEmbedding(values=values, indices=indices)
+
+
+def random_dense(rng: np.random.Generator, n: int) -> np.ndarray:
+    vectors = rng.standard_normal((n, DIM), dtype=np.float32)
+    return vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+
+def build_collection(client: QdrantClient, points: int, rng: np.random.Generator):
+    if client.collection_exists(COLLECTION_NAME):
+        client.delete_collection(COLLECTION_NAME)
+
+    client.create_collection(
+        collection_name=COLLECTION_NAME,
+        vectors_config={
+            DENSE_NAME: models.VectorParams(size=DIM, distance=models.Distance.COSINE)
+        },
+        sparse_vectors_config={SPARSE_NAME: models.SparseVectorParams()},
+        # Build the HNSW graph even for small corpora
+        optimizers_config=models.OptimizersConfigDiff(indexing_threshold=1000),
+    )
+
+    batch_size = 1000
+    for start in range(0, points, batch_size):
+        count = min(batch_size, points - start)
+        dense = random_dense(rng, count)
+        client.upsert(
+            collection_name=COLLECTION_NAME,
+            points=[
+                models.PointStruct(
+                    id=start + i,
+                    vector={
+                        DENSE_NAME: dense[i].tolist(),
+                        SPARSE_NAME: models.SparseVector(
+                            **random_sparse(rng, TERMS_PER_DOC).as_object()
+                        ),
+                    },
+                )
+                for i in range(count)
+            ],
+        )
+
+    # Searching while the optimizer is still running would scan the
+    # unindexed segments
+    while True:
+        info = client.get_collection(COLLECTION_NAME)
+        if info.status == models.CollectionStatus.GREEN:
+            break
+        time.sleep(1)
+    print(f"{info.indexed_vectors_count} of {info.points_count} vectors in HNSW")
+
+
+def run_profile(client: QdrantClient, profile_name: str, queries: list) -> tuple:
+    profile = SEARCH_PROFILES[profile_name]
+    latencies, results = [], []
+    for dense, sparse, text in queries:
+        prefetch = build_prefetch(
+            mode="local",
+            length=len(text.split()),
+            query=text,
+            query_dense_vector=dense,
+            query_sparse_vector=sparse,
+            profile=profile,
+        )
+        start = time.perf_counter()
+        response = client.query_points(
+            collection_name=COLLECTION_NAME,
+            prefetch=prefetch,
+            query=models.FusionQuery(fusion=models.Fusion.RRF),
+            limit=10,
+            with_payload=False,
+        )
+        latencies.append((time.perf_counter() - start) * 1000)
+        results.append([point.id for point in response.points])
+    return np.array(latencies), results
+
+
+def main(url: str, points: int, n_queries: int, seed: int):
+    rng = np.random.default_rng(seed)
+    client = QdrantClient(url=url)
+
+    print(f"Indexing {points} synthetic points...")
+    build_collection(client, points, rng)
+
+    # Long queries so the dense prefetch takes part in the fusion
+    text = "synthetic benchmark query with many terms"
+    queries = [
+        (dense, random_sparse(rng, 6), text) for dense in random_dense(rng, n_queries)
+    ]
+
+    _, truth = run_profile(client, "exact", queries)
+
+    print(f"{'profile':<10} {'recall@10':>10} {'p50 ms':>8} {'p95 ms':>8}")
+    for profile_name in SEARCH_PROFILES:
+        latencies, results = run_profile(client, profile_name, queries)
+        recall = np.mean(
+            [
+                len(set(found) & set(expected)) / max(len(expected), 1)
+                for found, expected in zip(results, truth)
+            ]
+        )
+        print(
+            f"{profile_name:<10} {recall:>10.3f} "
+            f"{np.percentile(latencies, 50):>8.2f} {np.percentile(latencies, 95):>8.2f}"
+        )
+
+    client.delete_collection(COLLECTION_NAME)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--url",
+        default=settings.QDRANT_BASE_URL,
+        help="Qdrant server url, local mode is refused",
+    )
+    parser.add_argument("--points", type=int, default=20_000)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    if not args.url.startswith(("http://", "https://")):
+        sys.exit(
+            f"--url {args.url!r} is not a server url, qdrant's local mode "
+            "always scans and can't show the HNSW tradeoff"
+        )
+
+    main(url=args.url, points=args.points, n_queries=args.queries, seed=args.seed)
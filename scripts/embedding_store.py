@@ -0,0 +1,85 @@
+from better_search.core.config import settings
+from better_search.core.logger import get_logger
+from better_search.lib.vectorstore.embedding_store import list_stores
+from better_search.lib.vectorstore.indexing import EmbeddingType, open_embedding_store
+
+from qdrant_client import QdrantClient
+
+logger = get_logger()
+
+
+def indexed_hashes(qdrant_client: QdrantClient, collection_name: str) -> set[str]:
+    hashes = set()
+    offset = None
+    while True:
+        points, offset = qdrant_client.scroll(
+            collection_name=collection_name,
+            limit=1000,
+            offset=offset,
+            with_payload=["content_hash"],
+            with_vectors=False,
+        )
+        hashes.update(
+            point.payload["content_hash"]
+            for point in points
+            if "content_hash" in point.payload
+        )
+        if offset is None:
+            return hashes
+
+
+def stats():
+    stores = list_stores(settings.EMBEDDING_STORE_DIR)
+    if not stores:
+        print(f"No embedding stores in {settings.EMBEDDING_STORE_DIR}")
+    for store in stores:
+        store_stats = store.stats()
+        print(
+            f"{store_stats['model']} ({store_stats['dims']}d): "
+            f"{store_stats['entries']} vectors in {store_stats['shards']} shards, "
+            f"{store_stats['bytes'] / 1024**2:.1f} MB"
+        )
+
+
+def prune(embedding_type: EmbeddingType, collections: list[str]):
+    store = open_embedding_store(embedding_type)
+    if collections:
+        # Keep every vector that is still referenced by one of the collections
+        qdrant_client = QdrantClient(url=settings.QDRANT_BASE_URL)
+        keep = set()
+        for collection_name in collections:
+            keep |= indexed_hashes(qdrant_client, collection_name)
+        removed = store.compact(keep)
+    else:
+        removed = store.compact()
+    logger.info(f"Pruned {removed} vectors, {len(store)} left")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    subparsers.add_parser("stats", help="Report the size of every embedding store")
+    prune_parser = subparsers.add_parser(
+        "prune", help="Drop vectors no collection uses and compact the shards"
+    )
+    prune_parser.add_argument(
+        "--dense",
+        choices=["local", "openai"],
+        default="openai",
+        help="Store of the local or openai dense model",
+    )
+    prune_parser.add_argument(
+        "--collection",
+        action="append",
+        default=[],
+        help="Keep the vectors indexed in this collection, repeatable. "
+        "Without it the store is only compacted",
+    )
+    args = parser.parse_args()
+
+    if args.command == "stats":
+        stats()
+    else:
+        prune(args.dense, args.collection)
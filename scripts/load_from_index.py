@@ -1,5 +1,8 @@
+import asyncio
 import datetime
 import time
+from contextlib import nullcontext
+from typing import Optional
 
 
 from better_search.core.logger import get_logger
@@ -11,10 +14,21 @@ from better_search.lib.podcast_index.utils import (
 )
 
 from better_search.db.database import get_db_context
+from better_search.core.config import settings
+from better_search.lib.podcast_index.archive import RawArchive, replay_archive
+from better_search.lib.podcast_index.async_client import AsyncPodcastIndex
+from better_search.lib.podcast_index.crawl_state import (
+    episodes_since,
+    is_feed_unchanged,
+)
+from better_search.lib.podcast_index.crawler import DbWriter, PodcastIndexCrawler
 from better_search.lib.podcast_index.dal import (
     add_bulk_episodes,
     add_bulk_podcasts,
+    get_feed_crawl_states,
+    save_feed_crawl_state,
 )
+from better_search.workers.tasks import crawl_workflow
 
 logger = get_logger()
 
@@ -47,24 +61,27 @@ top_podcast_categories = {
 }
 
 
-def main():
-    index = initialize_podcast_index()
+queries = [
+    "ثمانية",
+    "بدون ورق",
+    "بترولي",
+    "مايكس",
+    "Lex Fridman",
+    "Joe Rogan",
+]
+languages = ["ar", "en"]
 
-    date_2024_01_01 = datetime.datetime(2024, 1, 1)
-    timestamp_2024_01_01 = int(time.mktime(date_2024_01_01.timetuple()))
+date_2024_01_01 = datetime.datetime(2024, 1, 1)
+timestamp_2024_01_01 = int(time.mktime(date_2024_01_01.timetuple()))
 
-    queries = [
-        "ثمانية",
-        "بدون ورق",
-        "بترولي",
-        "مايكس",
-        "Lex Fridman",
-        "Joe Rogan",
-    ]
+
+def main(archive: Optional[RawArchive] = None, sync: bool = False):
+    index = initialize_podcast_index()
+    skipped = 0
 
     for query in queries:
         search_results, search_raw = search_podcasts(
-            index, query, clean=True, max_results=5
+            index, query, clean=True, max_results=5, archive=archive
         )
 
         if search_results is not None and search_results.status == "true":
@@ -76,20 +93,40 @@ def main():
                     podcasts=search_results.feeds, session=session
                 )
                 logger.info(f"{pd_result} podcasts was inserted to the database")
+                states = (
+                    get_feed_crawl_states(
+                        [podcast.id for podcast in search_results.feeds], session
+                    )
+                    if sync
+                    else {}
+                )
                 for podcast in search_results.feeds:
-                    episodes = get_podcast_episodes(index, podcast)
-                    logger.info(f"Got {episodes.count} for {podcast.title}")
+                    state = states.get(podcast.id)
+                    if sync and is_feed_unchanged(podcast, state):
+                        skipped += 1
+                        continue
+                    episodes = get_podcast_episodes(
+                        index,
+                        podcast,
+                        archive=archive,
+                        since=episodes_since(state) if sync else None,
+                    )
                     if episodes is not None and episodes.status == "true":
-                        ep_result = add_bulk_episodes(episodes.items, session)
+                        logger.info(f"Got {episodes.count} for {podcast.title}")
+                        ep_result = (
+                            add_bulk_episodes(episodes.items, session)
+                            if episodes.items
+                            else 0
+                        )
                         if ep_result is not None:
+                            if sync:
+                                save_feed_crawl_state(podcast, episodes.items, session)
                             logger.info(
                                 f"{ep_result} episode for {podcast.title} was inserted to the database"
                             )
                         else:
                             logger.error(f"Failed to save episodes for {podcast.title}")
 
-    languages = ["ar", "en"]
-
     for lang in languages:
         for cat in top_podcast_categories:
             trending_results, trending_raw = get_trending_podcasts(
@@ -98,6 +135,7 @@ def main():
                 max_results=50,
                 categories=[top_podcast_categories[cat]],
                 since=timestamp_2024_01_01,
+                archive=archive,
             )
             if trending_results and trending_results.status == "true":
                 logger.info(
@@ -117,9 +155,24 @@ def main():
                         f"{podcasts_count} {lang} {cat} podcasts were inserted to the database"
                     )
 
+                    states = (
+                        get_feed_crawl_states(
+                            [podcast.id for podcast in trending_results.feeds],
+                            session,
+                        )
+                        if sync
+                        else {}
+                    )
                     for podcast in trending_results.feeds:
+                        state = states.get(podcast.id)
+                        if sync and is_feed_unchanged(podcast, state):
+                            skipped += 1
+                            continue
                         try:
-                            episodes = get_podcast_episodes(index, podcast)
+                            since = episodes_since(state) if sync else None
+                            episodes = get_podcast_episodes(
+                                index, podcast, archive=archive, since=since
+                            )
                             if (
                                 episodes
                                 and hasattr(episodes, "items")
@@ -132,6 +185,10 @@ def main():
                                     episodes.items, session
                                 )
                                 if episodes_count is not None:
+                                    if sync:
+                                        save_feed_crawl_state(
+                                            podcast, episodes.items, session
+                                        )
                                     logger.info(
                                         f"{episodes_count} episodes for {podcast.title} was inserted to the database"
                                     )
@@ -139,6 +196,9 @@ def main():
                                     logger.error(
                                         f"Failed to save episodes for {podcast.title}"
                                     )
+                            elif since is not None and episodes:
+                                save_feed_crawl_state(podcast, [], session)
+                                logger.info(f"No new episodes for {podcast.title}")
                             else:
                                 logger.warning(
                                     f"No episodes found for podcast: {podcast.title}"
@@ -149,6 +209,137 @@ def main():
                             )
                             continue
 
+    if sync:
+        logger.info(f"Skipped {skipped} unchanged feeds")
+
+
+async def main_async(
+    concurrency: int,
+    rate: float,
+    base_url: str,
+    archive: Optional[RawArchive] = None,
+    sync: bool = False,
+):
+    trending = [
+        dict(
+            lang=[lang],
+            max=50,
+            categories=[top_podcast_categories[cat]],
+            since=timestamp_2024_01_01,
+        )
+        for lang in languages
+        for cat in top_podcast_categories
+    ]
+
+    start = time.perf_counter()
+    async with AsyncPodcastIndex(
+        base_url=base_url, concurrency=concurrency, rate_per_second=rate
+    ) as client:
+        with get_db_context() as session:
+            writer = DbWriter(session)
+            crawler = PodcastIndexCrawler(
+                client,
+                writer.podcasts,
+                writer.episodes,
+                archive=archive,
+                write_state=writer.crawl_state if sync else None,
+                # The whole table is one row per feed ever crawled, loading it
+                # up front keeps the session out of the fetcher tasks
+                states=get_feed_crawl_states(None, session) if sync else None,
+            )
+            stats = await crawler.run(queries, trending)
+
+    logger.info(f"Crawl finished in {time.perf_counter() - start:.1f}s: {dict(stats)}")
+
+
+def main_celery(sync: bool = False, wait: bool = False):
+    trending = [
+        dict(
+            lang=lang,
+            category=top_podcast_categories[cat],
+            max_results=50,
+            since=timestamp_2024_01_01,
+        )
+        for lang in languages
+        for cat in top_podcast_categories
+    ]
+    result = crawl_workflow(queries, trending, sync=sync).apply_async()
+    logger.info(f"Submitted crawl workflow {result.id}")
+    if wait:
+        logger.info(f"Crawl finished: {result.get()}")
+
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--async",
+        dest="use_async",
+        action="store_true",
+        help="Crawl concurrently with the rate limited async client",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=settings.PODCAST_INDEX_MAX_CONCURRENCY,
+        help="Requests in flight at once in --async mode",
+    )
+    parser.add_argument(
+        "--rate",
+        type=float,
+        default=settings.PODCAST_INDEX_RATE_PER_SECOND,
+        help="Requests per second allowed by the token bucket in --async mode",
+    )
+    parser.add_argument(
+        "--base-url",
+        default=settings.PODCAST_INDEX_BASE_URL,
+        help="Podcast Index API root, point it at a stand-in server for testing",
+    )
+    parser.add_argument(
+        "--archive",
+        action="store_true",
+        help="Append every raw API response to the archive in RAW_ARCHIVE_DIR",
+    )
+    parser.add_argument(
+        "--sync",
+        action="store_true",
+        help="Skip feeds unchanged since their last crawl and only fetch "
+        "episodes newer than the stored watermark. Only --sync runs read and "
+        "record the watermarks (the feed_crawl_state table), the first one "
+        "crawls everything",
+    )
+    parser.add_argument(
+        "--celery",
+        action="store_true",
+        help="Fan the crawl out as celery tasks, one per listing and per feed",
+    )
+    parser.add_argument(
+        "--wait",
+        action="store_true",
+        help="With --celery, block until the workflow is done and log its stats",
+    )
+    parser.add_argument(
+        "--replay",
+        nargs="*",
+        metavar="DATE",
+        help="Ingest from the archive instead of the API, all crawl dates "
+        "or only the given YYYY-MM-DD ones",
+    )
+    args = parser.parse_args()
+
+    if args.replay is not None:
+        with get_db_context() as session:
+            replay_archive(RawArchive(), session, dates=args.replay or None)
+    elif args.celery:
+        main_celery(args.sync, args.wait)
+    else:
+        with RawArchive() if args.archive else nullcontext() as archive:
+            if args.use_async:
+                asyncio.run(
+                    main_async(
+                        args.concurrency, args.rate, args.base_url, archive, args.sync
+                    )
+                )
+            else:
+                main(archive, args.sync)
@@ -0,0 +1,50 @@
+import gzip
+import json
+
+from better_search.lib.podcast_index.archive import RawArchive
+from better_search.lib.podcast_index.parsing import (
+    parse_episodes_results,
+    parse_trending_results,
+)
+
+# Odd but valid JSON: key order, spacing, escapes and non ascii text
+EPISODES_BODY = (
+    b'{"status":"true", "items":[{"id":1,'
+    b'"title":"\\u0627 \xd8\xad\xd9\x84\xd9\x82\xd8\xa9",'
+    b'"description":"line\\nbreak","guid":"g-1","datePublished":1700000000,'
+    b'"duration":60,"feedId":42}],\n "count":1}'
+)
+TRENDING = {"status": "true", "feeds": [], "count": 0}
+
+
+def test_records_keep_the_body_bytes(tmp_path):
+    with RawArchive(str(tmp_path)) as archive:
+        archive.write("episodes", {"feed_id": 42, "since": None}, EPISODES_BODY)
+        archive.write("trending", {"lang": ["ar"]}, TRENDING)
+
+    records = list(RawArchive(str(tmp_path)).records())
+
+    # Replay order puts feeds before episodes
+    assert [record["kind"] for record in records] == ["trending", "episodes"]
+    assert records[1]["request"] == {"feed_id": 42, "since": None}
+    assert records[1]["body"] == EPISODES_BODY
+    assert json.loads(records[0]["body"]) == TRENDING
+
+    episodes = parse_episodes_results(records[1]["body"])
+    assert episodes.items[0].title == "ا حلقة"
+    assert parse_trending_results(records[0]["body"]).feeds == []
+
+
+def test_runs_append_and_torn_records_are_skipped(tmp_path):
+    for _ in range(2):
+        with RawArchive(str(tmp_path)) as archive:
+            archive.write("episodes", {"feed_id": 42}, EPISODES_BODY)
+
+    (path,) = tmp_path.glob("*/episodes.raw.gz")
+    # A run killed while writing its record
+    with gzip.open(path, "ab") as archive_file:
+        header = {"kind": "episodes", "request": {}, "size": len(EPISODES_BODY)}
+        archive_file.write(json.dumps(header).encode() + b"\n" + EPISODES_BODY[:20])
+
+    records = list(RawArchive(str(tmp_path)).records())
+    assert [record["body"] for record in records] == [EPISODES_BODY] * 2
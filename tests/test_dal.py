@@ -0,0 +1,97 @@
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+
+from better_search.lib.podcast_index.dal import upsert_episodes, upsert_podcasts
+from better_search.lib.podcast_index.models import Episode, Podcast
+from better_search.lib.podcast_index.schemas import IngestEpisode, IngestFeed
+
+
+def feed(**fields) -> IngestFeed:
+    return IngestFeed(
+        **{
+            "id": 7,
+            "url": "https://feeds.example.com/7.xml",
+            "title": "Podcast",
+            "author": "Author",
+            "image": "https://example.com/7.png",
+            "categories": {"1": "Arts"},
+            **fields,
+        }
+    )
+
+
+def episode(number: int, **fields) -> IngestEpisode:
+    return IngestEpisode(
+        **{
+            "id": 700 + number,
+            "title": f"Episode {number}",
+            "description": f"<p>Episode <b>{number}</b></p>",
+            "guid": f"guid-{number}",
+            "datePublished": 1700000000 + number,
+            "duration": 60,
+            "feedId": 7,
+            **fields,
+        }
+    )
+
+
+def writes(engine) -> list[str]:
+    statements = []
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not statement.lstrip().upper().startswith("SELECT"):
+            statements.append(statement)
+
+    return statements
+
+
+def test_recrawl_only_sends_changed_episodes(pg_schema):
+    engine, _ = pg_schema
+    episodes = [episode(number) for number in range(5)]
+    with Session(engine) as session:
+        upsert_podcasts([feed()], session)
+        assert upsert_episodes(episodes, session) == {
+            "inserted": 5,
+            "updated": 0,
+            "unchanged": 0,
+        }
+
+        statements = writes(engine)
+        assert upsert_episodes(episodes, session) == {
+            "inserted": 0,
+            "updated": 0,
+            "unchanged": 5,
+        }
+        # Unchanged episodes never reach the upsert
+        assert statements == []
+
+        episodes[2] = episode(2, description="<p>New <i>notes</i></p>")
+        assert upsert_episodes(episodes + [episode(5)], session) == {
+            "inserted": 1,
+            "updated": 1,
+            "unchanged": 4,
+        }
+        assert len(statements) == 1
+
+        stored = session.execute(
+            select(Episode.clean_description, Episode.snippet).where(
+                Episode.guid == "guid-2"
+            )
+        ).one()
+    assert stored == ("New notes", "New notes")
+
+
+def test_feeds_keep_fields_the_listing_does_not_carry(pg_schema):
+    engine, _ = pg_schema
+    with Session(engine) as session:
+        upsert_podcasts([feed(itunesId=42)], session)
+
+        statements = writes(engine)
+        # A search listing without the itunes id is the same feed
+        assert upsert_podcasts([feed()], session)["unchanged"] == 1
+        assert statements == []
+
+        assert upsert_podcasts([feed(title="Renamed")], session)["updated"] == 1
+        podcast = session.scalars(select(Podcast)).one()
+    assert (podcast.title, podcast.itunesId) == ("Renamed", 42)
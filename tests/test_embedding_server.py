@@ -0,0 +1,114 @@
+import asyncio
+import json
+import socket
+import threading
+
+import numpy as np
+import pytest
+from fastembed import SparseEmbedding
+
+from better_search.lib.vectorstore import embedding_server
+from better_search.lib.vectorstore.embedding_server import (
+    EmbeddingClient,
+    EmbeddingServer,
+    _LENGTH,
+    _pack,
+    _recv_exactly,
+)
+
+
+class FakeDense:
+    def __init__(self, model_name: str):
+        pass
+
+    def query_embed(self, texts):
+        return [np.full(4, len(text), dtype=np.float32) for text in texts]
+
+
+class FakeSparse(FakeDense):
+    def query_embed(self, texts):
+        return [
+            SparseEmbedding(indices=np.array([len(text)]), values=np.array([1.0]))
+            for text in texts
+        ]
+
+
+@pytest.fixture
+def server_socket(tmp_path, monkeypatch):
+    monkeypatch.setattr(embedding_server, "TextEmbedding", FakeDense)
+    monkeypatch.setattr(embedding_server, "Bm25", FakeSparse)
+    socket_path = str(tmp_path / "embeddings.sock")
+    server = EmbeddingServer(socket_path=socket_path, max_wait_ms=1)
+
+    loop = asyncio.new_event_loop()
+    task = loop.create_task(server.serve())
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    for _ in range(200):
+        if (tmp_path / "embeddings.sock").exists():
+            break
+        threading.Event().wait(0.01)
+
+    yield socket_path
+
+    async def stop():
+        # serve() cancels its batchers, connection handlers are still open
+        task.cancel()
+        others = [t for t in asyncio.all_tasks() if t is not asyncio.current_task()]
+        for other in others:
+            other.cancel()
+        await asyncio.gather(task, *others, return_exceptions=True)
+
+    asyncio.run_coroutine_threadsafe(stop(), loop).result(timeout=5)
+    loop.call_soon_threadsafe(loop.stop)
+    thread.join(timeout=5)
+    loop.close()
+
+
+def raw_request(sock: socket.socket, header: bytes) -> dict:
+    sock.sendall(_LENGTH.pack(len(header)) + header + _LENGTH.pack(0))
+    (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    response = json.loads(_recv_exactly(sock, size))
+    (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+    _recv_exactly(sock, size)
+    return response
+
+
+def test_vectors_round_trip(server_socket):
+    client = EmbeddingClient(socket_path=server_socket, timeout=5)
+
+    np.testing.assert_array_equal(client.embed_dense("abc"), np.full(4, 3))
+    assert client.embed_sparse("abcd").indices.tolist() == [4]
+    client._close()
+
+
+def test_bad_requests_get_an_error_reply(server_socket):
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(5)
+        sock.connect(server_socket)
+
+        response = raw_request(sock, b'{"kind": "bogus", "text": "x"}')
+        assert response["ok"] is False
+        assert "unknown kind 'bogus'" in response["error"]
+
+        response = raw_request(sock, b'{"text": "x"}')
+        assert "unknown kind None" in response["error"]
+
+        response = raw_request(sock, b'{"kind": "dense"}')
+        assert "text is missing" in response["error"]
+
+        response = raw_request(sock, b"not json")
+        assert "malformed request header" in response["error"]
+
+        # The connection is still usable afterwards
+        sock.sendall(_pack({"kind": "dense", "text": "ab"}))
+        (size,) = _LENGTH.unpack(_recv_exactly(sock, _LENGTH.size))
+        assert b'"ok": true' in _recv_exactly(sock, size)
+
+
+def test_client_surfaces_the_server_error(server_socket):
+    client = EmbeddingClient(socket_path=server_socket, timeout=5)
+
+    with pytest.raises(RuntimeError, match="unknown kind 'bogus'"):
+        client._request("bogus", "text")
+    client._close()
@@ -0,0 +1,61 @@
+import hashlib
+
+import numpy as np
+
+from better_search.lib.vectorstore.embedding_store import EmbeddingStore
+
+DIMS = 8
+
+
+def hashes(start: int, count: int) -> list[str]:
+    return [hashlib.sha256(str(i).encode()).hexdigest() for i in range(start, count)]
+
+
+def vectors(start: int, count: int) -> np.ndarray:
+    return np.arange(start * DIMS, count * DIMS, dtype=np.float32).reshape(-1, DIMS)
+
+
+def assert_stored(store: EmbeddingStore, start: int, count: int):
+    stored = store.get_many(hashes(start, count))
+    np.testing.assert_array_equal(np.stack(stored), vectors(start, count))
+
+
+def test_round_trip_across_shards(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model/name", DIMS, shard_rows=4)
+    assert store.put_many(hashes(0, 10), vectors(0, 10)) == 10
+    assert store.put_many(hashes(5, 12), vectors(5, 12)) == 2
+
+    reopened = EmbeddingStore(str(tmp_path), "model/name", DIMS, shard_rows=4)
+    assert len(reopened) == 12
+    assert reopened.stats()["shards"] == 3
+    assert_stored(reopened, 0, 12)
+
+
+def test_append_after_torn_row(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model", DIMS)
+    store.put_many(hashes(0, 3), vectors(0, 3))
+
+    # A crash in the middle of the next put: a whole row and half of another
+    # reached the shard, the index records were never written
+    with open(store._shard_path(0), "ab") as f:
+        f.write(vectors(100, 101).tobytes())
+        f.write(vectors(101, 102).tobytes()[: DIMS * 2])
+
+    reopened = EmbeddingStore(str(tmp_path), "model", DIMS)
+    assert reopened.put_many(hashes(3, 6), vectors(3, 6)) == 3
+    assert_stored(reopened, 0, 6)
+
+    reopened = EmbeddingStore(str(tmp_path), "model", DIMS)
+    assert_stored(reopened, 0, 6)
+    assert reopened._shard_path(0).stat().st_size % (DIMS * 4) == 0
+
+
+def test_torn_index_record_is_ignored(tmp_path):
+    store = EmbeddingStore(str(tmp_path), "model", DIMS)
+    store.put_many(hashes(0, 3), vectors(0, 3))
+    with open(store._index_path, "ab") as f:
+        f.write(b"\x01" * 10)
+
+    reopened = EmbeddingStore(str(tmp_path), "model", DIMS)
+    assert len(reopened) == 3
+    assert_stored(reopened, 0, 3)
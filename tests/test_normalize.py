@@ -0,0 +1,137 @@
+import re
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from bs4 import BeautifulSoup
+
+from better_search.lib.text.normalize import (
+    _fast_html_text,
+    clean_description,
+    make_snippet,
+    map_texts,
+    normalize_arabic,
+    normalize_description,
+)
+
+
+# The BeautifulSoup / regex helpers clean_description and normalize_arabic
+# replaced, their output is the contract
+def reference_clean_description(text: str) -> str:
+    if not text:
+        return ""
+
+    soup = BeautifulSoup(text, "html.parser")
+    clean_text = soup.get_text(separator=" ", strip=True)
+    clean_text = re.sub(
+        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+",
+        "",
+        clean_text,
+    )
+    clean_text = re.sub(r"[\w\.-]+@[\w\.-]+\.\w+", "", clean_text)
+    clean_text = re.sub(r"\s+", " ", clean_text)
+    return clean_text.strip()
+
+
+def reference_normalize_arabic(text: str) -> str:
+    text = re.sub(r"[\u0617-\u061A\u064B-\u0652]", "", text)
+    text = re.sub("\u0640", "", text)
+    text = re.sub("[إأٱآا]", "ا", text)
+    text = re.sub("ى", "ي", text)
+    text = re.sub("ة", "ه", text)
+    return unicodedata.normalize("NFKC", text)
+
+
+# Markup the regex fast path handles without BeautifulSoup
+FAST_PATH_CASES = [
+    "plain text",
+    "Q &amp; A",
+    "&lt;b&gt;not a tag&lt;/b&gt;",
+    "&#39;quoted&#39; &quot;twice&quot;",
+    "&#x627;&#1576; hex and decimal",
+    "a&nbsp;b",
+    "<div><p>a <b>b<i>c</i></b></p></div>",
+    "<p>unclosed <b>bold",
+    "</p>stray close",
+    "<p class='a>b'>quoted &gt; in attribute</p>",
+    '<a href="https://example.com/a?b=1&amp;c=2">link</a> after',
+    "a<br>b",
+    "a<br/>b<br />c",
+    "<p>one</p><p>two</p>",
+    "line<br>\n\n\tbreak",
+    "<ul><li>first</li><li>second</li></ul>",
+    "<p>visit https://t.co/abc123 or mail contact@example.com</p>",
+    "<p></p>",
+]
+
+SLOW_PATH_CASES = [
+    "AT&T and Q&A",
+    "&copy2024 missing semicolon",
+    "&unknown; entity",
+    "a < b and <3",
+    "<p>a</p",
+    "<!-- note -->after comment",
+    "<![CDATA[data]]> after",
+    "<script>var x = '<p>hidden</p>';</script>shown",
+    "<style>p { color: red }</style>shown",
+    "<SCRIPT type='text/javascript'>x()</SCRIPT>shown",
+    "< script>x()</script>shown",
+]
+
+EMPTY_CASES = ["", " ", "\n\t", None]
+
+
+@pytest.mark.parametrize("text", FAST_PATH_CASES)
+def test_fast_path_handles_plain_markup(text):
+    assert _fast_html_text(text) is not None
+
+
+@pytest.mark.parametrize("text", SLOW_PATH_CASES)
+def test_parser_markup_falls_back(text):
+    assert _fast_html_text(text) is None
+
+
+@pytest.mark.parametrize("text", FAST_PATH_CASES + SLOW_PATH_CASES + EMPTY_CASES)
+def test_clean_description_matches_reference(text):
+    assert clean_description(text) == reference_clean_description(text)
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "الحَلْقَة مُسْتَشْفى",
+        "إدارة أسرة آخر ٱلقرآن",
+        "طـويـل مدرسة",
+        "ﷺ ﻻ ①",
+        "ﬁnance café",
+        "plain ascii",
+        "",
+    ],
+)
+def test_normalize_arabic_matches_reference(text):
+    assert normalize_arabic(text) == reference_normalize_arabic(text)
+
+
+def test_normalize_description_of_html():
+    text = "<p>الحَلْقَة&nbsp;<b>الأولى</b></p><br>https://example.com"
+    assert normalize_description(text) == "الحلقه الاولي"
+
+
+def test_make_snippet_cuts_at_word_boundary():
+    text = "word " * 100
+    snippet = make_snippet(text.strip(), max_chars=22)
+    assert snippet == "word word word word…"
+    assert make_snippet("short") == "short"
+
+
+def test_map_texts_reuses_a_given_executor():
+    texts = [f"<p>episode {i}</p>" for i in range(50)]
+    expected = [clean_description(text) for text in texts]
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        # The executor outlives each call, like the backfill's batches
+        for _ in range(2):
+            assert (
+                map_texts(clean_description, texts, chunksize=8, executor=executor)
+                == expected
+            )
@@ -0,0 +1,90 @@
+import asyncio
+
+import pytest
+import redis
+
+from better_search.core.config import settings
+from better_search.lib.cache import search_cache
+from better_search.lib.cache.search_cache import (
+    SearchResultCache,
+    invalidate_search_cache,
+)
+
+RESULTS = [{"episode_id": 1}]
+
+
+@pytest.fixture(autouse=True)
+def local_settings(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_CACHE_GENERATION_DIR", str(tmp_path))
+    monkeypatch.setattr(settings, "SEARCH_CACHE_GENERATION_REFRESH_SECONDS", 0.0)
+    monkeypatch.setattr(settings, "SEARCH_CACHE_REDIS_ENABLED", False)
+
+
+class DownRedis:
+    async def get(self, key):
+        raise redis.ConnectionError("redis is down")
+
+    async def set(self, key, value, ex=None):
+        raise redis.ConnectionError("redis is down")
+
+    async def incr(self, key):
+        raise redis.TimeoutError("redis timed out")
+
+
+def test_invalidation_without_redis_reaches_other_processes():
+    async def run():
+        cache = SearchResultCache(max_size=8, ttl_seconds=60)
+        await cache.set("query", "local", "episodes", "exact", RESULTS)
+        assert await cache.get("query", "local", "episodes", "exact") == RESULTS
+
+        # What the indexer (a separate process) runs after a rebuild
+        invalidate_search_cache("episodes")
+
+        assert await cache.get("query", "local", "episodes", "exact") is None
+        assert cache.stats()["local_entries"] == 0
+
+    asyncio.run(run())
+
+
+def test_invalidate_clears_the_local_tier():
+    async def run():
+        cache = SearchResultCache(max_size=8, ttl_seconds=60)
+        await cache.set("query", "local", "episodes", "exact", RESULTS)
+        await cache.invalidate("episodes")
+
+        assert cache.stats()["local_entries"] == 0
+        assert await cache.get("query", "local", "episodes", "exact") is None
+        assert search_cache.read_local_generation("episodes") == 1
+
+    asyncio.run(run())
+
+
+def test_redis_outage_degrades_to_the_local_tier():
+    async def run():
+        cache = SearchResultCache(max_size=8, ttl_seconds=60, redis_client=DownRedis())
+        await cache.set("query", "local", "episodes", "exact", RESULTS)
+        assert await cache.get("query", "local", "episodes", "exact") == RESULTS
+
+        await cache.invalidate("episodes")
+        assert await cache.get("query", "local", "episodes", "exact") is None
+
+    asyncio.run(run())
+
+
+def test_redis_clients_have_timeouts(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_CACHE_REDIS_ENABLED", True)
+    cache = SearchResultCache.from_settings()
+    kwargs = cache._redis.connection_pool.connection_kwargs
+
+    assert kwargs["socket_timeout"] == settings.SEARCH_CACHE_REDIS_TIMEOUT_SECONDS
+    assert (
+        kwargs["socket_connect_timeout"] == settings.SEARCH_CACHE_REDIS_TIMEOUT_SECONDS
+    )
+
+
+def test_invalidate_search_cache_survives_redis_outage(monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_CACHE_REDIS_ENABLED", True)
+    monkeypatch.setattr(settings, "REDIS_HOST", "127.0.0.1")
+    monkeypatch.setattr(settings, "REDIS_PORT", "1")
+
+    invalidate_search_cache("episodes")
@@ -0,0 +1,150 @@
+import asyncio
+from datetime import datetime
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import Session
+
+from better_search.api import search_route
+from better_search.core.config import settings
+from better_search.lib.podcast_index.models import Episode, Podcast
+from better_search.lib.text.normalize import make_snippet
+from better_search.lib.vectorstore.hybrid_search import (
+    EpisodeDisplay,
+    HybridSearchResult,
+)
+
+
+class FakeSearcher:
+    mode = "local"
+    collection_name = "test"
+
+    def __init__(self, episode_ids: list[int]):
+        self.episode_ids = episode_ids
+
+    async def asearch(self, query: str, profile: str):
+        return [
+            HybridSearchResult(
+                podcast_id=1,
+                episode_id=episode_id,
+                episode_title=f"Episode {episode_id}",
+                podcast_title="Podcast",
+                podcast_author="Author",
+                podcast_categoires=[],
+                sim_score=1.0 / (rank + 1),
+            )
+            for rank, episode_id in enumerate(self.episode_ids)
+        ]
+
+
+def add_episodes(engine, count: int) -> list[int]:
+    with Session(engine) as session:
+        podcast = Podcast(
+            url="https://feeds.example.com/1.xml",
+            title="Podcast",
+            image_url="https://example.com/podcast.png",
+        )
+        session.add(podcast)
+        session.flush()
+        episodes = [
+            Episode(
+                title=f"Episode {i}",
+                description=f"<p>Episode {i}</p>",
+                clean_description=f"Episode {i}",
+                snippet=f"Episode {i}",
+                guid=f"guid-{i}",
+                date_published=datetime(2024, 1, i + 1),
+                duration=3600,
+                podcast_id=podcast.id,
+            )
+            for i in range(count)
+        ]
+        session.add_all(episodes)
+        session.commit()
+        return [episode.id for episode in episodes]
+
+
+def run_search(schema: str, searcher: FakeSearcher) -> tuple[list[dict], list[str]]:
+    async def run():
+        engine = create_async_engine(
+            make_url(settings.DATABASE_URL).set(drivername="postgresql+asyncpg"),
+            connect_args={"server_settings": {"search_path": schema}},
+        )
+        statements = []
+
+        @event.listens_for(engine.sync_engine, "before_cursor_execute")
+        def count(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        try:
+            async with AsyncSession(engine) as session:
+                response = await search_route.search_podcast(
+                    query="episode", profile="exact", db=session, searcher=searcher
+                )
+        finally:
+            await engine.dispose()
+        return response["result"], statements
+
+    return asyncio.run(run())
+
+
+def selects(statements: list[str]) -> list[str]:
+    return [s for s in statements if s.lstrip().upper().startswith("SELECT")]
+
+
+def test_search_enriches_hits_with_one_select(pg_schema, monkeypatch):
+    engine, schema = pg_schema
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", False)
+    ids = add_episodes(engine, 5)
+    missing = max(ids) + 100
+
+    # Qdrant ranking deliberately differs from the id order
+    ranked = [ids[3], ids[0], missing, ids[4], ids[1]]
+    results, statements = run_search(schema, FakeSearcher(ranked))
+
+    assert len(selects(statements)) == 1
+    assert [result["episode_id"] for result in results] == [
+        ids[3],
+        ids[0],
+        ids[4],
+        ids[1],
+    ]
+    assert results[0]["episode_description"] == "Episode 3"
+    assert results[0]["episode_image"] == "https://example.com/podcast.png"
+
+
+def test_search_without_db_rows_returns_nothing(pg_schema, monkeypatch):
+    _, schema = pg_schema
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", False)
+
+    results, statements = run_search(schema, FakeSearcher([101, 102]))
+
+    assert results == []
+    assert len(selects(statements)) == 1
+
+
+def test_payload_hits_skip_the_db(pg_schema, monkeypatch):
+    engine, schema = pg_schema
+    monkeypatch.setattr(settings, "SEARCH_CACHE_ENABLED", False)
+    ids = add_episodes(engine, 2)
+    description = "A full description. " * 40
+
+    class PayloadSearcher(FakeSearcher):
+        async def asearch(self, query: str, profile: str):
+            results = await super().asearch(query, profile)
+            results[0].display = EpisodeDisplay(
+                image="https://example.com/episode.png",
+                description=description,
+                snippet=make_snippet(description),
+            )
+            return results
+
+    results, statements = run_search(schema, PayloadSearcher([ids[1], ids[0]]))
+
+    # Only the hit without the payload is read from the db, and both carry
+    # the full description under episode_description
+    assert len(selects(statements)) == 1
+    assert [result["episode_id"] for result in results] == [ids[1], ids[0]]
+    assert results[0]["episode_description"] == description
+    assert results[1]["episode_description"] == "Episode 0"
@@ -0,0 +1,82 @@
+import signal
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+from better_search.api import server
+from better_search.core.config import settings
+
+
+class FakeSearcher:
+    instances: list["FakeSearcher"] = []
+    failures = 0
+
+    def __init__(self, collection_name: str, mode: str):
+        self.closed = False
+        FakeSearcher.instances.append(self)
+
+    def warmup(self, queries: list[str]):
+        if FakeSearcher.failures:
+            FakeSearcher.failures -= 1
+            raise RuntimeError("qdrant is not up yet")
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+def fake_searcher(monkeypatch):
+    FakeSearcher.instances = []
+    FakeSearcher.failures = 0
+    monkeypatch.setattr(server, "HybridSearch", FakeSearcher)
+    monkeypatch.setattr(settings, "SEARCH_LOAD_RETRY_SECONDS", 0.01)
+    monkeypatch.setattr(settings, "SEARCH_LOAD_MAX_ATTEMPTS", 3)
+    return FakeSearcher
+
+
+def wait_for_status(client: TestClient, status: str) -> dict:
+    deadline = time.monotonic() + 5
+    while time.monotonic() < deadline:
+        body = client.get("/health/ready").json()
+        if body["status"] == status:
+            return body
+        time.sleep(0.01)
+    raise AssertionError(f"readiness never became {status!r}, last {body}")
+
+
+def test_load_is_retried_and_everything_closed_on_shutdown(fake_searcher):
+    fake_searcher.failures = 2
+    with TestClient(server.get_application()) as client:
+        wait_for_status(client, "ready")
+
+    # Failed attempts are closed right away, the live one on shutdown
+    assert len(fake_searcher.instances) == 3
+    assert all(searcher.closed for searcher in fake_searcher.instances)
+
+
+@pytest.mark.parametrize("exit_on_failure", [False, True])
+def test_failed_load_is_reported(fake_searcher, monkeypatch, exit_on_failure):
+    kills = []
+    monkeypatch.setattr(server.os, "kill", lambda pid, sig: kills.append(sig))
+    monkeypatch.setattr(settings, "SEARCH_LOAD_EXIT_ON_FAILURE", exit_on_failure)
+    fake_searcher.failures = 10
+
+    with TestClient(server.get_application()) as client:
+        body = wait_for_status(client, "failed")
+
+    assert body["error"] == "qdrant is not up yet"
+    # Stopping the process is opt in, by default the orchestrator decides
+    assert kills == ([signal.SIGTERM] if exit_on_failure else [])
+    assert len(fake_searcher.instances) == 3
+    assert all(searcher.closed for searcher in fake_searcher.instances)
+
+
+def test_no_load_attempts(fake_searcher, monkeypatch):
+    monkeypatch.setattr(settings, "SEARCH_LOAD_MAX_ATTEMPTS", 0)
+
+    with TestClient(server.get_application()) as client:
+        body = wait_for_status(client, "failed")
+
+    assert body["error"] == "no load attempts configured"
+    assert fake_searcher.instances == []
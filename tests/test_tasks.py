@@ -0,0 +1,216 @@
+import json
+from contextlib import contextmanager
+from datetime import datetime
+
+import numpy as np
+import pytest
+from fastembed import SparseEmbedding
+from qdrant_client import QdrantClient
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from better_search.core.config import settings
+from better_search.lib.cache.search_cache import read_local_generation
+from better_search.lib.podcast_index.models import Episode, Podcast
+from better_search.lib.vectorstore import indexing
+from better_search.workers import tasks
+from better_search.workers.app import celery_app
+
+COLLECTION_NAME = "test_episodes"
+
+
+def feed(feed_id: int) -> dict:
+    return {
+        "id": feed_id,
+        "url": f"https://feeds.example.com/{feed_id}.xml",
+        "title": f"Podcast {feed_id}",
+        "author": "Author",
+        "image": f"https://example.com/{feed_id}.png",
+        "categories": {"1": "Arts"},
+    }
+
+
+def episode(feed_id: int, number: int) -> dict:
+    return {
+        "id": feed_id * 100 + number,
+        "title": f"Episode {number}",
+        "description": f"<p>Episode {number} of {feed_id}</p>",
+        "guid": f"guid-{feed_id}-{number}",
+        "datePublished": 1700000000 + number,
+        "duration": 60,
+        "feedId": feed_id,
+    }
+
+
+def body(**payload) -> bytes:
+    return json.dumps({"status": "true", **payload}).encode()
+
+
+class FakePodcastIndex:
+    # Stands in for the API client _call_api opens per task. Feed 2 is
+    # returned by both listings, feed 4 has no episodes endpoint.
+    calls: list[tuple] = []
+
+    def __init__(self, concurrency: int = 1):
+        pass
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        pass
+
+    async def search(self, query: str, clean: bool = False) -> bytes:
+        FakePodcastIndex.calls.append(("search", query))
+        feeds = [feed(1), feed(2)]
+        return body(feeds=feeds, count=len(feeds), query=query)
+
+    async def trending_podcasts(self, **kwargs) -> bytes:
+        FakePodcastIndex.calls.append(("trending", kwargs["lang"][0]))
+        feeds = [feed(2), feed(3), feed(4)]
+        return body(feeds=feeds, count=len(feeds))
+
+    async def episodes(self, podcast, since=None, **kwargs) -> bytes:
+        FakePodcastIndex.calls.append(("episodes", podcast.id))
+        if podcast.id == 4:
+            raise RuntimeError("/episodes/byfeedid failed after 4 attempts")
+        items = [episode(podcast.id, number) for number in range(3)]
+        return body(items=items, count=len(items))
+
+
+class FakeDense:
+    def __init__(self, model_name: str):
+        pass
+
+    def embed(self, documents):
+        return [
+            np.full(indexing.LOCAL_EMBEDDING_SIZE, len(document), dtype=np.float32)
+            for document in documents
+        ]
+
+
+class FakeSparse:
+    def __init__(self, model_name: str):
+        pass
+
+    def embed(self, documents, batch_size: int):
+        return [
+            SparseEmbedding(indices=np.array([len(document)]), values=np.array([1.0]))
+            for document in documents
+        ]
+
+
+@pytest.fixture
+def eager(pg_schema, monkeypatch, tmp_path):
+    # Tasks run inline and raise, the db is the scratch schema
+    engine, _ = pg_schema
+    monkeypatch.setattr(celery_app.conf, "task_always_eager", True)
+    monkeypatch.setattr(celery_app.conf, "task_eager_propagates", True)
+
+    @contextmanager
+    def db_context():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(tasks, "get_db_context", db_context)
+    monkeypatch.setattr(settings, "SEARCH_CACHE_REDIS_ENABLED", False)
+    monkeypatch.setattr(settings, "SEARCH_CACHE_GENERATION_DIR", str(tmp_path))
+    return engine
+
+
+def test_crawl_workflow_fans_out_once_per_feed(eager, monkeypatch):
+    FakePodcastIndex.calls = []
+    monkeypatch.setattr(tasks, "AsyncPodcastIndex", FakePodcastIndex)
+
+    stats = (
+        tasks.crawl_workflow(
+            queries=["history"], trending=[{"lang": "ar", "category": 1}]
+        )
+        .apply_async()
+        .get()
+    )
+
+    # Feed 2 is in both listings but crawled once, feed 4 fails without
+    # failing the chord
+    episode_calls = sorted(
+        call[1] for call in FakePodcastIndex.calls if call[0] == "episodes"
+    )
+    assert episode_calls == [1, 2, 3, 4]
+    assert stats == {"feeds_crawled": 3, "episodes_saved": 9, "feeds_failed": 1}
+
+    with Session(eager) as session:
+        assert session.scalar(select(Podcast.id).where(Podcast.podcastindex_id == 4))
+        guids = session.scalars(select(Episode.guid).order_by(Episode.guid)).all()
+    assert guids == [f"guid-{f}-{n}" for f in (1, 2, 3) for n in range(3)]
+
+
+def test_crawl_workflow_without_feeds(eager, monkeypatch):
+    class EmptyPodcastIndex(FakePodcastIndex):
+        async def search(self, query: str, clean: bool = False) -> bytes:
+            return body(feeds=[], count=0, query=query)
+
+    monkeypatch.setattr(tasks, "AsyncPodcastIndex", EmptyPodcastIndex)
+
+    assert (
+        tasks.crawl_workflow(queries=["nothing"], trending=[]).apply_async().get() == {}
+    )
+
+
+def add_podcasts(engine, count: int, episodes: int) -> list[int]:
+    with Session(engine) as session:
+        podcasts = [
+            Podcast(
+                url=f"https://feeds.example.com/{i}.xml",
+                title=f"Podcast {i}",
+                author="Author",
+                categories=["Arts"],
+                podcastindex_id=i,
+            )
+            for i in range(count)
+        ]
+        session.add_all(podcasts)
+        session.flush()
+        session.add_all(
+            Episode(
+                title=f"Episode {number}",
+                description=f"<p>Episode {number} of {podcast.id}</p>",
+                guid=f"guid-{podcast.id}-{number}",
+                date_published=datetime(2024, 1, number + 1),
+                duration=60,
+                podcast_id=podcast.id,
+            )
+            for podcast in podcasts
+            for number in range(episodes)
+        )
+        session.commit()
+        return [podcast.id for podcast in podcasts]
+
+
+def test_index_workflow_shards_and_finishes(eager, monkeypatch):
+    client = QdrantClient(location=":memory:")
+    monkeypatch.setattr(tasks, "QdrantClient", lambda url: client)
+    monkeypatch.setattr(indexing, "TextEmbedding", FakeDense)
+    monkeypatch.setattr(indexing, "Bm25", FakeSparse)
+    podcast_ids = add_podcasts(eager, count=5, episodes=4)
+
+    def run(delta: bool) -> dict:
+        workflow = tasks.index_workflow(
+            podcast_ids, COLLECTION_NAME, "local", shard_size=2, delta=delta
+        )
+        return workflow.apply_async().get()
+
+    # Three shards, their counts are summed by finish_index
+    assert run(delta=False) == {"indexed": 20, "deleted": 0}
+    assert client.count(COLLECTION_NAME).count == 20
+    # and the cached search results of the collection are dropped
+    assert read_local_generation(COLLECTION_NAME) == 1
+
+    with Session(eager) as session:
+        gone = session.scalar(select(Episode.id).order_by(Episode.id).limit(1))
+        session.execute(delete(Episode).where(Episode.id == gone))
+        session.commit()
+
+    # A delta run skips the unchanged episodes and drops the deleted one
+    assert run(delta=True) == {"indexed": 0, "deleted": 1}
+    assert client.count(COLLECTION_NAME).count == 19
+    assert not client.retrieve(COLLECTION_NAME, ids=[gone])
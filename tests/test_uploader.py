@@ -0,0 +1,76 @@
+import threading
+
+import pytest
+from qdrant_client import models
+
+from better_search.lib.vectorstore import uploader
+from better_search.lib.vectorstore.uploader import ParallelUploader
+
+GREEN = models.CollectionStatus.GREEN
+YELLOW = models.CollectionStatus.YELLOW
+RED = models.CollectionStatus.RED
+
+
+class FakeClient:
+    # A remote client, upserts are acknowledged before they are applied
+
+    init_options = {"location": None}
+
+    def __init__(self, statuses: list[models.CollectionStatus]):
+        self.statuses = statuses
+        self.upserts: list[tuple[int, bool]] = []
+        self.status_checks = 0
+        self._lock = threading.Lock()
+
+    def upsert(self, collection_name, points, wait):
+        with self._lock:
+            self.upserts.append((len(points), wait))
+            return models.UpdateResult(
+                operation_id=len(self.upserts),
+                status=models.UpdateStatus.ACKNOWLEDGED,
+            )
+
+    def get_collection(self, collection_name):
+        self.status_checks += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return type("Info", (), {"status": status})
+
+
+def points(count: int) -> list[models.PointStruct]:
+    return [models.PointStruct(id=i, vector=[0.0]) for i in range(count)]
+
+
+@pytest.fixture(autouse=True)
+def fast_polling(monkeypatch):
+    monkeypatch.setattr(uploader, "STATUS_POLL_SECONDS", 0.0)
+
+
+def test_flush_waits_for_green_without_resending():
+    client = FakeClient([YELLOW, YELLOW, GREEN])
+    with ParallelUploader(client, "episodes", batch_size=10, parallelism=2) as up:
+        up.add(points(25))
+
+    assert up.uploaded == 25
+    # Every batch is sent once, none of them blocking
+    assert sorted(client.upserts) == [(5, False), (10, False), (10, False)]
+    assert client.status_checks == 3
+
+
+def test_flush_fails_on_a_red_collection():
+    client = FakeClient([RED])
+    up = ParallelUploader(client, "episodes", batch_size=10, parallelism=2)
+    up.add(points(10))
+
+    with pytest.raises(RuntimeError, match="is red"):
+        up.flush()
+
+
+def test_flush_gives_up_after_the_timeout():
+    client = FakeClient([YELLOW])
+    up = ParallelUploader(
+        client, "episodes", batch_size=10, parallelism=2, consistency_timeout=0.0
+    )
+    up.add(points(10))
+
+    with pytest.raises(RuntimeError, match="still yellow"):
+        up.flush()